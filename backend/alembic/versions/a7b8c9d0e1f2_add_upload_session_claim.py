@@ -0,0 +1,25 @@
+"""add_upload_session_claim
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-01-16 00:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = 'a7b8c9d0e1f2'
+down_revision = 'f6a7b8c9d0e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('upload_session', sa.Column('claimed_by', sa.String(), nullable=True))
+    op.add_column('upload_session', sa.Column('claimed_until', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('upload_session', 'claimed_until')
+    op.drop_column('upload_session', 'claimed_by')
@@ -0,0 +1,23 @@
+"""add_knowledge_upload_job_heartbeat
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-01-17 00:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = 'b8c9d0e1f2a3'
+down_revision = 'a7b8c9d0e1f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('knowledge_upload_job', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('knowledge_upload_job', 'heartbeat_at')
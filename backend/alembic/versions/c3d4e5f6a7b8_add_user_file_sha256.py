@@ -0,0 +1,27 @@
+"""add_user_file_sha256
+
+Revision ID: c3d4e5f6a7b8
+Revises: b2c3d4e5f6g7
+Create Date: 2026-01-12 00:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = 'c3d4e5f6a7b8'
+down_revision = 'b2c3d4e5f6g7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user_file', sa.Column('sha256', sa.String(length=64), nullable=True))
+    op.create_index('ix_user_file_sha256', 'user_file', ['sha256'])
+    op.create_index('ix_user_file_owner_id', 'user_file', ['owner_id'])
+
+
+def downgrade():
+    op.drop_index('ix_user_file_owner_id', table_name='user_file')
+    op.drop_index('ix_user_file_sha256', table_name='user_file')
+    op.drop_column('user_file', 'sha256')
@@ -0,0 +1,30 @@
+"""add_file_blob
+
+Revision ID: d4e5f6a7b8c9
+Revises: c3d4e5f6a7b8
+Create Date: 2026-01-13 00:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = 'd4e5f6a7b8c9'
+down_revision = 'c3d4e5f6a7b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'file_blob',
+        sa.Column('sha256', sa.String(length=64), primary_key=True),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('refcount', sa.Integer(), nullable=False, server_default="0"),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('released_at', sa.DateTime(), nullable=True, index=True),
+    )
+
+
+def downgrade():
+    op.drop_table('file_blob')
@@ -0,0 +1,33 @@
+"""add_upload_session
+
+Revision ID: e5f6a7b8c9d0
+Revises: d4e5f6a7b8c9
+Create Date: 2026-01-14 00:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = 'e5f6a7b8c9d0'
+down_revision = 'd4e5f6a7b8c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'upload_session',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('owner_id', sa.String(), nullable=False, index=True),
+        sa.Column('filename', sa.String(), nullable=False),
+        sa.Column('content_type', sa.String(), nullable=True),
+        sa.Column('length', sa.BigInteger(), nullable=False),
+        sa.Column('offset', sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False, index=True),
+    )
+
+
+def downgrade():
+    op.drop_table('upload_session')
@@ -0,0 +1,31 @@
+"""add_knowledge_upload_job
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-01-15 00:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = 'f6a7b8c9d0e1'
+down_revision = 'e5f6a7b8c9d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'knowledge_upload_job',
+        sa.Column('file_id', sa.String(), primary_key=True),
+        sa.Column('status', sa.String(length=16), nullable=False, server_default="queued", index=True),
+        sa.Column('items', sa.Integer(), nullable=False, server_default="0"),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('knowledge_upload_job')
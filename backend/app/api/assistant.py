@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from ..deps import get_db
+from ..services.http_cache import HTTPCacheRoute, http_cache
+from ..services.hybrid_search import hybrid_search
+from ..services.knowledge_search import search_knowledge
+
+router = APIRouter(route_class=HTTPCacheRoute)
+
+class AskRequest(BaseModel):
+    question: str
+    limit: int = 3
+
+def _compose_answer(hits) -> str:
+    if not hits:
+        return "لم أجد معلومات مطابقة في قاعدة المعرفة. جرّب كلمات مختلفة مثل اسم الوحدة أو المعيار."
+    parts = [f"📄 {hit.location}: {hit.snippet}" for hit in hits]
+    return "وجدت المعلومات التالية في قاعدة المعرفة:\n\n" + "\n\n".join(parts)
+
+@router.post("/ask")
+def ask(data: AskRequest, db: Session = Depends(get_db)):
+    hits = hybrid_search(db, data.question, limit=data.limit)
+    return {
+        "answer": _compose_answer(hits),
+        "sources": [hit.location for hit in hits],
+        "results": [hit.as_dict() for hit in hits],
+    }
+
+@router.get("/search")
+@http_cache(versions=("knowledge",))
+def search(q: str, limit: int = 10, db: Session = Depends(get_db)):
+    hits = search_knowledge(db, q, limit=limit)
+    return {"query": q, "results": [hit.as_dict() for hit in hits]}
@@ -0,0 +1,80 @@
+import json
+import os
+from uuid import uuid4
+
+import anyio
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from ..services.transcription import AUDIO_TMP_DIR, QueueFull, transcription_service
+from ..services.uploads import HashingWriter
+
+router = APIRouter()
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+STREAM_POLL_SECONDS = 1.0
+
+async def _save_upload(file: UploadFile) -> tuple[str, str]:
+    """حفظ الملف على القرص على دفعات مع حساب بصمته أثناء الكتابة (خارج حلقة الأحداث)."""
+    await anyio.to_thread.run_sync(lambda: os.makedirs(AUDIO_TMP_DIR, exist_ok=True))
+    path = os.path.join(AUDIO_TMP_DIR, uuid4().hex + os.path.splitext(file.filename or "")[1])
+    writer = await anyio.to_thread.run_sync(HashingWriter, path)
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await anyio.to_thread.run_sync(writer.write, chunk)
+    except BaseException:
+        await anyio.to_thread.run_sync(writer.close)
+        await anyio.to_thread.run_sync(_remove, path)
+        raise
+    await anyio.to_thread.run_sync(writer.close)
+    return path, writer.digest.hexdigest()
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _job_or_404(job_id: str):
+    job = transcription_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Transcription not found")
+    return job
+
+@router.post("/transcriptions")
+async def create_transcription(file: UploadFile = File(...), language: str | None = None):
+    path, sha256 = await _save_upload(file)
+    try:
+        job = transcription_service.submit(path, sha256, language=language)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    # 202: المهمة في الطابور، والعميل يتابعها عبر GET أو stream
+    return JSONResponse(job.as_dict(), status_code=200 if job.status == "done" else 202)
+
+@router.get("/transcriptions/{job_id}")
+async def get_transcription(job_id: str, wait: float = 0):
+    job = _job_or_404(job_id)
+    if wait > 0:
+        job = await transcription_service.wait(job, timeout=min(wait, 60))
+    return job.as_dict()
+
+@router.get("/transcriptions/{job_id}/stream")
+async def stream_transcription(job_id: str):
+    """NDJSON: سطر حالة، ثم سطر لكل مقطع فور تفريغه، ثم سطر الحالة النهائية."""
+    job = _job_or_404(job_id)
+
+    async def events():
+        yield json.dumps({"type": "status", **job.as_dict()}) + "\n"
+        offset = 0
+        while True:
+            finished = job.status in ("done", "failed")
+            # قراءة ملف المقاطع على القرص خارج حلقة الأحداث
+            segments, offset = await anyio.to_thread.run_sync(transcription_service.segments, job_id, offset)
+            for segment in segments:
+                yield json.dumps({"type": "segment", **segment}, ensure_ascii=False) + "\n"
+            if finished:
+                break
+            await transcription_service.wait(job, timeout=STREAM_POLL_SECONDS)
+        yield json.dumps({"type": "status", **job.as_dict()}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
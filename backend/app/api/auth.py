@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from jose import jwt
 import os
 
-from .. import crud, schemas
-from ..deps import get_db
+from .. import crud_async, schemas
+from ..deps import get_async_db
+from ..services.passwords import PasswordHasherBusy, password_hasher
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -24,18 +25,31 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded
 
+def _busy(e: PasswordHasherBusy) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "2"})
+
+# bcrypt يعمل في password_hasher والاستعلامات عبر AsyncSession، فلا يحجز
+# تسجيل الدخول حلقة الأحداث ولا خيوط بقية المسارات
 @router.post("/register", response_model=schemas.UserOut)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing = crud.get_user_by_email(db, user.email)
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await crud_async.get_user_by_email(db, user.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
-    new = crud.create_user(db, user)
+    try:
+        hashed = await password_hasher.hash(user.password)
+    except PasswordHasherBusy as e:
+        raise _busy(e)
+    new = await crud_async.create_user(db, user, hashed)
     return new
 
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.verify_user(db, form_data.username, form_data.password)
-    if not user:
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await crud_async.get_user_by_email(db, form_data.username)
+    try:
+        valid = user is not None and await password_hasher.verify(form_data.password, user.hashed_password)
+    except PasswordHasherBusy as e:
+        raise _busy(e)
+    if not valid:
         raise HTTPException(status_code=400, detail="Incorrect credentials")
     access_token = create_access_token({"sub": user.email}, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     return {"access_token": access_token, "token_type": "bearer"}
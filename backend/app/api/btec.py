@@ -0,0 +1,23 @@
+import json
+
+from fastapi import APIRouter, Form
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from ..services.text_evaluator import evaluate_bulk, evaluate_text
+
+router = APIRouter()
+
+class BulkEvaluateRequest(BaseModel):
+    model_answer: str
+    student_answers: list[str]
+
+@router.post("/evaluate/text")
+def evaluate_text_answer(student_answer: str = Form(...), model_answer: str = Form(...)):
+    return {"data": evaluate_text(student_answer, model_answer)}
+
+@router.post("/evaluate/text/bulk")
+def evaluate_text_bulk(data: BulkEvaluateRequest):
+    # سطر JSON لكل إجابة (NDJSON) يُرسل فور حساب دفعته، دون انتظار كل الإجابات
+    lines = (json.dumps(result) + "\n" for result in evaluate_bulk(data.model_answer, data.student_answers))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
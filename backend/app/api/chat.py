@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
-import time
-import random
+
+from ..services.tutor_rules import rule_engine
 
 router = APIRouter()
 
@@ -10,18 +10,5 @@ class ChatRequest(BaseModel):
 
 @router.post("/")
 async def chat_with_tutor(data: ChatRequest):
-    time.sleep(1) # محاكاة التفكير
-    user_msg = data.message.lower()
-    
-    response = "أنا هنا. "
-    
-    if "pass" in user_msg or "مقبول" in user_msg:
-        response = "للحصول على **Pass**، ركز على الوصف الدقيق والشرح الواضح للمفاهيم."
-    elif "merit" in user_msg or "جيد" in user_msg:
-        response = "للحصول على **Merit**، يجب عليك التحليل والمقارنة بين الأساليب المختلفة."
-    elif "distinction" in user_msg or "امتياز" in user_msg:
-        response = "للوصول إلى **Distinction**، قدم تقييماً نقدياً وحلولاً مبررة بالأدلة."
-    else:
-        response = "أهلاً بك! اسألني عن معايير BTEC (Pass, Merit, Distinction)."
-        
-    return {"response": response}
+    # القواعد مُحمّلة ومُجمّعة عند بدء التشغيل، والمطابقة تتم في ميكروثوانٍ
+    return {"response": rule_engine.reply(data.message)}
@@ -1,14 +1,35 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from .. import crud, schemas
-from ..deps import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import crud_async, schemas
+from ..deps import get_async_db
+from ..services.catalog import catalog_cache
+from ..services.http_cache import HTTPCacheRoute, http_cache
+from ..services.pagination import MAX_PAGE_SIZE, InvalidCursor
 
-router = APIRouter(prefix="/courses", tags=["courses"])
+router = APIRouter(prefix="/courses", tags=["courses"], route_class=HTTPCacheRoute)
 
 @router.post("/", response_model=schemas.CourseOut)
-def create_course(course: schemas.CourseCreate, db: Session = Depends(get_db)):
-    return crud.create_course(db, course)
+async def create_course(course: schemas.CourseCreate, db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.create_course(db, course)
 
-@router.get("/", response_model=list[schemas.CourseOut])
-def list_courses(skip: int = 0, limit: int = 50, db: Session = Depends(get_db)):
-    return crud.get_courses(db, skip=skip, limit=limit)
+@router.get("/", response_model=schemas.Page[schemas.CourseOut])
+@http_cache(versions=("courses",))
+async def list_courses(
+    after: str | None = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    estimate_total: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """مرتبة حسب العنوان؛ الصفحة التالية بـ after=next_cursor (لا skip)."""
+    try:
+        courses, next_cursor = await crud_async.get_courses(db, after=after, limit=limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    total = await crud_async.estimate_courses(db) if estimate_total else None
+    return {"data": courses, "next_cursor": next_cursor, "estimated_total": total}
+
+@router.get("/catalog", response_model=schemas.Catalog)
+@http_cache("public, max-age=60", versions=("courses",))
+async def course_catalog():
+    """كل المقررات مع دروسها؛ JSON محفوظ في الذاكرة حتى أول تعديل على مقرر أو درس."""
+    return Response(content=await catalog_cache.get(), media_type="application/json")
@@ -1,21 +1,200 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 import os
-from uuid import uuid4
-from ..deps import get_db, get_current_user
+
+import anyio
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from ..deps import get_current_user, get_db
+from ..models import UserFile
+from ..services import resumable_uploads
+from ..services.blob_store import dedup_stats
+from ..services.downloads import BlobResponse
+from ..services.knowledge_uploads import (
+    job_status,
+    knowledge_indexer,
+    queue_status,
+    should_index,
+)
+from ..services.uploads import (
+    UPLOAD_DIR,
+    UploadError,
+    delete_upload,
+    ensure_upload_tables,
+    save_upload,
+)
 
 router = APIRouter(prefix="/files", tags=["files"])
-UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/app/uploads")
-
-@router.post("/upload")
-async def upload_file(file: UploadFile = File(...), user=Depends(get_current_user)):
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    ext = os.path.splitext(file.filename)[1]
-    fname = f"{uuid4().hex}{ext}"
-    path = os.path.join(UPLOAD_DIR, fname)
+
+_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+@router.post("/upload", openapi_extra=_UPLOAD_BODY)
+async def upload_file(request: Request, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    # الجسم يُقرأ على دفعات من request.stream() ولا يُحمَّل في الذاكرة
     try:
-        content = await file.read()
-        with open(path, "wb") as f:
-            f.write(content)
-    except Exception:
+        row, upload, deduplicated = await save_upload(request, db, user, UPLOAD_DIR)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except OSError:
         raise HTTPException(status_code=500, detail="Failed to store file")
-    return {"filename": fname, "path": path}
+    indexing = await anyio.to_thread.run_sync(_queue_for_indexing, db, user, row)
+    return _file_out(row, deduplicated, indexing)
+
+def _queue_for_indexing(db: Session, user, row: UserFile) -> str | None:
+    # ملفات المعلمين (PDF/DOCX/PPTX) تُسحب لقاعدة المعرفة في الخلفية
+    if not should_index(user, row):
+        return None
+    return knowledge_indexer.enqueue(db, row).status
+
+def _file_out(row: UserFile, deduplicated: bool, indexing: str | None = None) -> dict:
+    return {
+        "id": row.id,
+        # اسم الملف المخزن كما كان قبل مخزن الـ blobs؛ الاسم الأصلي في original_filename
+        "filename": os.path.basename(row.stored_path),
+        "path": row.stored_path,
+        "original_filename": row.original_filename,
+        "content_type": row.content_type,
+        "size": row.size,
+        "sha256": row.sha256,
+        "deduplicated": deduplicated,
+        "indexing": indexing,
+    }
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    length: int
+    content_type: str | None = None
+
+def _session_headers(row) -> dict:
+    return {
+        "Upload-Offset": str(row.offset),
+        "Upload-Length": str(row.length),
+        "Upload-Expires": row.expires_at.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        "Cache-Control": "no-store",
+    }
+
+def _session_or_404(db: Session, user, session_id: str):
+    row = resumable_uploads.get_session(db, user, session_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    return row
+
+@router.post("/uploads", status_code=201)
+def create_upload_session(payload: UploadSessionCreate, request: Request, response: Response, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    """رفع قابل للاستئناف: إنشاء الجلسة، ثم PUT للأجزاء، ثم finalize."""
+    try:
+        row = resumable_uploads.create_session(db, user, payload.filename, payload.length, payload.content_type, UPLOAD_DIR)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    response.headers.update(_session_headers(row))
+    response.headers["Location"] = f"{request.url.path}/{row.id}"
+    return {"id": row.id, "offset": row.offset, "length": row.length, "expires_at": row.expires_at}
+
+@router.head("/uploads/{session_id}")
+def upload_offset(session_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    row = _session_or_404(db, user, session_id)
+    return Response(status_code=204, headers=_session_headers(row))
+
+@router.api_route("/uploads/{session_id}", methods=["PUT", "PATCH"])
+async def upload_chunk(
+    session_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    # الجسم بايتات خام تبدأ عند Upload-Offset
+    row = _session_or_404(db, user, session_id)
+    try:
+        await resumable_uploads.append(request, db, row, upload_offset, UPLOAD_DIR)
+    except resumable_uploads.OffsetMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Upload-Offset": str(e.offset)})
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=_session_headers(row))
+    return Response(status_code=204, headers=_session_headers(row))
+
+@router.post("/uploads/{session_id}/finalize")
+def finalize_upload(session_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    row = _session_or_404(db, user, session_id)
+    try:
+        file_row, deduplicated = resumable_uploads.finalize(db, user, row, UPLOAD_DIR)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=_session_headers(row))
+    return _file_out(file_row, deduplicated, _queue_for_indexing(db, user, file_row))
+
+@router.delete("/uploads/{session_id}", status_code=204)
+def abort_upload(session_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    resumable_uploads.abort(db, _session_or_404(db, user, session_id), UPLOAD_DIR)
+
+@router.get("/stats")
+def storage_stats(user=Depends(get_current_user), db: Session = Depends(get_db)):
+    if not user.is_superuser:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    ensure_upload_tables(db.get_bind())
+    return dedup_stats(db)
+
+@router.get("/indexing")
+def indexing_queue(user=Depends(get_current_user), db: Session = Depends(get_db)):
+    if not user.is_superuser:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    knowledge_indexer.ensure_tables(db.get_bind())
+    return queue_status(db)
+
+@router.get("/{file_id}/indexing")
+def indexing_status(file_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    ensure_upload_tables(db.get_bind())
+    knowledge_indexer.ensure_tables(db.get_bind())
+    # الحالة تكشف عدد المقاطع ونص الخطأ: لصاحب الملف أو للمعلم فقط
+    row = db.get(UserFile, file_id)
+    if row is None or (row.owner_id != str(user.id) and not user.is_superuser):
+        raise HTTPException(status_code=404, detail="File is not queued for indexing")
+    status = job_status(db, file_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="File is not queued for indexing")
+    return status
+
+@router.api_route("/{file_id}", methods=["GET", "HEAD"])
+async def download_file(file_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    # الملفات تشمل أعمال الطلاب: التنزيل لصاحب الملف أو للمعلم فقط، كالحذف
+    def lookup():
+        ensure_upload_tables(db.get_bind())
+        row = db.get(UserFile, file_id)
+        if row is None or (row.owner_id != str(user.id) and not user.is_superuser):
+            return None, None
+        try:
+            return row, os.stat(row.stored_path)
+        except OSError:
+            return row, None
+
+    row, stat = await anyio.to_thread.run_sync(lookup)
+    if row is None or stat is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return BlobResponse(
+        row.stored_path,
+        size=stat.st_size,
+        mtime=stat.st_mtime,
+        etag=row.sha256 or f"{int(stat.st_mtime)}-{stat.st_size}",
+        media_type=row.content_type,
+        filename=row.original_filename,
+    )
+
+@router.delete("/{file_id}", status_code=204)
+def delete_file(file_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    ensure_upload_tables(db.get_bind())
+    row = db.get(UserFile, file_id)
+    if row is None or (row.owner_id != str(user.id) and not user.is_superuser):
+        raise HTTPException(status_code=404, detail="File not found")
+    delete_upload(db, row, UPLOAD_DIR)
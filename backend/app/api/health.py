@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from ..database import async_engine, pool_metrics
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+@router.get("/")
+def healthcheck():
+    return {"status": {"status": "ok"}}
+
+@router.get("/db")
+def database_pool():
+    """حالة مجموعة اتصالات القاعدة: المستخدم منها الآن وزمن انتظار الحصول على اتصال."""
+    return {**pool_metrics(), "async": pool_metrics(async_engine)}
@@ -1,8 +1,16 @@
 from fastapi import APIRouter
-from app.api import assessments, chat
+from app.api import assessments, assistant, audio, auth, btec, chat, courses, files, health, plagiarism
 
 api_router = APIRouter()
 
 # تسجيل المسارات
 api_router.include_router(assessments.router, prefix="/assessments", tags=["assessments"])
 api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
+api_router.include_router(assistant.router, prefix="/assistant", tags=["assistant"])
+api_router.include_router(plagiarism.router, prefix="/plagiarism", tags=["plagiarism"])
+api_router.include_router(btec.router, prefix="/btec", tags=["btec"])
+api_router.include_router(audio.router, prefix="/audio", tags=["audio"])
+api_router.include_router(files.router)
+api_router.include_router(auth.router)
+api_router.include_router(courses.router)
+api_router.include_router(health.router)
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from ..deps import get_current_user, get_db
+from ..models import Submission
+from ..services.plagiarism import DEFAULT_THRESHOLD, check_submission, ensure_plagiarism_tables, lesson_report
+
+router = APIRouter()
+
+@router.post("/submissions/{submission_id}/check")
+def check(submission_id: int, threshold: float = DEFAULT_THRESHOLD, same_lesson: bool = False, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    ensure_plagiarism_tables(db.get_bind())
+    submission = db.get(Submission, submission_id)
+    # الطالب يفحص تسليمه فقط؛ المعلم يفحص أي تسليم
+    if submission is None or (submission.user_id != user.id and not user.is_superuser):
+        raise HTTPException(status_code=404, detail="Submission not found")
+    matches = check_submission(db, submission, threshold=threshold, same_lesson=same_lesson)
+    return {
+        "submission_id": submission_id,
+        "matches": [{"submission_id": item_id, "similarity": round(score, 3)} for item_id, score in matches],
+    }
+
+@router.get("/lessons/{lesson_id}/report")
+def report(lesson_id: int, threshold: float = DEFAULT_THRESHOLD, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    # التقرير يكشف أرقام الطلاب ونسب التشابه بينهم: للمعلمين فقط
+    if not user.is_superuser:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return lesson_report(db, lesson_id, threshold=threshold)
@@ -1,14 +1,16 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from . import models, schemas
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from .services.pagination import Keyset, estimated_total_stmt
+from .services.passwords import hash_password, verify_password
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user: schemas.UserCreate, is_superuser: bool = False):
-    hashed = pwd_context.hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, is_superuser: bool = False, hashed: str | None = None):
+    # المسارات async تمرر البصمة محسوبة مسبقاً في password_hasher
+    if hashed is None:
+        hashed = hash_password(user.password)
     db_user = models.User(email=user.email, hashed_password=hashed, is_superuser=is_superuser)
     db.add(db_user)
     db.commit()
@@ -19,10 +21,25 @@ def verify_user(db: Session, email: str, password: str):
     user = get_user_by_email(db, email)
     if not user:
         return None
-    if not pwd_context.verify(password, user.hashed_password):
+    if not verify_password(password, user.hashed_password):
         return None
     return user
 
+# الـ commit يُبطل نسخة المستخدم في user_cache (مستمع الجلسة هناك)
+def update_password(db: Session, user: models.User, new_password: str, hashed: str | None = None):
+    user.hashed_password = hashed or hash_password(new_password)
+    db.commit()
+    return user
+
+def set_user_active(db: Session, user: models.User, is_active: bool):
+    user.is_active = is_active
+    db.commit()
+    return user
+
+def delete_user(db: Session, user: models.User):
+    db.delete(user)
+    db.commit()
+
 def create_course(db: Session, course: schemas.CourseCreate):
     db_course = models.Course(title=course.title, description=course.description)
     db.add(db_course)
@@ -30,5 +47,12 @@ def create_course(db: Session, course: schemas.CourseCreate):
     db.refresh(db_course)
     return db_course
 
-def get_courses(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Course).offset(skip).limit(limit).all()
+COURSE_ORDER = Keyset("title", models.Course.title, models.Course.id)
+
+def get_courses(db: Session, after: str | None = None, limit: int = 100):
+    """صفحة من المقررات بعد المؤشر after؛ ترجع (المقررات، مؤشر الصفحة التالية)."""
+    rows = db.execute(COURSE_ORDER.apply(select(models.Course), after, limit)).scalars()
+    return COURSE_ORDER.page(rows, limit)
+
+def estimate_courses(db: Session) -> int:
+    return db.execute(estimated_total_stmt(db.get_bind().dialect.name, models.Course.__table__, models.Course.id)).scalar() or 0
@@ -0,0 +1,31 @@
+"""نسخ async من دوال crud للمسارات async (AsyncSession من deps.get_async_db)."""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, schemas
+from .crud import COURSE_ORDER
+from .services.pagination import estimated_total_stmt
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    return (await db.execute(select(models.User).where(models.User.email == email).limit(1))).scalars().first()
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate, hashed: str, is_superuser: bool = False):
+    # البصمة تُحسب مسبقاً في password_hasher؛ bcrypt لا يعمل على حلقة الأحداث
+    db_user = models.User(email=user.email, hashed_password=hashed, is_superuser=is_superuser)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def create_course(db: AsyncSession, course: schemas.CourseCreate):
+    db_course = models.Course(title=course.title, description=course.description)
+    db.add(db_course)
+    await db.commit()
+    await db.refresh(db_course)
+    return db_course
+
+async def get_courses(db: AsyncSession, after: str | None = None, limit: int = 100):
+    rows = (await db.execute(COURSE_ORDER.apply(select(models.Course), after, limit))).scalars()
+    return COURSE_ORDER.page(rows, limit)
+
+async def estimate_courses(db: AsyncSession) -> int:
+    return (await db.execute(estimated_total_stmt(db.bind.dialect.name, models.Course.__table__, models.Course.id))).scalar() or 0
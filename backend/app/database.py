@@ -1,10 +1,186 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+"""
+إنشاء محرك قاعدة البيانات مع إعدادات الاتصالات حسب نوع القاعدة.
+
+- Postgres (وغيرها): QueuePool بحجم DB_POOL_SIZE + DB_MAX_OVERFLOW، مع
+  pool_pre_ping (اتصال أغلقه الخادم لا يصل للطلب) و pool_recycle.
+  DB_PGBOUNCER=1 يستخدم NullPool: PgBouncer هو من يجمع الاتصالات، وتجميعها
+  مرتين يحجز اتصالات الخادم دون فائدة.
+- SQLite: WAL (القراءة لا تنتظر الكتابة)، synchronous=NORMAL، mmap_size،
+  و busy_timeout فينتظر الكاتب بدل "database is locked" فوراً.
+
+pool_metrics() ترجع عدد الاتصالات المستخدمة وزمن انتظار الحصول على اتصال.
+
+async_engine / AsyncSessionLocal نسخة async بنفس الإعدادات للمسارات async
+(asyncpg لـ Postgres و aiosqlite لـ SQLite)، فلا يحجز الاستعلام حلقة الأحداث.
+"""
 import os
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool, StaticPool
 
 DATABASE_URL = os.getenv("DATABASE_URL_INTERNAL") or os.getenv("DATABASE_URL") or "sqlite:///./dev.db"
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "").lower() in ("1", "true", "yes")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = threading.Lock()
+
+    def observe_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.timeouts += timed_out
+
+    def checkout(self, *_) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def checkin(self, *_) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            data = {
+                "pool": type(pool).__bases__[0].__name__,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+        if isinstance(pool, QueuePool):
+            data.update(size=pool.size(), idle=pool.checkedin(), overflow=max(0, pool.overflow()), max_overflow=pool._max_overflow)
+        return data
+
+
+def _timed(pool_cls, metrics: PoolMetrics):
+    # الصنف نفسه يحمل المقاييس لأن engine.dispose() ينشئ pool جديداً من نفس الصنف
+    class Timed(pool_cls):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except PoolTimeout:
+                metrics.observe_wait(time.perf_counter() - start, timed_out=True)
+                raise
+            metrics.observe_wait(time.perf_counter() - start)
+            return connection
+
+    Timed.__name__ = Timed.__qualname__ = "Timed" + pool_cls.__name__
+    Timed.metrics = metrics
+    return Timed
+
+
+def _sqlite_pragmas(memory: bool):
+    def on_connect(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        if not memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+    return on_connect
+
+
+def _engine_options(url: str, pgbouncer: bool, metrics: PoolMetrics, queue_pool=QueuePool) -> dict:
+    options: dict = {}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+        # قاعدة في الذاكرة تعيش في اتصال واحد يشاركه الجميع
+        options["poolclass"] = _timed(StaticPool if _is_memory(url) else queue_pool, metrics)
+        if not _is_memory(url):
+            options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    elif pgbouncer:
+        options["poolclass"] = _timed(NullPool, metrics)
+    else:
+        options.update(
+            poolclass=_timed(queue_pool, metrics),
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+    return options
+
+
+def _is_memory(url: str) -> bool:
+    database = make_url(url).database
+    return not database or database == ":memory:" or "mode=memory" in url
+
+
+def _instrument(engine: Engine, url: str, metrics: PoolMetrics) -> None:
+    if url.startswith("sqlite"):
+        event.listen(engine, "connect", _sqlite_pragmas(_is_memory(url)))
+    event.listen(engine, "checkout", metrics.checkout)
+    event.listen(engine, "checkin", metrics.checkin)
+
+
+def create_db_engine(url: str = DATABASE_URL, pgbouncer: bool = DB_PGBOUNCER, **kwargs) -> Engine:
+    """محرك بإعدادات الاتصالات المناسبة للقاعدة؛ kwargs تتجاوز الإعدادات الافتراضية."""
+    metrics = PoolMetrics()
+    engine = create_engine(url, **{**_engine_options(url, pgbouncer, metrics), **kwargs})
+    _instrument(engine, url, metrics)
+    return engine
+
+
+def async_database_url(url: str) -> str:
+    """نفس القاعدة بمشغل async: asyncpg لـ Postgres و aiosqlite لـ SQLite."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: str = DATABASE_URL, pgbouncer: bool = DB_PGBOUNCER, **kwargs) -> AsyncEngine:
+    metrics = PoolMetrics()
+    url = async_database_url(url)
+    options = _engine_options(url, pgbouncer, metrics, queue_pool=AsyncAdaptedQueuePool)
+    if pgbouncer and url.startswith("postgresql+asyncpg"):
+        # PgBouncer (transaction mode) لا يحفظ prepared statements بين المعاملات
+        url = make_url(url).update_query_dict({"prepared_statement_cache_size": "0"}).render_as_string(hide_password=False)
+        options["connect_args"] = {"statement_cache_size": 0}
+    engine = create_async_engine(url, **{**options, **kwargs})
+    _instrument(engine.sync_engine, url, metrics)
+    return engine
+
+
+def pool_metrics(bind: Engine | AsyncEngine | None = None) -> dict:
+    pool = (bind or engine).pool
+    metrics = getattr(type(pool), "metrics", None)
+    return metrics.snapshot(pool) if metrics is not None else {"pool": type(pool).__name__}
+
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
@@ -1,11 +1,15 @@
-from typing import Generator, Optional
+import os
+from collections.abc import AsyncGenerator, Generator
+
+import anyio
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from .database import SessionLocal
-from . import crud, models
 from jose import JWTError, jwt
-import os
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud_async
+from .database import AsyncSessionLocal, SessionLocal
+from .services import user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 SECRET_KEY = os.getenv("SECRET_KEY", "CHANGE_ME_IN_ENV")
@@ -18,7 +22,18 @@ def get_db() -> Generator:
     finally:
         db.close()
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    # للمسارات async: الاستعلام ينتظر دون أن يحجز حلقة الأحداث أو thread
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def _from_cache(fn, *args):
+    # الذاكرة المحلية لا تحجب؛ Redis اتصال شبكة فيُنفَّذ في thread
+    if user_cache.user_cache.shared:
+        return await anyio.to_thread.run_sync(fn, *args)
+    return fn(*args)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -31,7 +46,13 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = crud.get_user_by_email(db, email=email)
+    # المستخدم من الذاكرة المؤقتة إن وُجد؛ القاعدة تُسأل مرة لكل مدة USER_CACHE_TTL
+    user = await _from_cache(user_cache.cached_user, email)
     if user is None:
-        raise credentials_exception
+        user = await crud_async.get_user_by_email(db, email)
+        if user is None:
+            raise credentials_exception
+        await _from_cache(user_cache.remember_user, user)
+    if user.is_active is False:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
     return user
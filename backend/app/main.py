@@ -1,8 +1,24 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.main import api_router
+from app.database import engine
+from app.services.knowledge_uploads import knowledge_indexer
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # مهام فهرسة بقيت من تشغيل سابق تُستأنف دون انتظار أول رفع جديد
+    try:
+        knowledge_indexer.start(engine)
+    except Exception:
+        logging.getLogger(__name__).exception("knowledge indexer did not start")
+    yield
+
 
-app = FastAPI(title="BTEC Smart Platform")
+app = FastAPI(title="BTEC Smart Platform", lifespan=lifespan)
 
 # السماح للجميع (حل جذري لمشكلة الاتصال)
 app.add_middleware(
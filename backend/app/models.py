@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, Text, ForeignKey
+from datetime import datetime
+from sqlalchemy import Column, Index, Integer, BigInteger, String, Boolean, Text, ForeignKey, DateTime, JSON, LargeBinary
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -13,8 +14,10 @@ class User(Base):
 class Course(Base):
     __tablename__ = "courses"
     id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, index=True)
+    title = Column(String, nullable=False, index=True)
     description = Column(Text, nullable=True)
+    # مفتاح ترقيم الصفحات (crud.COURSE_ORDER)؛ title غير NULL فيطابق ترتيب الفهرس الافتراضي
+    __table_args__ = (Index("ix_courses_title_id", "title", "id"),)
 
 class Lesson(Base):
     __tablename__ = "lessons"
@@ -30,3 +33,80 @@ class Submission(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     lesson_id = Column(Integer, ForeignKey("lessons.id"))
     filename = Column(String)
+    content_text = Column(Text, nullable=True)
+
+class KnowledgeItem(Base):
+    __tablename__ = "knowledgeitem"
+    id = Column(Integer, primary_key=True, index=True)
+    content = Column(Text)
+    source_file = Column(String, nullable=False, index=True)
+    source_path = Column(String, nullable=True, index=True)
+    folder = Column(String, nullable=True)
+    page = Column(Integer, nullable=True)
+    slide = Column(Integer, nullable=True)
+    section = Column(String, nullable=True)
+    chunk_index = Column(Integer, nullable=True)
+    category = Column(String, nullable=True)
+    metadata_info = Column(JSON, nullable=True, default=dict)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class IngestManifestEntry(Base):
+    __tablename__ = "ingest_manifest"
+    path = Column(String, primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    mtime_ns = Column(BigInteger, nullable=False)
+    sha256 = Column(String(64), nullable=False, index=True)
+    items = Column(Integer, nullable=False, default=0)
+    ingested_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class SubmissionFingerprint(Base):
+    __tablename__ = "submission_fingerprint"
+    submission_id = Column(Integer, ForeignKey("submissions.id"), primary_key=True)
+    lesson_id = Column(Integer, nullable=True, index=True)
+    content_sha256 = Column(String(64), nullable=False)
+    shingles = Column(Integer, nullable=False, default=0)
+    signature = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=True, index=True)
+
+class UserFile(Base):
+    __tablename__ = "user_file"
+    id = Column(String, primary_key=True)
+    owner_id = Column(String, nullable=False, index=True)
+    original_filename = Column(String, nullable=False)
+    stored_path = Column(String, nullable=False)
+    content_type = Column(String, nullable=True)
+    size = Column(BigInteger, nullable=True)
+    sha256 = Column(String(64), nullable=True, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class FileBlob(Base):
+    __tablename__ = "file_blob"
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    released_at = Column(DateTime, nullable=True, index=True)
+
+class UploadSession(Base):
+    __tablename__ = "upload_session"
+    id = Column(String, primary_key=True)
+    owner_id = Column(String, nullable=False, index=True)
+    filename = Column(String, nullable=False)
+    content_type = Column(String, nullable=True)
+    length = Column(BigInteger, nullable=False)
+    offset = Column(BigInteger, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    claimed_by = Column(String, nullable=True)
+    claimed_until = Column(DateTime, nullable=True)
+
+class KnowledgeUploadJob(Base):
+    __tablename__ = "knowledge_upload_job"
+    file_id = Column(String, primary_key=True)
+    status = Column(String(16), nullable=False, default="queued", index=True)
+    items = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
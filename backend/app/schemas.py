@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Generic, Optional, List, TypeVar
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -27,5 +27,26 @@ class CourseOut(BaseModel):
     class Config:
         orm_mode = True
 
+class LessonSummary(BaseModel):
+    id: int
+    title: Optional[str] = None
+
+class CatalogCourse(BaseModel):
+    id: int
+    title: Optional[str] = None
+    description: Optional[str] = None
+    lessons: List[LessonSummary] = []
+
+class Catalog(BaseModel):
+    courses: List[CatalogCourse]
+
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    data: List[T]
+    # يُرسل في after لجلب الصفحة التالية؛ None في آخر صفحة
+    next_cursor: Optional[str] = None
+    estimated_total: Optional[int] = None
+
 class ChatIn(BaseModel):
     q: str
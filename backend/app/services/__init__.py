@@ -0,0 +1 @@
+# package for domain services used by the api routers
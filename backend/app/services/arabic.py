@@ -0,0 +1,103 @@
+"""
+تطبيع النص العربي وتقسيمه إلى كلمات، مشترك بين البحث والتقييم وقواعد المعلم.
+
+التطبيع (سلسلة str.replace، كل منها مسح C سريع):
+- أ إ آ ٱ => ا ، ى => ي ، ؤ => و ، ئ => ي ، ة => ه
+- حذف التشكيل (الفتحة، الضمة، الشدة، السكون، ...) والتطويل (ـ)
+- الأرقام العربية-الهندية والفارسية => 0-9 ، ک ی الفارسيتان => ك ي
+- تحويل الحروف اللاتينية إلى صغيرة
+
+التجذيع (stemming) خفيف على طريقة Light10: حذف السوابق (ال، وال، بال، ...)
+واللواحق (ها، ات، ون، ...) دون قاموس جذور، ونتيجته محفوظة لكل كلمة (lru_cache)
+لأن الكلمات نفسها تتكرر باستمرار.
+"""
+import re
+from functools import lru_cache
+
+# يتغير عند تغيير قواعد التطبيع أو التجذيع، حتى تُعاد بناء الفهارس المحفوظة
+TOKENIZER_VERSION = 1
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how i in is it of on or the to what when where which who why with "
+    "في من على إلى الى عن ما ماذا هل كيف لماذا متى هو هي هذا هذه ذلك التي الذي و او أو مع".split()
+)
+
+_DIACRITICS = [chr(c) for c in range(0x064B, 0x0653)] + ["ٰ"] + [chr(c) for c in range(0x06D6, 0x06EE)]
+# حرف => بديله (None للحذف)؛ عام لأن فهرس Postgres النصي يطبق الجدول نفسه بـ translate()
+CHARACTER_MAP: dict[str, str | None] = {
+    **dict.fromkeys(_DIACRITICS),
+    "ـ": None,  # تطويل
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ؤ": "و", "ئ": "ي", "ة": "ه",
+    "ک": "ك", "ی": "ي",
+    **{chr(0x0660 + d): str(d) for d in range(10)},
+    **{chr(0x06F0 + d): str(d) for d in range(10)},
+}
+_REPLACEMENTS = tuple(CHARACTER_MAP.items())
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_ARABIC_RE = re.compile(r"[؀-ۿ]")
+
+_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+_SUFFIXES = ("ها", "ان", "ات", "ون", "ين", "يه", "ه", "ي")
+
+
+def normalize(text: str) -> str:
+    # str.translate يبحث في القاموس حرفاً حرفاً؛ replace لكل حرف موجود فعلاً أسرع بعدة مرات
+    text = text or ""
+    for old, new in _REPLACEMENTS:
+        if old in text:
+            text = text.replace(old, new or "")
+    return text.lower()
+
+
+_NORMALIZED_STOPWORDS = frozenset(normalize(w) for w in STOPWORDS)
+
+
+@lru_cache(maxsize=262_144)
+def stem(token: str) -> str:
+    """تجذيع خفيف لكلمة مطبَّعة. الكلمات غير العربية تُرجع كما هي."""
+    if not _ARABIC_RE.match(token):
+        return token
+    if len(token) >= 4 and token[0] == "و":
+        token = token[1:]
+    for prefix in _PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+            token = token[len(prefix):]
+            break
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            token = token[: -len(suffix)]
+    return token
+
+
+# كلمة مطبَّعة => ناتج تقسيمها النهائي ("" للكلمات الشائعة المحذوفة)
+_TERMS: dict[str, str] = {}
+_TERMS_MAX = 500_000
+
+
+def _term(token: str) -> str:
+    if len(_TERMS) >= _TERMS_MAX:
+        _TERMS.clear()
+    term = _TERMS[token] = "" if token in _NORMALIZED_STOPWORDS else stem(token)
+    return term
+
+
+def tokenize(text: str, stemming: bool = True, stopwords: bool = True) -> list[str]:
+    """كلمات مطبَّعة (ومجذَّعة) بعد حذف الكلمات الشائعة."""
+    tokens = _TOKEN_RE.findall(normalize(text))
+    if stemming and stopwords:
+        # المسار الأكثر استخداماً: بحث واحد في القاموس لكل كلمة
+        get = _TERMS.get
+        terms = []
+        for token in tokens:
+            term = get(token)
+            if term is None:
+                term = _term(token)
+            if term:
+                terms.append(term)
+        return terms
+    if stopwords:
+        tokens = [t for t in tokens if t not in _NORMALIZED_STOPWORDS]
+    if stemming:
+        tokens = [stem(t) for t in tokens]
+    return tokens
@@ -0,0 +1,109 @@
+"""
+محرك تقييم أسئلة BTEC.
+
+يحسب صعوبة السؤال بشكل حتمي (نفس المدخلات => نفس النتيجة) من:
+- أفعال الأمر (command verbs) ومستواها في معايير Pass / Merit / Distinction
+- مستوى الطالب (L1 / L2 / L3)
+- وجود سيناريو عملي وطول الصياغة
+
+كل الحسابات في الذاكرة ولا تستغرق سوى ميكروثوانٍ، لذلك يمكن استدعاؤها
+مباشرة من داخل مسار async دون حجب حلقة الأحداث.
+"""
+import re
+import zlib
+from functools import lru_cache
+
+from .arabic import normalize
+
+# أفعال الأمر مرتبة حسب مستوى المعيار (1 = Pass, 2 = Merit, 3 = Distinction)
+COMMAND_VERBS = {
+    1: (
+        "describe", "identify", "outline", "state", "list", "define", "name", "give",
+        "صف", "اذكر", "عدد", "حدد", "عرف", "اكتب",
+    ),
+    2: (
+        "explain", "analyse", "analyze", "compare", "discuss", "examine", "illustrate",
+        "اشرح", "وضح", "حلل", "قارن", "ناقش", "افحص",
+    ),
+    3: (
+        "evaluate", "justify", "assess", "critically", "recommend", "judge", "critique",
+        "قيم", "برر", "انقد", "اقترح", "احكم",
+    ),
+}
+
+SCENARIO_HINTS = (
+    "scenario", "case study", "company", "business", "organisation", "organization", "client",
+    "سيناريو", "دراسة حالة", "شركة", "مؤسسة", "عميل",
+)
+
+LEVEL_WEIGHT = {1: -1, 2: 0, 3: 1}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_LEVEL_RE = re.compile(r"(\d)")
+_VERB_TIER = {normalize(verb): tier for tier, verbs in COMMAND_VERBS.items() for verb in verbs}
+_SCENARIO_HINTS = tuple(normalize(hint) for hint in SCENARIO_HINTS)
+
+
+def _parse_level(level: str) -> int:
+    match = _LEVEL_RE.search(level or "")
+    if not match:
+        return 2
+    return min(max(int(match.group(1)), 1), 3)
+
+
+def _verb_tier(tokens: list[str]) -> int:
+    tiers = [_VERB_TIER[t] for t in tokens if t in _VERB_TIER]
+    return max(tiers) if tiers else 0
+
+
+def _pick(options: list[str], key: str) -> str:
+    # اختيار ثابت (بدلاً من random.choice) حتى يعطي نفس السؤال نفس النصيحة دائماً
+    return options[zlib.crc32(key.encode("utf-8")) % len(options)]
+
+
+@lru_cache(maxsize=4096)
+def _score(question: str, level: str) -> tuple[int, int, bool, int]:
+    text = normalize(question)
+    tokens = _TOKEN_RE.findall(text)
+    tier = _verb_tier(tokens)
+    has_scenario = any(hint in text for hint in _SCENARIO_HINTS)
+    level_num = _parse_level(level)
+
+    score = 3 + 2 * tier
+    score += LEVEL_WEIGHT[level_num]
+    if has_scenario:
+        score += 1
+    if len(tokens) >= 25:
+        score += 1
+    elif len(tokens) < 6:
+        score -= 1
+    return min(max(score, 1), 10), tier, has_scenario, level_num
+
+
+def assess_question(question: str, level: str, major: str) -> dict:
+    """تقييم سؤال واحد وإرجاع درجة الصعوبة مع نصيحة مناسبة."""
+    score, tier, has_scenario, level_num = _score(question, level)
+    key = f"{major}|{level}|{question}"
+
+    if tier == 0:
+        advice = _pick([
+            f"الصياغة تحتاج لبعض التدقيق اللغوي لتكون أوضح لطلاب {major} في مستوى {level}. تأكد من تحديد المطلوب بدقة لتجنب الإجابات العامة.",
+            f"لم يتم العثور على فعل أمر واضح. ابدأ السؤال بفعل مثل 'صف' أو 'اشرح' ليعرف طلاب {major} المطلوب بدقة.",
+        ], key)
+    elif tier < level_num and tier < 3:
+        advice = _pick([
+            f"السؤال جيد ويغطي جوانب مهمة في {major}، ولكن يفضل استخدام أفعال مثل 'حلل' أو 'قيّم' لرفع مستوى التحدي للطلاب.",
+            f"بناءً على معايير BTEC لمستوى {level}، يعتبر السؤال مباشراً جداً. استخدم فعلاً من مستوى Merit أو Distinction في أسئلة {major}.",
+        ], key)
+    elif not has_scenario:
+        advice = f"بناءً على معايير BTEC لمستوى {level}، حاول ربط السؤال بسيناريو عملي (Scenario-based) في مجال {major} ليكون أكثر فاعلية."
+    else:
+        advice = f"السؤال ممتاز وواضح لطلاب {major}، والكلمات المفتاحية دقيقة. يمكن تحسينه بإضافة جزء يطلب من الطالب تبرير إجابته."
+
+    return {
+        "question": question,
+        "level": level,
+        "major": major,
+        "difficulty_score": score,
+        "advice": advice,
+    }
@@ -0,0 +1,183 @@
+"""
+تفريغ الملفات الصوتية إلى نص باستخدام Whisper.
+
+المكتبة والنموذج يُحمَّلان عند أول تفريغ فقط (مرة واحدة لكل عملية)، فلا تتأثر
+سرعة تشغيل أي عملية تستورد هذا الملف دون أن تفرّغ صوتاً.
+
+للتسجيلات الطويلة (عروض شفوية 20 دقيقة) يوجد وضع متدفق transcribe_stream:
+الصوت يُفك ترميزه على دفعات ويُقسَّم إلى نوافذ تنتهي عند فترات الصمت، وكل نافذة
+تُفرَّغ وتُرجع فور انتهائها، فلا يبقى في الذاكرة أكثر من نافذة واحدة.
+"""
+import os
+import subprocess
+import threading
+import wave
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "en")
+
+SAMPLE_RATE = 16000  # ما يتوقعه Whisper
+FRAME_SECONDS = 0.03
+READ_SECONDS = 1.0
+# Whisper يفك 30 ثانية في كل تمريرة، فالنافذة الأطول تُقسم داخلياً على أي حال
+MAX_WINDOW_SECONDS = float(os.getenv("TRANSCRIBE_MAX_WINDOW", "30"))
+MIN_WINDOW_SECONDS = float(os.getenv("TRANSCRIBE_MIN_WINDOW", "5"))
+MIN_SILENCE_SECONDS = 0.5
+VAD_THRESHOLD_DB = float(os.getenv("TRANSCRIBE_VAD_THRESHOLD_DB", "-40"))
+
+_model = None
+_model_error: Exception | None = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    global _model, _model_error
+    if _model is None and _model_error is None:
+        with _model_lock:
+            if _model is None and _model_error is None:
+                try:
+                    import whisper
+
+                    _model = whisper.load_model(WHISPER_MODEL, device="cpu")
+                except Exception as e:
+                    _model_error = e
+    if _model is None:
+        raise RuntimeError("Whisper is not installed or model failed to load; audio transcription unavailable") from _model_error
+    return _model
+
+
+def transcribe_audio(audio: str | np.ndarray, language: str | None = WHISPER_LANGUAGE, prompt: str | None = None) -> str:
+    """Transcribe an audio file (or a float32 16 kHz mono array) using Whisper if available.
+
+    If Whisper is not installed or the model failed to load, this raises
+    a RuntimeError to indicate transcription is unavailable.
+    """
+    result = get_model().transcribe(audio, language=language, initial_prompt=prompt, fp16=False)
+    return result.get("text", "")
+
+
+def read_pcm(file_path: str, chunk_seconds: float = READ_SECONDS) -> Iterator[np.ndarray]:
+    """فك ترميز الملف على دفعات float32 أحادية 16kHz دون تحميله كاملاً."""
+    chunk = int(SAMPLE_RATE * chunk_seconds)
+    try:
+        wav = wave.open(file_path, "rb")
+    except (wave.Error, EOFError):
+        wav = None
+    if wav is not None and wav.getframerate() == SAMPLE_RATE and wav.getsampwidth() == 2:
+        # WAV جاهز بالصيغة المطلوبة: قراءة مباشرة بلا ffmpeg
+        with wav:
+            channels = wav.getnchannels()
+            while data := wav.readframes(chunk):
+                samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+                yield samples.reshape(-1, channels).mean(axis=1) if channels > 1 else samples
+        return
+    if wav is not None:
+        wav.close()
+
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", file_path, "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"]
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError as e:
+        raise RuntimeError("ffmpeg is required to decode this audio format") from e
+    try:
+        while data := proc.stdout.read(chunk * 2):
+            yield np.frombuffer(data[: len(data) // 2 * 2], dtype="<i2").astype(np.float32) / 32768.0
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to decode audio: {proc.stderr.read().decode(errors='ignore').strip()}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def speech_windows(
+    pcm: Iterable[np.ndarray],
+    sample_rate: int = SAMPLE_RATE,
+    max_seconds: float = MAX_WINDOW_SECONDS,
+    min_seconds: float = MIN_WINDOW_SECONDS,
+    min_silence: float = MIN_SILENCE_SECONDS,
+    threshold_db: float = VAD_THRESHOLD_DB,
+) -> Iterator[tuple[float, np.ndarray]]:
+    """تقسيم الصوت إلى نوافذ (بداية بالثواني، العينات) حدودها فترات صمت.
+
+    النافذة تُقطع في منتصف أول صمت لا يقل عن min_silence بعد min_seconds، أو عند
+    أهدأ إطار في نصفها الثاني إذا بلغت max_seconds دون صمت. النوافذ الصامتة
+    بالكامل لا تُرجع (لا داعي لتمريرها على النموذج).
+    """
+    frame = int(sample_rate * FRAME_SECONDS)
+    max_frames = max(1, int(max_seconds / FRAME_SECONDS))
+    min_frames = min(max_frames, int(min_seconds / FRAME_SECONDS))
+    silence_frames = max(1, int(min_silence / FRAME_SECONDS))
+    threshold = 10 ** (threshold_db / 20)
+
+    # المخزن لا يتجاوز نافذة واحدة + دفعة قراءة واحدة
+    buffer = np.empty(0, dtype=np.float32)
+    energy = np.empty(0, dtype=np.float32)
+    consumed = 0  # عدد العينات التي خرجت من المخزن (لحساب التوقيت)
+
+    def cut_point(final: bool) -> int | None:
+        if not len(energy):
+            return None
+        silent = (energy <= threshold).astype(np.int32)
+        # quiet[i] = عدد الإطارات الصامتة في [i, i + silence_frames)
+        quiet = np.convolve(silent, np.ones(silence_frames, dtype=np.int32), mode="full")[silence_frames - 1:len(silent)]
+        cuts = np.flatnonzero(quiet == silence_frames) + silence_frames // 2
+        cuts = cuts[cuts >= max(min_frames, 1)]
+        if len(cuts) and cuts[0] <= max_frames:
+            return int(cuts[0])
+        if len(energy) >= max_frames:
+            half = max_frames // 2
+            return int(half + np.argmin(energy[half:max_frames]) + 1)
+        return len(energy) if final and len(energy) else None
+
+    def skip_leading_silence() -> None:
+        # الصمت قبل أول كلام يُرمى مباشرة (مع هامش صغير) فلا يُمرَّر على النموذج
+        nonlocal buffer, energy, consumed
+        voiced = np.flatnonzero(energy > threshold)
+        drop = (voiced[0] if len(voiced) else len(energy)) - silence_frames // 2
+        if drop > 0:
+            buffer, energy = buffer[drop * frame:].copy(), energy[drop:].copy()
+            consumed += drop * frame
+
+    def emit(frames: int):
+        nonlocal buffer, energy, consumed
+        samples = frames * frame if frames < len(energy) else len(buffer)
+        window, start = buffer[:samples], consumed
+        has_speech = bool((energy[:frames] > threshold).any())
+        buffer, energy = buffer[samples:].copy(), energy[frames:].copy()
+        consumed += samples
+        return (start / sample_rate, window) if has_speech else None
+
+    for chunk in pcm:
+        buffer = np.concatenate([buffer, np.asarray(chunk, dtype=np.float32)])
+        complete = len(buffer) // frame
+        if complete > len(energy):
+            frames = buffer[len(energy) * frame:complete * frame].reshape(-1, frame)
+            energy = np.concatenate([energy, np.sqrt(np.mean(frames * frames, axis=1))])
+        skip_leading_silence()
+        while (cut := cut_point(final=False)) is not None:
+            if (window := emit(cut)) is not None:
+                yield window
+
+    if len(buffer) % frame:
+        # الإطار الأخير الناقص
+        tail = buffer[len(energy) * frame:]
+        energy = np.append(energy, np.sqrt(np.mean(tail * tail)))
+    skip_leading_silence()
+    while (cut := cut_point(final=True)) is not None:
+        if (window := emit(cut)) is not None:
+            yield window
+
+
+def transcribe_stream(file_path: str, language: str | None = WHISPER_LANGUAGE) -> Iterator[dict]:
+    """تفريغ متدفق: يُرجع مقطعاً {index, start, end, text} بعد كل نافذة."""
+    previous = ""
+    for index, (start, window) in enumerate(speech_windows(read_pcm(file_path))):
+        # آخر جملة من النافذة السابقة كسياق يحافظ على تتابع الكلمات بين النوافذ
+        text = transcribe_audio(window, language=language, prompt=previous[-200:] or None).strip()
+        previous = text or previous
+        yield {"index": index, "start": round(start, 2), "end": round(start + len(window) / SAMPLE_RATE, 2), "text": text}
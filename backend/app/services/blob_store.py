@@ -0,0 +1,150 @@
+"""
+مخزن ملفات يعتمد على المحتوى (content-addressable).
+
+كل ملف يُخزَّن مرة واحدة باسم بصمته SHA-256 في مجلدات مقسمة
+(blobs/ab/cd/abcd...)، وصفوف user_file تشير إليه. عندما يرفع صف كامل نفس
+الملف لا يُحفظ على القرص إلا نسخة واحدة.
+
+عدّاد المراجع في جدول file_blob: الرفع يزيده والحذف ينقصه. الملف لا يُحذف
+فوراً عند وصول العداد للصفر؛ collect_garbage تحذفه بعد مهلة (grace) لتبقى
+الروابط القائمة صالحة وتُعاد الاستفادة منه إذا رُفع مجدداً.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models import FileBlob, IngestManifestEntry, KnowledgeItem, UserFile
+from .ingest_manifest import normalize_path
+
+GC_GRACE_SECONDS = int(os.getenv("UPLOAD_GC_GRACE_SECONDS", "3600"))
+
+
+class BlobStore:
+    def __init__(self, directory: str):
+        self.root = os.path.join(directory, "blobs")
+        self.tmp_dir = os.path.join(directory, "tmp")
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def acquire(self, db: Session, tmp_path: str, sha256: str, size: int) -> bool:
+        """إضافة مرجع للبصمة ونقل الملف المؤقت إلى مكانه إن لم يكن موجوداً.
+
+        لا يُنفّذ commit؛ المرجع وصف user_file يُحفظان في نفس المعاملة.
+        يرجع True إذا كان المحتوى جديداً (لم يكن مخزناً من قبل).
+        """
+        # تحديث الصف أولاً يقفله، فلا يحذف collect_garbage الملف أثناء الرفع
+        bumped = db.execute(
+            update(FileBlob).where(FileBlob.sha256 == sha256).values(refcount=FileBlob.refcount + 1, released_at=None)
+        ).rowcount
+        if not bumped:
+            try:
+                with db.begin_nested():
+                    db.add(FileBlob(sha256=sha256, size=size, refcount=1, created_at=datetime.utcnow()))
+            except IntegrityError:
+                # رفع متزامن لنفس المحتوى أضاف الصف قبلنا
+                db.execute(update(FileBlob).where(FileBlob.sha256 == sha256).values(refcount=FileBlob.refcount + 1, released_at=None))
+        path = self.path(sha256)
+        if os.path.exists(path):
+            _remove(tmp_path)
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return True
+
+    def release(self, db: Session, sha256: str) -> None:
+        db.execute(
+            update(FileBlob)
+            .where(FileBlob.sha256 == sha256)
+            .values(
+                refcount=FileBlob.refcount - 1,
+                # وقت وصول العداد للصفر يبدأ مهلة الحذف
+                released_at=case((FileBlob.refcount <= 1, datetime.utcnow()), else_=None),
+            )
+        )
+
+    def collect_garbage(self, db: Session, grace_seconds: int = GC_GRACE_SECONDS) -> dict:
+        """حذف الملفات التي لا يشير إليها أحد منذ أكثر من grace_seconds."""
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        stats = {"blobs": 0, "bytes": 0, "orphans": 0, "temp": 0}
+
+        expired = db.execute(
+            select(FileBlob.sha256, FileBlob.size).where(FileBlob.refcount <= 0, FileBlob.released_at < cutoff)
+        ).all()
+        for sha256, size in expired:
+            # الحذف مشروط بالعداد مرة أخرى: رفع جديد بعد الاستعلام يلغيه
+            deleted = db.execute(delete(FileBlob).where(FileBlob.sha256 == sha256, FileBlob.refcount <= 0)).rowcount
+            if deleted:
+                path = self.path(sha256)
+                # مقاطع قاعدة المعرفة المستخرجة من هذا الملف (knowledge_uploads) تُحذف معه
+                key = normalize_path(path)
+                db.execute(delete(KnowledgeItem).where(KnowledgeItem.source_path == key))
+                db.execute(delete(IngestManifestEntry).where(IngestManifestEntry.path == key))
+                _remove(path)
+                stats["blobs"] += 1
+                stats["bytes"] += size or 0
+            db.commit()
+
+        # ملفات بلا صف (تعطل بين النقل والـ commit) وملفات مؤقتة لرفع لم يكتمل
+        old = time.time() - grace_seconds
+        for shard in _listdir(self.root):
+            known = set(db.execute(select(FileBlob.sha256).where(FileBlob.sha256.like(f"{shard}%"))).scalars())
+            for sub in _listdir(os.path.join(self.root, shard)):
+                folder = os.path.join(self.root, shard, sub)
+                for name in _listdir(folder):
+                    path = os.path.join(folder, name)
+                    if name not in known and _mtime(path) < old:
+                        _remove(path)
+                        stats["orphans"] += 1
+        for name in _listdir(self.tmp_dir):
+            path = os.path.join(self.tmp_dir, name)
+            # ملفات الرفع القابل للاستئناف لها مدة صلاحية خاصة (expire_sessions)
+            if not name.endswith(".upload") and _mtime(path) < old:
+                _remove(path)
+                stats["temp"] += 1
+        return stats
+
+
+def dedup_stats(db: Session) -> dict:
+    """الحجم المنطقي (كل ملفات المستخدمين) مقابل الحجم المخزن فعلاً."""
+    files, logical = db.execute(
+        select(func.count(UserFile.id), func.coalesce(func.sum(UserFile.size), 0)).where(
+            UserFile.sha256.in_(select(FileBlob.sha256))
+        )
+    ).one()
+    blobs, stored = db.execute(
+        select(func.count(FileBlob.sha256), func.coalesce(func.sum(FileBlob.size), 0)).where(FileBlob.refcount > 0)
+    ).one()
+    return {
+        "files": files,
+        "blobs": blobs,
+        "logical_bytes": logical,
+        "stored_bytes": stored,
+        "saved_bytes": logical - stored,
+        "dedup_ratio": round(logical / stored, 3) if stored else 1.0,
+    }
+
+
+def _listdir(path: str) -> list[str]:
+    try:
+        return sorted(os.listdir(path))
+    except OSError:
+        return []
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return time.time()
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
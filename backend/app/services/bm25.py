@@ -0,0 +1,118 @@
+"""
+فهرس BM25 مقلوب (inverted index) لمقاطع قاعدة المعرفة.
+
+يُبنى عند السحب (ingest) ويُحفظ بجانب قاعدة البيانات كمصفوفات NumPy بصيغة CSR:
+لكل كلمة قائمة المقاطع التي تحتويها وعدد مرات ظهورها. عند الاستعلام تُحمَّل
+المصفوفات مرة واحدة وتُشارك بين كل الطلبات، والترتيب جمع متجهي لدرجات
+الكلمات دون أي قراءة من قاعدة البيانات.
+"""
+import os
+from collections import Counter
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models import KnowledgeItem
+from .arabic import TOKENIZER_VERSION, tokenize
+from .vector_index import default_index_path
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class BM25Index:
+    def __init__(self, ids: np.ndarray, doc_len: np.ndarray, terms: np.ndarray, indptr: np.ndarray, rows: np.ndarray, tfs: np.ndarray):
+        self.ids = ids
+        self.doc_len = doc_len
+        self.terms = terms
+        self.indptr = indptr
+        self.rows = rows
+        self.tfs = tfs
+        self.vocab = {term: i for i, term in enumerate(terms.tolist())}
+        avg = float(doc_len.mean()) if len(doc_len) else 1.0
+        # مقام BM25 الثابت لكل مقطع يُحسب مرة واحدة
+        self._norm = (BM25_K1 * (1 - BM25_B + BM25_B * doc_len / max(avg, 1e-9))).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, docs) -> "BM25Index":
+        """docs: (id, text) لكل مقطع."""
+        ids, lengths = [], []
+        postings: dict[str, tuple[list[int], list[int]]] = {}
+        for row, (doc_id, text) in enumerate(docs):
+            tokens = tokenize(text)
+            ids.append(doc_id)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                entry = postings.get(term)
+                if entry is None:
+                    entry = postings[term] = ([], [])
+                entry[0].append(row)
+                entry[1].append(tf)
+        terms = sorted(postings)
+        sizes = np.fromiter((len(postings[t][0]) for t in terms), dtype=np.int64, count=len(terms))
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=indptr[1:])
+        rows = np.empty(indptr[-1], dtype=np.int32)
+        tfs = np.empty(indptr[-1], dtype=np.float32)
+        for i, term in enumerate(terms):
+            rows[indptr[i]:indptr[i + 1]] = postings[term][0]
+            tfs[indptr[i]:indptr[i + 1]] = postings[term][1]
+        return cls(
+            np.asarray(ids, dtype=np.int64), np.asarray(lengths, dtype=np.float32),
+            np.asarray(terms, dtype=str), indptr, rows, tfs,
+        )
+
+    def save(self, path: str) -> None:
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f, ids=self.ids, doc_len=self.doc_len, terms=self.terms, indptr=self.indptr, rows=self.rows, tfs=self.tfs,
+                tokenizer=np.int64(TOKENIZER_VERSION),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index | None":
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if "tokenizer" not in data or int(data["tokenizer"]) != TOKENIZER_VERSION:
+                return None  # بُني بتقسيم كلمات مختلف؛ يُعاد بناؤه عند ingest التالي
+            return cls(data["ids"], data["doc_len"], data["terms"], data["indptr"], data["rows"], data["tfs"])
+
+    def search(self, query: str, k: int = 10) -> list[tuple[int, float]]:
+        """أفضل k مقاطع: [(knowledge_id, score), ...]."""
+        cols = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not cols or not len(self):
+            return []
+        n = len(self)
+        scores = np.zeros(n, dtype=np.float32)
+        for col in cols:
+            start, end = self.indptr[col], self.indptr[col + 1]
+            rows, tf = self.rows[start:end], self.tfs[start:end]
+            idf = np.log(1 + (n - (end - start) + 0.5) / ((end - start) + 0.5))
+            # كل مقطع يظهر مرة واحدة في قائمة الكلمة، فالجمع المباشر آمن
+            scores[rows] += idf * tf * (BM25_K1 + 1) / (tf + self._norm[rows])
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[r]), float(scores[r])) for r in top if scores[r] > 0]
+
+
+def default_bm25_path(engine) -> str:
+    """knowledge.db => knowledge.bm25.npz"""
+    return os.path.splitext(default_index_path(engine))[0] + ".bm25.npz"
+
+
+def build_bm25_index(session: Session, path: str, batch_size: int = 5000) -> BM25Index:
+    """إعادة بناء الفهرس من جدول knowledgeitem وحفظه."""
+    rows = session.execute(
+        select(KnowledgeItem.id, KnowledgeItem.content).order_by(KnowledgeItem.id).execution_options(yield_per=batch_size)
+    )
+    index = BM25Index.build((r.id, r.content) for r in rows)
+    index.save(path)
+    return index
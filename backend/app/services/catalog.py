@@ -0,0 +1,88 @@
+"""
+فهرس المقررات مع دروسها (/courses/catalog)، أكثر صفحة تُطلب في بداية كل فصل.
+
+- المقررات والدروس تُجلب باستعلامين ثابتين (selectinload) بدل استعلام لكل
+  مقرر عبر Lesson.course / Course.lessons الكسولة.
+- النتيجة تُحوَّل إلى JSON مرة واحدة وتُحفظ كبايتات في الذاكرة، فكل طلب بعدها
+  لا يلمس القاعدة ولا Pydantic.
+- أي كتابة على courses أو lessons عبر ORM (جلسة sync أو async) تُبطل النسخة
+  عند الـ commit. العمليات الأخرى تبطل نسختها بعد CATALOG_CACHE_TTL ثانية.
+- طلبات متزامنة بعد الإبطال تنتظر بناءً واحداً بدل أن تبني كلها.
+"""
+import asyncio
+import os
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from .. import schemas
+from ..database import AsyncSessionLocal
+from ..models import Course, Lesson
+from .write_events import on_commit_writes
+
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+
+
+async def load_catalog(db: AsyncSession) -> bytes:
+    courses = (
+        await db.execute(select(Course).options(selectinload(Course.lessons)).order_by(Course.title, Course.id))
+    ).scalars().all()
+    catalog = [
+        schemas.CatalogCourse(
+            id=course.id,
+            title=course.title,
+            description=course.description,
+            lessons=[schemas.LessonSummary(id=lesson.id, title=lesson.title) for lesson in sorted(course.lessons, key=lambda lesson: lesson.id)],
+        )
+        for course in courses
+    ]
+    return schemas.Catalog(courses=catalog).model_dump_json().encode()
+
+
+class CatalogCache:
+    def __init__(self, session_factory=AsyncSessionLocal, ttl: float = CATALOG_CACHE_TTL, loader=load_catalog, clock=time.monotonic):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.loader = loader
+        self.clock = clock
+        self.body: bytes | None = None
+        self._expires = 0.0
+        self._generation = 0
+        self._building: asyncio.Task | None = None
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.body = None
+
+    def fresh(self) -> bool:
+        return self.body is not None and self.clock() < self._expires
+
+    async def get(self) -> bytes:
+        if self.fresh():
+            return self.body
+        task = self._building
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = self._building = asyncio.ensure_future(self._build())
+        # انقطاع أحد المنتظرين لا يلغي البناء الذي ينتظره الآخرون
+        return await asyncio.shield(task)
+
+    async def _build(self) -> bytes:
+        generation = self._generation
+        # جلسة خاصة بالبناء، لا جلسة الطلب الذي بدأه
+        async with self.session_factory() as db:
+            body = await self.loader(db)
+        with self._lock:
+            # كتابة حدثت أثناء البناء: النتيجة تُرجع لهذا الطلب ولا تُحفظ
+            if generation == self._generation:
+                self.body = body
+                self._expires = self.clock() + self.ttl
+        return body
+
+
+catalog_cache = CatalogCache()
+on_commit_writes((Course.__table__, Lesson.__table__), catalog_cache.invalidate)
@@ -0,0 +1,138 @@
+"""
+تقسيم النصوص إلى مقاطع (passages) محدودة الحجم ومتداخلة.
+
+التقسيم يحترم حدود النص بالترتيب: العناوين ثم الفقرات ثم الجمل، ولا يقطع
+داخل الكلمة إلا إذا كانت "الجملة" نفسها أطول من الحد. علامات الترقيم العربية
+(؟ ؛ ۔) معتبرة كنهاية جملة مثل الإنجليزية.
+
+كل مقطع يبدأ بآخر جزء من المقطع السابق (overlap) حتى لا تضيع الفكرة
+الموزعة على حدّين.
+"""
+import os
+import re
+from dataclasses import dataclass
+
+from .arabic import normalize
+
+CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", "1200"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?؟؛۔…])\s+|\n")
+_NUMBERED_HEADING_RE = re.compile(r"^(\d+(\.\d+)*|[A-Z]\d+|unit\s+\d+|الوحده\s+\S+|الفصل\s+\S+|الدرس\s+\S+)[\s.:)-]", re.IGNORECASE)
+_END_PUNCTUATION = ".!?؟؛,،:;"
+
+
+@dataclass
+class Chunk:
+    text: str
+    index: int
+    heading: str | None = None
+
+
+def is_heading(line: str) -> bool:
+    line = line.strip()
+    if not line or len(line) > 80 or line[-1] in _END_PUNCTUATION:
+        return False
+    if _NUMBERED_HEADING_RE.match(normalize(line)) or line.startswith("#"):
+        return True
+    # سطر بأحرف كبيرة كله (UNIT ONE)؛ العربية بلا أحرف كبيرة فلا تُعد عنواناً بهذه القاعدة
+    letters = [c for c in line if c.isalpha() and c.isascii()]
+    return len(letters) >= 3 and all(c.isupper() for c in letters)
+
+
+def _blocks(text: str):
+    """(heading, paragraph) بالترتيب. العنوان يبقى فعالاً حتى يظهر عنوان آخر.
+
+    كل عنوان يُرسل أولاً مع فقرة فارغة، حتى لا يضيع عنوان بلا فقرات بعده.
+    """
+    heading = None
+    for raw in _PARAGRAPH_RE.split(text):
+        lines = [line for line in raw.strip().splitlines() if line.strip()]
+        body: list[str] = []
+        for line in lines:
+            if is_heading(line):
+                if body:
+                    yield heading, "\n".join(body)
+                    body = []
+                heading = line.strip().lstrip("#").strip()
+                yield heading, ""
+            else:
+                body.append(line.strip())
+        if body:
+            yield heading, "\n".join(body)
+
+
+def _sentences(paragraph: str, max_chars: int) -> list[str]:
+    sentences: list[str] = []
+    for sentence in _SENTENCE_RE.split(paragraph):
+        sentence = sentence.strip()
+        while len(sentence) > max_chars:
+            # جملة أطول من الحد: نقطع عند آخر مسافة قبله
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            sentences.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def chunk_text(text: str, max_chars: int = CHUNK_MAX_CHARS, overlap: int = CHUNK_OVERLAP) -> list[Chunk]:
+    """تقسيم نص إلى مقاطع لا يتجاوز كل منها max_chars.
+
+    الوحدة الأساسية هي الجملة؛ نفضّل القطع عند نهاية فقرة إذا كان المقطع الحالي
+    قد امتلأ لنصفه على الأقل.
+    """
+    chunks: list[Chunk] = []
+    units: list[tuple[str, str]] = []  # (separator, sentence)
+    size = 0
+    fresh = False  # هل في units محتوى جديد غير المنقول من المقطع السابق؟
+    heading = None
+
+    def emit():
+        nonlocal units, size, fresh
+        body = "".join(sep + sentence for sep, sentence in units).strip()
+        chunks.append(Chunk(text=body, index=len(chunks), heading=heading))
+        # الاحتفاظ بآخر جمل المقطع (ضمن حد التداخل) لبداية المقطع التالي
+        carried: list[tuple[str, str]] = []
+        carried_size = 0
+        for unit in reversed(units):
+            if carried_size + len(unit[1]) + 1 > overlap:
+                break
+            carried.insert(0, unit)
+            carried_size += len(unit[1]) + 1
+        units, size, fresh = carried, carried_size, False
+
+    def add(sep: str, sentence: str):
+        nonlocal size, fresh
+        if fresh and size + len(sentence) + 1 > max_chars:
+            emit()
+        # التداخل المنقول لا يُدخل المقطع فوق الحد: نُسقط أقدم جمله حتى تتسع الجملة
+        while units and size + len(sentence) + 1 > max_chars:
+            size -= len(units.pop(0)[1]) + 1
+        units.append((sep, sentence))
+        size += len(sentence) + 1
+        fresh = True
+
+    for block_heading, paragraph in _blocks(text):
+        if block_heading != heading:
+            # قسم جديد يبدأ مقطعاً جديداً بلا تداخل مع القسم السابق
+            if fresh:
+                emit()
+            units, size = [], 0
+            heading = block_heading
+            if heading:
+                # نص العنوان جزء من المقطع أيضاً، فيُبحث فيه ولا يضيع قسم بلا فقرات
+                add("", heading)
+        sentences = _sentences(paragraph, max_chars)
+        if not sentences:
+            continue
+        paragraph_size = sum(len(sentence) + 1 for sentence in sentences)
+        if fresh and size + paragraph_size > max_chars and size >= max_chars // 2:
+            emit()
+        for i, sentence in enumerate(sentences):
+            add("\n" if i == 0 else " ", sentence)
+    if fresh:
+        emit()
+    return chunks
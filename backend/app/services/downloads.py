@@ -0,0 +1,154 @@
+"""
+تنزيل الملفات المخزنة مع دعم Range والطلبات المشروطة.
+
+- ETag قوي هو بصمة SHA-256 للمحتوى، فيبقى ثابتاً لنفس الملف في كل النسخ
+  والخوادم (بخلاف ETag المبني على وقت التعديل).
+- If-None-Match / If-Modified-Since ترجع 304، وIf-Match ترجع 412،
+  وIf-Range تعيد الملف كاملاً إذا تغير.
+- Range (نطاق واحد) يرجع 206، وهو ما يحتاجه مشغل الفيديو/الصوت للتنقل.
+
+الإرسال بلا نسخ عبر Python متى دعم الخادم ذلك: امتداد ASGI
+http.response.zerocopysend (sendfile لأي نطاق) أو http.response.pathsend
+(الملف كاملاً)، وإلا قراءة os.pread على دفعات في thread دون تحميل الملف.
+"""
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _etag_matches(header: str, etag: str, weak: bool) -> bool:
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if weak and candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """نطاق واحد [start, end) من "bytes=a-b" أو "bytes=a-" أو "bytes=-n".
+
+    يرجع None إذا كان الترويسة غير مفهومة أو فيها عدة نطاقات (فيُرسل الملف
+    كاملاً كما تسمح المواصفة)، ويرفع ValueError إذا كان النطاق خارج الملف.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first.isdigit() or last.isdigit()):
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size
+    start = int(first)
+    end = min(int(last) + 1, size) if last.isdigit() else size
+    if last.isdigit() and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("range starts past the end of the file")
+    return start, end
+
+
+class BlobResponse(Response):
+    def __init__(
+        self,
+        path: str,
+        size: int,
+        mtime: float,
+        etag: str,
+        media_type: str | None = None,
+        filename: str | None = None,
+        cache_control: str = "private, no-cache",
+    ):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.etag = f'"{etag}"'
+        self.status_code = 200
+        self.background = None
+        self.media_type = media_type or "application/octet-stream"
+        self.init_headers({
+            "content-type": self.media_type,
+            "accept-ranges": "bytes",
+            "etag": self.etag,
+            "last-modified": formatdate(mtime, usegmt=True),
+            "cache-control": cache_control,
+        })
+        if filename:
+            self.headers["content-disposition"] = f"inline; filename*=UTF-8''{quote(filename)}"
+
+    def _not_modified(self, request_headers: Headers) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return _etag_matches(if_none_match, self.etag, weak=True)
+        since = request_headers.get("if-modified-since")
+        if since:
+            try:
+                return int(self.mtime) <= parsedate_to_datetime(since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+        head = scope["method"].upper() == "HEAD"
+        start, end = 0, self.size
+
+        if_match = request_headers.get("if-match")
+        if if_match is not None and not _etag_matches(if_match, self.etag, weak=False):
+            return await Response(status_code=412, headers={"etag": self.etag})(scope, receive, send)
+        if self._not_modified(request_headers):
+            headers = {k: v for k, v in self.headers.items() if k in ("etag", "last-modified", "cache-control")}
+            return await Response(status_code=304, headers=headers)(scope, receive, send)
+
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range in (self.etag, self.headers["last-modified"])):
+            try:
+                requested = parse_range(range_header, self.size)
+            except ValueError:
+                return await Response(status_code=416, headers={"content-range": f"bytes */{self.size}"})(scope, receive, send)
+            if requested is not None:
+                start, end = requested
+                self.status_code = 206
+                self.headers["content-range"] = f"bytes {start}-{end - 1}/{self.size}"
+        self.headers["content-length"] = str(end - start)
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        extensions = scope.get("extensions", {})
+        if head or end == start:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as f:
+                await send({"type": "http.response.zerocopysend", "file": f, "offset": start, "count": end - start, "more_body": False})
+        elif "http.response.pathsend" in extensions and (start, end) == (0, self.size):
+            await send({"type": "http.response.pathsend", "path": self.path})
+        else:
+            await self._send_chunks(send, start, end)
+
+    async def _send_chunks(self, send: Send, start: int, end: int) -> None:
+        fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            position = start
+            while position < end:
+                chunk = await anyio.to_thread.run_sync(os.pread, fd, min(DOWNLOAD_CHUNK_SIZE, end - position), position)
+                if not chunk:
+                    break
+                position += len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": position < end})
+            if position < end:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(fd)
@@ -0,0 +1,102 @@
+"""
+تحويل المقاطع إلى متجهات كثيفة (embeddings) محلياً، دون أي اتصال بالشبكة.
+
+- إذا حُدِّد KNOWLEDGE_EMBEDDING_MODEL (مسار نموذج sentence-transformers محفوظ
+  على القرص) يُستخدم النموذج على المعالج (CPU) فقط.
+- غير ذلك نستخدم HashingEmbedder: بصمات (hashing trick) للكلمات وأزواج الكلمات
+  والمقاطع الحرفية الثلاثية، وهي تلتقط السوابق واللواحق العربية (ال، ـة، ـات)
+  دون قاموس أو تدريب، فلا حاجة لأي ملف خارجي.
+
+كل المتجهات float32 ومطبَّعة (L2) حتى يكون الضرب النقطي هو تشابه الـ cosine.
+"""
+import os
+import zlib
+from collections import Counter
+from functools import lru_cache
+from itertools import pairwise
+
+import numpy as np
+
+from .arabic import TOKENIZER_VERSION, tokenize
+
+EMBEDDING_MODEL = os.getenv("KNOWLEDGE_EMBEDDING_MODEL", "")
+HASHING_DIM = int(os.getenv("KNOWLEDGE_HASHING_DIM", "512"))
+
+_CHAR_NGRAM_WEIGHT = 0.5
+_BIGRAM_WEIGHT = 0.7
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+class HashingEmbedder:
+    """متجهات بطريقة الـ hashing trick؛ حتمية ولا تحتاج تدريباً."""
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}-t{TOKENIZER_VERSION}"
+        # مواقع وإشارات كل كلمة تُحسب مرة واحدة فقط لكل عملية
+        self._token_features = lru_cache(maxsize=200_000)(self._features)
+
+    def _slot(self, feature: str) -> tuple[int, float]:
+        h = zlib.crc32(feature.encode("utf-8"))
+        return h % self.dim, (1.0 if h & 0x80000000 else -1.0)
+
+    def _features(self, token: str) -> tuple[np.ndarray, np.ndarray]:
+        slots = [self._slot("w:" + token)]
+        weights = [1.0]
+        padded = f"<{token}>"
+        for i in range(len(padded) - 2):
+            slots.append(self._slot("c:" + padded[i:i + 3]))
+            weights.append(_CHAR_NGRAM_WEIGHT)
+        idx = np.fromiter((s[0] for s in slots), dtype=np.int64, count=len(slots))
+        signed = np.fromiter((s[1] * w for s, w in zip(slots, weights, strict=True)), dtype=np.float32, count=len(slots))
+        return idx, signed
+
+    def _embed_one(self, text: str, out: np.ndarray) -> None:
+        tokens = tokenize(text)
+        if not tokens:
+            return
+        for token, count in Counter(tokens).items():
+            idx, signed = self._token_features(token)
+            # tf لوغاريتمي حتى لا تطغى كلمة مكررة على المقطع كله
+            np.add.at(out, idx, signed * (1.0 + np.log(count)))
+        for pair in pairwise(tokens):
+            slot, sign = self._slot("b:" + " ".join(pair))
+            out[slot] += sign * _BIGRAM_WEIGHT
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in zip(matrix, texts, strict=True):
+            self._embed_one(text, row)
+        return _normalize_rows(matrix)
+
+
+class SentenceTransformerEmbedder:
+    """نموذج sentence-transformers محلي على الـ CPU (يُستورد عند الحاجة فقط)."""
+
+    def __init__(self, model_path: str, batch_size: int = 64):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_path, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st:{os.path.basename(os.path.normpath(model_path))}-{self.dim}"
+        self.batch_size = batch_size
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = self.model.encode(
+            [t or "" for t in texts], batch_size=self.batch_size,
+            normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False,
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+@lru_cache(maxsize=1)
+def get_embedder():
+    if EMBEDDING_MODEL:
+        return SentenceTransformerEmbedder(EMBEDDING_MODEL)
+    return HashingEmbedder()
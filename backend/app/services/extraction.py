@@ -0,0 +1,90 @@
+"""
+مستخرجات النصوص من ملفات PDF و Word و PowerPoint.
+
+تُستورد المكتبات (PyMuPDF, python-docx, python-pptx) داخل الدوال فقط،
+حتى لا يحتاج أي جزء من التطبيق لتثبيتها إلا عند الاستخراج فعلاً.
+"""
+import logging
+import os
+
+from .chunking import chunk_text
+from .ingest_manifest import normalize_path
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".pptx")
+
+
+def is_supported(filename: str) -> bool:
+    return filename.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def iter_pdf_pages(path: str):
+    """استخراج النص صفحة بصفحة مع رقم الصفحة، دون تحميل الملف كاملاً كنص."""
+    import fitz  # PyMuPDF
+
+    with fitz.open(path) as doc:
+        for page_num, page in enumerate(doc, start=1):
+            text = page.get_text()
+            if text.strip():
+                yield {"page": page_num, "text": text}
+
+
+def extract_text_from_word(path: str) -> str:
+    from docx import Document
+
+    doc = Document(path)
+    parts = []
+    for para in doc.paragraphs:
+        style = getattr(para.style, "name", "") or ""
+        # عناوين Word تُعلَّم حتى يبدأ عندها المقسّم مقطعاً جديداً
+        if style.lower().startswith(("heading", "title")) and para.text.strip():
+            parts.append("\n# " + para.text + "\n")
+        else:
+            parts.append(para.text + "\n")
+    return "".join(parts)
+
+
+def iter_pptx_slides(path: str):
+    from pptx import Presentation
+
+    prs = Presentation(path)
+    for slide_num, slide in enumerate(prs.slides, start=1):
+        texts = [shape.text for shape in slide.shapes if hasattr(shape, "text") and shape.text.strip()]
+        if texts:
+            yield {"slide": slide_num, "text": "\n\n".join(texts)}
+
+
+def extract_text_from_pptx(path: str) -> str:
+    return "".join(s["text"] + "\n" for s in iter_pptx_slides(path))
+
+
+def _chunk_records(text: str, base: dict):
+    for chunk in chunk_text(text):
+        yield {**base, "content": chunk.text, "section": chunk.heading, "chunk_index": chunk.index}
+
+
+def iter_records(path: str, folder_name: str, filename: str | None = None):
+    """تحويل ملف واحد إلى سجلات KnowledgeItem مقسمة إلى مقاطع (قاموس لكل مقطع).
+
+    مصدر كل مقطع (الملف/الصفحة/الشريحة) محفوظ في أعمدة منفصلة. filename هو الاسم
+    الظاهر ونوع الملف عندما يختلف عن اسم المسار (ملفات مخزن الرفع تُسمّى ببصمتها).
+    """
+    filename = filename or os.path.basename(path)
+    base = {
+        "source_file": filename,
+        "source_path": normalize_path(path),
+        "folder": folder_name,
+        "category": folder_name,
+        "page": None,
+        "slide": None,
+    }
+    ext = filename.lower()
+    if ext.endswith(".pdf"):
+        for p in iter_pdf_pages(path):
+            yield from _chunk_records(p["text"], {**base, "page": p["page"]})
+    elif ext.endswith(".pptx"):
+        for s in iter_pptx_slides(path):
+            yield from _chunk_records(s["text"], {**base, "slide": s["slide"]})
+    elif ext.endswith(".docx"):
+        yield from _chunk_records(extract_text_from_word(path), base)
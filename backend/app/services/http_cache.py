@@ -0,0 +1,126 @@
+"""
+ETag و Cache-Control للمسارات التي تُقرأ كثيراً وتتغير نادراً.
+
+المسار يشترك بالمزخرف http_cache، والـ router الذي يحويه يُنشأ بـ
+route_class=HTTPCacheRoute الذي يطبقه:
+- versions=("courses",): الـ ETag يُحسب من أرقام إصدارات تزيد عند كل commit
+  يكتب على جداول هذه المجموعة (VERSIONED_TABLES)، مع الرابط كاملاً وترويسة
+  Authorization. If-None-Match المطابق يرجع 304 قبل استدعاء المسار، فلا
+  استعلام ولا Pydantic.
+- بدون versions: المسار يُنفَّذ والـ ETag بصمة SHA-256 للجسم؛ المطابقة ترجع
+  304 بلا جسم (توفير النقل فقط).
+
+أرقام الإصدارات في ذاكرة كل عملية، ولا تصلها كتابات العمليات الأخرى (ingest.py،
+عمال uvicorn آخرون)، لذلك الـ ETag يتضمن أيضاً رقم العملية ونافذة زمنية
+(HTTP_CACHE_VERSION_WINDOW ثانية): لا تتطابق ETags عمليتين مختلفتين، وأقصى
+مدة قد يبقى فيها محتوى قديم صالحاً هي طول النافذة.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections.abc import Callable, Coroutine
+from dataclasses import dataclass
+from typing import Any
+from uuid import uuid4
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from ..models import Course, KnowledgeItem, Lesson
+from .write_events import on_commit_writes
+
+HTTP_CACHE_VERSION_WINDOW = int(os.getenv("HTTP_CACHE_VERSION_WINDOW", "60"))
+VERSIONED_TABLES = {
+    "courses": (Course.__table__, Lesson.__table__),
+    "knowledge": (KnowledgeItem.__table__,),
+}
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    cache_control: str = "no-cache"
+    versions: tuple[str, ...] = ()
+
+
+def http_cache(cache_control: str = "no-cache", versions: tuple[str, ...] = ()):
+    """اشتراك مسار في HTTPCacheRoute؛ يوضع تحت @router.get."""
+    unknown = set(versions) - set(VERSIONED_TABLES)
+    if unknown:
+        raise ValueError(f"Unknown cache versions: {sorted(unknown)}")
+
+    def decorate(endpoint):
+        endpoint.__http_cache__ = CachePolicy(cache_control, tuple(versions))
+        return endpoint
+
+    return decorate
+
+
+class VersionCounters:
+    def __init__(self, window: int = HTTP_CACHE_VERSION_WINDOW, clock=time.time):
+        self.window = window
+        self.clock = clock
+        self.process = uuid4().hex
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def etag(self, names: tuple[str, ...], *parts: str) -> str:
+        with self._lock:
+            counts = [f"{name}={self._counts.get(name, 0)}" for name in names]
+        window = int(self.clock() // self.window) if self.window > 0 else 0
+        key = "\n".join([self.process, str(window), *counts, *parts])
+        return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+versions = VersionCounters()
+for _name, _tables in VERSIONED_TABLES.items():
+    on_commit_writes(_tables, lambda name=_name: versions.bump(name))
+
+
+def _matches(header: str, etag: str) -> bool:
+    # If-None-Match يقارن بالطريقة الضعيفة (RFC 9110)
+    return any(candidate.strip() in ("*", etag, "W/" + etag) for candidate in header.split(","))
+
+
+def _not_modified(etag: str, policy: CachePolicy) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": policy.cache_control})
+
+
+class HTTPCacheRoute(APIRoute):
+    """route_class للـ routers التي فيها مسارات http_cache؛ بقية المسارات لا تتغير."""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        policy: CachePolicy | None = getattr(self.endpoint, "__http_cache__", None)
+        if policy is None:
+            return handler
+
+        async def cached_handler(request: Request) -> Response:
+            if request.method not in ("GET", "HEAD"):
+                return await handler(request)
+            if_none_match = request.headers.get("if-none-match")
+            if policy.versions:
+                # الإصدار يُقرأ قبل تنفيذ المسار: كتابة أثناء التنفيذ تغيّر الـ ETag التالي
+                url = request.url.path + "?" + request.url.query
+                etag = versions.etag(policy.versions, url, request.headers.get("authorization", ""))
+                if if_none_match and _matches(if_none_match, etag):
+                    return _not_modified(etag, policy)
+                response = await handler(request)
+            else:
+                response = await handler(request)
+                body = getattr(response, "body", None)
+                if response.status_code != 200 or body is None:
+                    return response
+                etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+                if if_none_match and _matches(if_none_match, etag):
+                    return _not_modified(etag, policy)
+            if response.status_code == 200:
+                response.headers["ETag"] = etag
+                response.headers["Cache-Control"] = policy.cache_control
+            return response
+
+        return cached_handler
@@ -0,0 +1,147 @@
+"""
+استرجاع هجين لمساعد قاعدة المعرفة: BM25 + تشابه المتجهات.
+
+القائمتان تُدمجان بـ Reciprocal Rank Fusion (RRF):
+    score(d) = Σ 1 / (RRF_K + rank_i(d))
+فلا حاجة لمعايرة درجات BM25 مع درجات cosine. المقاطع المكررة (نفس النص
+في أكثر من ملف، أو أكثر من مقطع من نفس الصفحة) تُدمج في نتيجة واحدة.
+
+فهرس BM25 وفهرس المتجهات ونصوص المقاطع تُحمَّل مرة واحدة لكل عملية
+ويشاركها كل الطلبات المتزامنة (قراءة فقط)؛ يُعاد التحميل فقط عندما يعيد
+ingest بناء الفهارس على القرص.
+"""
+import hashlib
+import os
+import re
+import threading
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..models import KnowledgeItem
+from .arabic import normalize, stem, tokenize
+from .bm25 import BM25Index, default_bm25_path
+from .embeddings import get_embedder
+from .knowledge_search import SearchHit, search_knowledge
+from .vector_index import VectorIndex, get_vector_index
+
+RRF_K = 60
+CANDIDATES = 50
+SNIPPET_CHARS = 300
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass(frozen=True)
+class Passage:
+    source_file: str
+    category: str | None
+    page: int | None
+    slide: int | None
+    section: str | None
+    content: str
+    digest: bytes
+
+
+class KnowledgeIndex:
+    """كل ما يحتاجه الاسترجاع في الذاكرة، مشترك بين الطلبات."""
+
+    def __init__(self, bm25: BM25Index, vectors: VectorIndex | None, passages: dict[int, Passage]):
+        self.bm25 = bm25
+        self.vectors = vectors
+        self.passages = passages
+
+    @classmethod
+    def load(cls, db: Session, bm25: BM25Index, vectors: VectorIndex | None) -> "KnowledgeIndex":
+        passages = {}
+        rows = db.execute(
+            select(
+                KnowledgeItem.id, KnowledgeItem.source_file, KnowledgeItem.category, KnowledgeItem.page,
+                KnowledgeItem.slide, KnowledgeItem.section, KnowledgeItem.content,
+            ).execution_options(yield_per=5000)
+        )
+        for r in rows:
+            content = r.content or ""
+            digest = hashlib.blake2b(" ".join(content.split()).encode("utf-8"), digest_size=8).digest()
+            passages[r.id] = Passage(r.source_file, r.category, r.page, r.slide, r.section, content, digest)
+        return cls(bm25, vectors, passages)
+
+    def search(self, query: str, limit: int = 5, candidates: int = CANDIDATES) -> list[SearchHit]:
+        ranked_lists = [self.bm25.search(query, k=candidates)]
+        embedder = get_embedder()
+        if self.vectors is not None and self.vectors.model == embedder.name:
+            ranked_lists.append(self.vectors.search(embedder.embed([query]), k=candidates)[0])
+
+        fused: dict[int, float] = {}
+        for ranked in ranked_lists:
+            for rank, (doc_id, _) in enumerate(ranked, start=1):
+                fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (RRF_K + rank)
+
+        terms = set(tokenize(query))
+        hits: list[SearchHit] = []
+        seen_text, seen_place = set(), set()
+        for doc_id, score in sorted(fused.items(), key=lambda item: -item[1]):
+            p = self.passages.get(doc_id)
+            if p is None:
+                continue  # حُذف بعد آخر بناء للفهارس
+            place = (p.source_file, p.page, p.slide)
+            if p.digest in seen_text or place in seen_place:
+                continue
+            seen_text.add(p.digest)
+            seen_place.add(place)
+            hits.append(SearchHit(doc_id, p.source_file, p.category, _snippet(p.content, terms), round(score, 6), p.page, p.slide, p.section))
+            if len(hits) >= limit:
+                break
+        return hits
+
+
+def _snippet(content: str, terms: set[str]) -> str:
+    """مقتطف حول أول كلمة مطابقة، والكلمات المطابقة بين [ ] كما في بحث FTS.
+
+    المطابقة بعد التطبيع والتجذيع، فـ "التسويق" في النص تُعلَّم لسؤال عن "تسويق".
+    """
+    text = " ".join(content.split())
+    matches = [m for m in _WORD_RE.finditer(text) if stem(normalize(m.group())) in terms]
+    start = max(0, matches[0].start() - SNIPPET_CHARS // 3) if matches else 0
+    end = start + SNIPPET_CHARS
+    parts, pos = [], start
+    for m in matches:
+        if m.start() < start or m.end() > end:
+            continue
+        parts += [text[pos:m.start()], "[", m.group(), "]"]
+        pos = m.end()
+    parts.append(text[pos:end])
+    return ("…" if start else "") + "".join(parts) + ("…" if end < len(text) else "")
+
+
+_cache: dict[str, tuple[tuple, KnowledgeIndex | None]] = {}
+_cache_lock = threading.Lock()
+
+
+def get_knowledge_index(db: Session) -> KnowledgeIndex | None:
+    """الفهرس المشترك للعملية؛ None إذا لم يبنِ ingest فهرس BM25 بعد."""
+    engine: Engine = db.get_bind()
+    path = default_bm25_path(engine)
+    vectors = get_vector_index(engine)
+    version = (os.path.getmtime(path) if os.path.exists(path) else 0.0, id(vectors))
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _cache_lock:
+        # طلب آخر ربما حمّل الفهرس أثناء انتظار القفل
+        cached = _cache.get(path)
+        if cached is None or cached[0] != version:
+            bm25 = BM25Index.load(path)
+            cached = (version, KnowledgeIndex.load(db, bm25, vectors) if bm25 is not None else None)
+            _cache[path] = cached
+    return cached[1]
+
+
+def hybrid_search(db: Session, query: str, limit: int = 5) -> list[SearchHit]:
+    """بحث هجين إذا كانت الفهارس مبنية، وإلا البحث النصي الكامل العادي."""
+    index = get_knowledge_index(db)
+    if index is None:
+        return search_knowledge(db, query, limit=limit)
+    return index.search(query, limit=limit)
@@ -0,0 +1,97 @@
+"""
+سجل (manifest) الملفات المسحوبة إلى قاعدة المعرفة.
+
+كل ملف مُعرَّف بمساره الكامل ومعه الحجم و mtime وبصمة SHA-256 للمحتوى:
+- الحجم و mtime لم يتغيرا => الملف لم يتغير، يُتخطى دون قراءته.
+- تغيرا لكن البصمة نفسها => الملف لُمس فقط، نحدّث السجل دون إعادة السحب.
+- البصمة مختلفة => تُحذف صفحات الملف القديمة وتُضاف الجديدة في نفس المعاملة.
+
+يُحمَّل السجل كاملاً باستعلام واحد، فإعادة التشغيل بلا تغييرات لا تحتاج
+سوى os.stat لكل ملف.
+"""
+import hashlib
+import os
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from ..models import IngestManifestEntry, KnowledgeItem
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def normalize_path(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    def __init__(self, session: Session):
+        # نسخة ثابتة (tuples) وليست كائنات ORM، حتى لا يعيد أي commit تحميلها صفاً صفاً
+        rows = session.execute(
+            select(IngestManifestEntry.path, IngestManifestEntry.size, IngestManifestEntry.mtime_ns, IngestManifestEntry.sha256)
+        )
+        self.entries = {path: (size, mtime_ns, sha256) for path, size, mtime_ns, sha256 in rows}
+
+    def is_unchanged(self, path: str) -> bool:
+        entry = self.entries.get(normalize_path(path))
+        if entry is None:
+            return False
+        st = os.stat(path)
+        return entry[0] == st.st_size and entry[1] == st.st_mtime_ns
+
+    def needs_ingest(self, path: str) -> bool:
+        return not self.is_unchanged(path)
+
+    def same_content(self, path: str, sha256: str) -> bool:
+        entry = self.entries.get(normalize_path(path))
+        return entry is not None and entry[2] == sha256
+
+    def replace_file(self, session: Session, path: str, sha256: str, items: int) -> None:
+        """حذف صفحات الملف القديمة وتحديث السجل. يُستدعى قبل إدراج الصفحات الجديدة وفي نفس المعاملة."""
+        key = normalize_path(path)
+        session.execute(delete(KnowledgeItem).where(KnowledgeItem.source_path == key))
+        if key not in self.entries:
+            # صفوف قديمة سُحبت قبل وجود السجل لا تحمل المسار، نطابقها بالاسم مرة واحدة
+            session.execute(
+                delete(KnowledgeItem).where(
+                    KnowledgeItem.source_path.is_(None),
+                    KnowledgeItem.source_file == os.path.basename(path),
+                )
+            )
+        self.touch(session, path, sha256, items)
+
+    def touch(self, session: Session, path: str, sha256: str, items: int | None = None) -> None:
+        key = normalize_path(path)
+        st = os.stat(path)
+        entry = session.get(IngestManifestEntry, key)
+        if entry is None:
+            entry = IngestManifestEntry(path=key, items=0)
+            session.add(entry)
+        entry.size = st.st_size
+        entry.mtime_ns = st.st_mtime_ns
+        entry.sha256 = sha256
+        if items is not None:
+            entry.items = items
+            entry.ingested_at = datetime.utcnow()
+        self.entries[key] = (st.st_size, st.st_mtime_ns, sha256)
+
+    def prune_missing(self, session: Session, folders: list[str]) -> int:
+        """حذف صفحات الملفات التي أزيلت من المجلدات المسحوبة."""
+        roots = [normalize_path(folder) + os.sep for folder in folders]
+        removed = 0
+        for key in list(self.entries):
+            if any(key.startswith(root) for root in roots) and not os.path.exists(key):
+                session.execute(delete(KnowledgeItem).where(KnowledgeItem.source_path == key))
+                session.execute(delete(IngestManifestEntry).where(IngestManifestEntry.path == key))
+                del self.entries[key]
+                removed += 1
+        return removed
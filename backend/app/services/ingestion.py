@@ -0,0 +1,216 @@
+"""
+خط استخراج متوازٍ لقاعدة المعرفة.
+
+- عدة عمليات (processes) تستخرج الملفات في نفس الوقت، كل عملية تأخذ ملفاً
+  من طابور المهام وترسل الصفحات واحدة تلو الأخرى إلى طابور نتائج محدود الحجم.
+- عملية واحدة فقط (الكاتب) تكتب في قاعدة البيانات وتعمل commit كل batch_size سجل.
+  صفحات الملف الواحد تُكتب معاً في نفس المعاملة، فلا يبقى ملف نصف مسحوب.
+
+الطابور المحدود يجعل العمال ينتظرون إذا تأخر الكاتب، فيبقى استهلاك الذاكرة
+ثابتاً مهما كان حجم المجلد.
+
+ingest_folders هو المسار الذي يستخدمه ingest.py: يمر بسجل الملفات
+(ingest_manifest) فيتخطى الملفات التي لم تتغير ويحذف صفحات الملفات المزالة.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy.orm import Session
+
+from ..models import KnowledgeItem
+from .extraction import is_supported, iter_records
+from .ingest_manifest import IngestManifest, file_sha256
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_QUEUE_SIZE = 256
+
+_PAGE, _FILE_DONE, _WORKER_DONE = "page", "file", "worker"
+
+
+@dataclass
+class IngestReport:
+    files_total: int = 0
+    files_done: int = 0
+    files_failed: int = 0
+    pages: int = 0
+    bytes_done: int = 0
+    commits: int = 0
+    removed: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    errors: list[tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def summary(self) -> str:
+        elapsed = max(self.elapsed, 1e-9)
+        return (
+            f"files {self.files_done}/{self.files_total} (failed {self.files_failed}) | "
+            f"pages {self.pages} | {self.pages / elapsed:.1f} pages/s | "
+            f"{self.bytes_done / elapsed / 1_000_000:.2f} MB/s | {elapsed:.1f}s"
+        )
+
+
+def collect_files(folders: list[str], skip=None) -> list[tuple[str, str]]:
+    """جمع الملفات المدعومة من المجلدات مع اسم المجلد كتصنيف."""
+    skip = skip or (lambda path: False)
+    tasks = []
+    for folder in folders:
+        if not os.path.isdir(folder):
+            continue
+        folder_name = os.path.basename(os.path.normpath(folder))
+        for filename in sorted(os.listdir(folder)):
+            path = os.path.join(folder, filename)
+            if os.path.isfile(path) and is_supported(filename) and not skip(path):
+                tasks.append((path, folder_name))
+    return tasks
+
+
+def _extract_worker(task_q, record_q) -> None:
+    while True:
+        task = task_q.get()
+        if task is None:
+            record_q.put((_WORKER_DONE,))
+            return
+        path, folder_name = task
+        try:
+            sha256 = file_sha256(path)
+            for record in iter_records(path, folder_name):
+                record_q.put((_PAGE, path, record))
+            record_q.put((_FILE_DONE, path, None, sha256))
+        except Exception as e:
+            record_q.put((_FILE_DONE, path, f"{type(e).__name__}: {e}", None))
+
+
+def run_ingestion(
+    session: Session,
+    tasks: list[tuple[str, str]],
+    workers: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    progress=None,
+    progress_every: float = 2.0,
+    on_file_done=None,
+) -> IngestReport:
+    """استخراج الملفات بالتوازي وكتابتها في دفعات عبر كاتب واحد.
+
+    progress: دالة تُستدعى بالتقرير الحالي كل progress_every ثانية وفي النهاية.
+    on_file_done: دالة (session, path, sha256, records) تُستدعى قبل إدراج صفحات الملف
+        وفي نفس المعاملة؛ إذا أرجعت False لا تُدرج الصفحات.
+    """
+    report = IngestReport(files_total=len(tasks))
+    if not tasks:
+        return report
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    ctx = multiprocessing.get_context("spawn")
+    task_q = ctx.Queue()
+    record_q = ctx.Queue(maxsize=queue_size)
+    for task in tasks:
+        task_q.put(task)
+    for _ in range(workers):
+        task_q.put(None)
+
+    procs = [ctx.Process(target=_extract_worker, args=(task_q, record_q), daemon=True) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+
+    pending: dict[str, list[dict]] = {}
+    buffer: list[dict] = []
+    last_progress = time.perf_counter()
+
+    def flush():
+        if buffer:
+            session.execute(KnowledgeItem.__table__.insert(), buffer)
+        session.commit()
+        report.commits += 1
+        report.pages += len(buffer)
+        buffer.clear()
+
+    def file_done(path, sha256):
+        records = pending.pop(path, [])
+        if on_file_done is not None and on_file_done(session, path, sha256, records) is False:
+            return
+        buffer.extend(records)
+        if len(buffer) >= batch_size:
+            flush()
+
+    alive = workers
+    try:
+        while alive:
+            try:
+                msg = record_q.get(timeout=1.0)
+            except queue.Empty:
+                if not any(p.is_alive() for p in procs):
+                    logger.error("extraction workers exited unexpectedly")
+                    break
+                continue
+
+            kind = msg[0]
+            if kind == _PAGE:
+                pending.setdefault(msg[1], []).append(msg[2])
+            elif kind == _FILE_DONE:
+                _, path, error, sha256 = msg
+                if error:
+                    pending.pop(path, None)
+                    report.files_failed += 1
+                    report.errors.append((path, error))
+                    logger.info("failed to extract %s: %s", path, error)
+                else:
+                    report.files_done += 1
+                    report.bytes_done += os.path.getsize(path)
+                    file_done(path, sha256)
+            else:
+                alive -= 1
+
+            if progress and time.perf_counter() - last_progress >= progress_every:
+                progress(report)
+                last_progress = time.perf_counter()
+        flush()
+    finally:
+        for proc in procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+
+    if progress:
+        progress(report)
+    return report
+
+
+def ingest_folders(
+    session: Session,
+    folders: list[str],
+    workers: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress=None,
+) -> IngestReport:
+    """سحب المجلدات عبر سجل الملفات: الجديد أو المعدل فقط، وحذف ما أزيل منها.
+
+    report.files_total عدد الملفات التي احتاجت استخراجاً، و report.removed عدد
+    الملفات المحذوفة من المجلدات منذ آخر سحب.
+    """
+    # السجل يُحمَّل باستعلام واحد؛ الملفات التي لم يتغير حجمها أو وقت تعديلها تُتخطى
+    manifest = IngestManifest(session)
+    removed = manifest.prune_missing(session, folders)
+    session.commit()
+    tasks = collect_files(folders, skip=manifest.is_unchanged)
+
+    def on_file_done(session, path, sha256, records):
+        if manifest.same_content(path, sha256):
+            # الملف لُمس فقط (نفس المحتوى): نحدّث السجل دون إعادة الإدراج
+            manifest.touch(session, path, sha256)
+            return False
+        manifest.replace_file(session, path, sha256, len(records))
+        return True
+
+    report = run_ingestion(session, tasks, workers=workers, batch_size=batch_size, progress=progress, on_file_done=on_file_done)
+    report.removed = removed
+    return report
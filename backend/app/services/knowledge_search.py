@@ -0,0 +1,279 @@
+"""
+فهرس البحث النصي الكامل لجدول knowledgeitem.
+
+- SQLite: جدول افتراضي FTS5 من نوع external content مربوط بـ knowledgeitem،
+  ومجموعة triggers تبقيه متزامناً مع كل insert/update/delete.
+- Postgres: عمود tsvector مولَّد (GENERATED ... STORED) مع فهرس GIN،
+  فيبقى متزامناً تلقائياً دون triggers.
+
+النتائج مرتبة حسب الصلة (bm25 / ts_rank_cd) ومع مقتطف (snippet) حول الكلمات
+المطابقة، بدلاً من LIKE '%q%' الذي يمسح الجدول بالكامل.
+
+الفهرس والاستعلام كلاهما يمران بـ arabic.normalize (الهمزات، التاء المربوطة،
+الألف المقصورة، التشكيل)، فـ "مدرسة" تطابق "مدرسه" و"إدارة" تطابق "ادارة".
+في SQLite تستدعي الـ triggers الدالة arabic_normalize المسجلة على كل اتصال
+(event "connect")؛ وفي Postgres يطبق العمود المولَّد الجدول نفسه بـ translate().
+لا تجذيع في هذا الفهرس: مطابقة البادئة للكلمة الأخيرة تغطي جزءاً منه، والمقتطف
+يُظلّل فقط الكلمات المكتوبة في النص بنفس شكلها المطبَّع.
+"""
+import os
+import re
+import weakref
+from dataclasses import dataclass
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..models import KnowledgeItem
+from .arabic import CHARACTER_MAP, STOPWORDS, normalize, tokenize
+
+FTS_TABLE = "knowledgeitem_fts"
+SNIPPET_TOKENS = 24
+# افتراضياً (0) تُرتب كل الصفحات المطابقة حسب الصلة. قيمة N > 0 تقصر الترتيب على
+# أحدث N مطابقة (SQLite) ليبقى زمن الكلمات الشائعة جداً ثابتاً في قاعدة ضخمة، على
+# حساب الدقة: صفحة أقدم وأكثر صلة خارج النافذة لا تظهر في النتائج أبداً.
+RANK_WINDOW = int(os.getenv("KNOWLEDGE_RANK_WINDOW", "0"))
+
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_ready = weakref.WeakSet()
+
+_SQLITE_NORMALIZE = "arabic_normalize"
+_SQLITE_TRIGGERS = ("knowledgeitem_fts_ai", "knowledgeitem_fts_ad", "knowledgeitem_fts_au")
+_OLD = f"{_SQLITE_NORMALIZE}(old.content), {_SQLITE_NORMALIZE}(old.source_file)"
+_NEW = f"{_SQLITE_NORMALIZE}(new.content), {_SQLITE_NORMALIZE}(new.source_file)"
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        content, source_file,
+        content='knowledgeitem', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS knowledgeitem_fts_ai AFTER INSERT ON knowledgeitem BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, content, source_file) VALUES (new.id, {_NEW});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS knowledgeitem_fts_ad AFTER DELETE ON knowledgeitem BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content, source_file) VALUES ('delete', old.id, {_OLD});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS knowledgeitem_fts_au AFTER UPDATE ON knowledgeitem BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content, source_file) VALUES ('delete', old.id, {_OLD});
+        INSERT INTO {FTS_TABLE}(rowid, content, source_file) VALUES (new.id, {_NEW});
+    END""",
+]
+# 'rebuild' يقرأ النص الخام من knowledgeitem، فالفهرس يُملأ بالنص المطبَّع صراحة
+_SQLITE_REINDEX = [
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')",
+    f"""INSERT INTO {FTS_TABLE}(rowid, content, source_file)
+        SELECT id, {_SQLITE_NORMALIZE}(content), {_SQLITE_NORMALIZE}(source_file) FROM knowledgeitem""",
+]
+
+
+def _pg_normalize(column: str) -> str:
+    # نفس arabic.CHARACTER_MAP: الأحرف بعد طول الوسيط الثالث تُحذف في translate()
+    mapped = {k: v for k, v in CHARACTER_MAP.items() if v}
+    removed = "".join(k for k, v in CHARACTER_MAP.items() if not v)
+    return f"translate(coalesce({column}, ''), '{''.join(mapped)}{removed}', '{''.join(mapped.values())}')"
+
+
+_POSTGRES_VECTOR = f"to_tsvector('simple', {_pg_normalize('content')} || ' ' || {_pg_normalize('source_file')})"
+_POSTGRES_DDL = [
+    f"""ALTER TABLE knowledgeitem ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS ({_POSTGRES_VECTOR}) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_knowledgeitem_search_vector ON knowledgeitem USING GIN (search_vector)",
+]
+
+
+def _normalize_or_none(value):
+    return None if value is None else normalize(str(value))
+
+
+@event.listens_for(Engine, "connect")
+def _register_sqlite_normalize(dbapi_connection, _) -> None:
+    # الـ triggers تستدعيها، فكل اتصال SQLite يكتب في knowledgeitem يحتاجها
+    if hasattr(dbapi_connection, "create_function"):
+        dbapi_connection.create_function(_SQLITE_NORMALIZE, 1, _normalize_or_none, deterministic=True)
+
+
+@dataclass
+class SearchHit:
+    id: int
+    source_file: str
+    category: str | None
+    snippet: str
+    score: float
+    page: int | None = None
+    slide: int | None = None
+    section: str | None = None
+
+    @property
+    def location(self) -> str:
+        """اسم الملف مع رقم الصفحة أو الشريحة إن وُجد، للعرض كمصدر."""
+        if self.page:
+            return f"{self.source_file} (p. {self.page})"
+        if self.slide:
+            return f"{self.source_file} (slide {self.slide})"
+        return self.source_file
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "source_file": self.source_file,
+            "category": self.category,
+            "page": self.page,
+            "slide": self.slide,
+            "section": self.section,
+            "snippet": self.snippet,
+            "score": self.score,
+        }
+
+
+def add_missing_columns(conn, table) -> None:
+    # قواعد بيانات قديمة (knowledge.db / database.db) أنشئت قبل بعض الأعمدة الاختيارية
+    existing = {col["name"] for col in inspect(conn).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in existing and column.nullable:
+            col_type = column.type.compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}")
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """إنشاء الفهرس (مرة واحدة لكل engine) وبناؤه من البيانات الموجودة إن كان جديداً."""
+    if engine in _ready:
+        return
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        KnowledgeItem.__table__.create(conn, checkfirst=True)
+        add_missing_columns(conn, KnowledgeItem.__table__)
+        if dialect == "sqlite":
+            # اتصال فُتح قبل استيراد هذه الوحدة لم يمر بـ _register_sqlite_normalize
+            _register_sqlite_normalize(conn.connection.driver_connection, None)
+            triggers = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = :name"), {"name": _SQLITE_TRIGGERS[0]}
+            ).scalar()
+            # فهرس قديم (نص خام بلا تطبيع) أو غير موجود: triggers جديدة وإعادة الملء
+            current = triggers is not None and _SQLITE_NORMALIZE in triggers
+            if not current:
+                for trigger in _SQLITE_TRIGGERS:
+                    conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+            for ddl in _SQLITE_DDL:
+                conn.exec_driver_sql(ddl)
+            if not current:
+                for ddl in _SQLITE_REINDEX:
+                    conn.exec_driver_sql(ddl)
+        elif dialect == "postgresql":
+            expression = conn.execute(
+                text(
+                    "SELECT generation_expression FROM information_schema.columns "
+                    "WHERE table_name = 'knowledgeitem' AND column_name = 'search_vector'"
+                )
+            ).scalar()
+            if expression is not None and "translate" not in expression:
+                # عمود أُنشئ قبل التطبيع: يُحذف (مع فهرسه) ويُعاد توليده
+                conn.exec_driver_sql("ALTER TABLE knowledgeitem DROP COLUMN search_vector")
+            for ddl in _POSTGRES_DDL:
+                conn.exec_driver_sql(ddl)
+    _ready.add(engine)
+
+
+def _terms(query: str) -> list[str]:
+    # الكلمات الخام لمسار LIKE الذي يقارن بالنص غير المطبَّع
+    tokens = _TOKEN_RE.findall(query.lower())
+    terms = [t for t in tokens if t not in STOPWORDS]
+    return terms or tokens
+
+
+def _normalized_terms(query: str) -> list[str]:
+    return tokenize(query, stemming=False) or tokenize(query, stemming=False, stopwords=False)
+
+
+def _sqlite_match(terms: list[str], match_all: bool) -> str:
+    # كل كلمة بين علامتي تنصيص حتى لا تُفسَّر كعوامل FTS5. مطابقة البادئة للكلمة
+    # الأخيرة فقط (كتابة جارية) لأن توسيع البادئة على كل الكلمات مكلف
+    joiner = " AND " if match_all else " OR "
+    quoted = [f'"{t}"' for t in terms]
+    if len(terms[-1]) >= 3:
+        quoted[-1] += "*"
+    return joiner.join(quoted)
+
+
+def _search_sqlite(db: Session, terms: list[str], limit: int, match_all: bool) -> list[SearchHit]:
+    match = _sqlite_match(terms, match_all)
+    floor = None
+    if RANK_WINDOW > 0:
+        # تحديد أقدم rowid داخل النافذة: مرور سريع على قوائم الفهرس دون حساب bm25
+        floor = db.execute(
+            text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match ORDER BY rowid DESC LIMIT 1 OFFSET :window"),
+            {"match": match, "window": RANK_WINDOW},
+        ).scalar()
+    # bm25 لكل المطابقات، والمقتطف (الأغلى) لأفضل limit صفحة فقط
+    rows = db.execute(
+        text(
+            f"""SELECT k.id, k.source_file, k.category, k.page, k.slide, k.section,
+                   snippet({FTS_TABLE}, 0, '[', ']', '…', {SNIPPET_TOKENS}) AS snippet,
+                   {FTS_TABLE}.rank AS rank
+            FROM {FTS_TABLE}
+            JOIN knowledgeitem AS k ON k.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH :match AND {FTS_TABLE}.rowid IN (
+                SELECT rowid FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH :match AND rowid > :floor
+                ORDER BY rank
+                LIMIT :limit
+            )
+            ORDER BY {FTS_TABLE}.rank"""
+        ),
+        {"match": match, "floor": floor or 0, "limit": limit},
+    ).all()
+    # rank (bm25) في SQLite سالب (الأصغر أفضل)، نعكسه ليكون الأكبر أفضل
+    return [SearchHit(r.id, r.source_file, r.category, r.snippet, -float(r.rank), r.page, r.slide, r.section) for r in rows]
+
+
+def _search_postgres(db: Session, terms: list[str], limit: int, match_all: bool) -> list[SearchHit]:
+    joiner = " & " if match_all else " | "
+    rows = db.execute(
+        text(
+            """SELECT id, source_file, category, page, slide, section,
+                   ts_headline('simple', content, q, 'StartSel=[, StopSel=], MaxWords=35, MinWords=15') AS snippet,
+                   ts_rank_cd(search_vector, q) AS rank
+            FROM knowledgeitem, to_tsquery('simple', :tsquery) AS q
+            WHERE search_vector @@ q
+            ORDER BY rank DESC
+            LIMIT :limit"""
+        ),
+        {"tsquery": joiner.join(terms[:-1] + [f"{terms[-1]}:*"]), "limit": limit},
+    ).all()
+    return [SearchHit(r.id, r.source_file, r.category, r.snippet, float(r.rank), r.page, r.slide, r.section) for r in rows]
+
+
+def _search_like(db: Session, terms: list[str], limit: int, match_all: bool) -> list[SearchHit]:
+    # قواعد بيانات بلا فهرس نصي: مسح عادي كحل احتياطي فقط
+    joiner = " AND " if match_all else " OR "
+    where = joiner.join(f"content LIKE :t{i}" for i in range(len(terms)))
+    params = {f"t{i}": f"%{t}%" for i, t in enumerate(terms)}
+    rows = db.execute(
+        text(f"SELECT id, source_file, category, page, slide, section, content FROM knowledgeitem WHERE {where} LIMIT :limit"),
+        {**params, "limit": limit},
+    ).all()
+    return [
+        SearchHit(r.id, r.source_file, r.category, (r.content or "")[:200], 0.0, r.page, r.slide, r.section)
+        for r in rows
+    ]
+
+
+def search_knowledge(db: Session, query: str, limit: int = 5) -> list[SearchHit]:
+    """بحث نصي كامل مرتب حسب الصلة في قاعدة المعرفة.
+
+    نبحث أولاً عن الصفحات التي تحتوي كل الكلمات (تقاطع قوائم أصغر وأسرع)،
+    ثم نكمل بالصفحات التي تحتوي بعضها فقط إذا لم تكفِ النتائج.
+    """
+    engine = db.get_bind()
+    backend = {"sqlite": _search_sqlite, "postgresql": _search_postgres}.get(engine.dialect.name, _search_like)
+    terms = _terms(query) if backend is _search_like else _normalized_terms(query)
+    if not terms:
+        return []
+    ensure_search_index(engine)
+
+    hits = backend(db, terms, limit, True)
+    if len(hits) < limit and len(terms) > 1:
+        seen = {hit.id for hit in hits}
+        hits += [hit for hit in backend(db, terms, limit, False) if hit.id not in seen][: limit - len(hits)]
+    return hits
@@ -0,0 +1,244 @@
+"""
+سحب الملفات المرفوعة إلى قاعدة المعرفة في الخلفية.
+
+ملفات PDF/DOCX/PPTX التي يرفعها المعلمون (superusers) تُوضع في طابور بعد
+الرفع مباشرة، والطلب يرجع دون انتظار الاستخراج:
+- thread واحد في كل عملية ويب يسحب المهام من الطابور، والاستخراج نفسه
+  (iter_records، نفس مستخرجات ingest.py) يعمل في عملية منفصلة.
+- المقاطع تُكتب في knowledgeitem مع سجل ingest_manifest للملف، فنفس المحتوى
+  المرفوع مرتين (نفس الـ blob) لا يُستخرج مرتين. فهرس FTS يُحدَّث تلقائياً.
+- بعد أن يفرغ الطابور تُحدَّث فهارس المتجهات (للمقاطع الجديدة فقط) و BM25
+  مرة واحدة للدفعة، إن كانت مبنية مسبقاً.
+
+حالة كل ملف محفوظة في جدول knowledge_upload_job (queued/running/done/failed)
+فتظهر لكل العمليات. الـ thread يبدأ مع التطبيق (start في app/main.py)، ويفحص
+الجدول عند بدئه وكل KNOWLEDGE_JOB_POLL_SECONDS حين يكون خاملاً:
+- مهام queued (من تشغيل سابق أو عملية توقفت) تُسحب؛ أخذ المهمة ذري فلا
+  تستخرجها عمليتان.
+- مهمة running تُحدِّث heartbeat_at كل KNOWLEDGE_JOB_HEARTBEAT_SECONDS أثناء
+  الاستخراج، ولا تعود إلى queued إلا إذا توقف نبضها أكثر من
+  KNOWLEDGE_JOB_STALE_SECONDS (عمليتها ماتت)، لا لمجرد أن عملية أخرى بدأت.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..models import IngestManifestEntry, KnowledgeItem, KnowledgeUploadJob, UserFile
+from .extraction import is_supported, iter_records
+from .ingest_manifest import normalize_path
+from .knowledge_search import add_missing_columns, ensure_search_index
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_EXTRACT_WORKERS = int(os.getenv("KNOWLEDGE_EXTRACT_WORKERS", "1"))
+KNOWLEDGE_JOB_HEARTBEAT_SECONDS = float(os.getenv("KNOWLEDGE_JOB_HEARTBEAT_SECONDS", "30"))
+KNOWLEDGE_JOB_STALE_SECONDS = float(os.getenv("KNOWLEDGE_JOB_STALE_SECONDS", "300"))
+KNOWLEDGE_JOB_POLL_SECONDS = float(os.getenv("KNOWLEDGE_JOB_POLL_SECONDS", "60"))
+UPLOAD_FOLDER_NAME = "uploads"
+BATCH_SIZE = 200
+
+
+def _extract(path: str, filename: str) -> list[dict]:
+    # يُنفَّذ في عملية منفصلة حتى لا يحجز الاستخراج الـ GIL عن الطلبات
+    return list(iter_records(path, UPLOAD_FOLDER_NAME, filename))
+
+
+def should_index(user, row: UserFile) -> bool:
+    return bool(getattr(user, "is_superuser", False)) and is_supported(row.original_filename)
+
+
+def _refresh_search_indexes(db: Session) -> None:
+    """تحديث الفهارس المبنية مسبقاً فقط؛ بدونها يكفي البحث النصي (FTS)."""
+    from .bm25 import build_bm25_index, default_bm25_path
+    from .vector_index import default_index_path, get_vector_index, sync_vector_index
+
+    engine = db.get_bind()
+    if get_vector_index(engine) is not None:
+        sync_vector_index(db, default_index_path(engine))
+    bm25_path = default_bm25_path(engine)
+    if os.path.exists(bm25_path):
+        build_bm25_index(db, bm25_path)
+
+
+class KnowledgeIndexer:
+    def __init__(self, session_factory=None, workers: int = KNOWLEDGE_EXTRACT_WORKERS, executor: Executor | None = None, extract=_extract, refresh=_refresh_search_indexes):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.extract = extract
+        self.refresh = refresh
+        self._executor = executor
+        self._queue: queue.Queue[str] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._ready: set[Engine] = set()
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def ensure_tables(self, engine: Engine) -> None:
+        if engine in self._ready:
+            return
+        ensure_search_index(engine)
+        with engine.begin() as conn:
+            IngestManifestEntry.__table__.create(conn, checkfirst=True)
+            KnowledgeUploadJob.__table__.create(conn, checkfirst=True)
+            add_missing_columns(conn, KnowledgeUploadJob.__table__)
+        self._ready.add(engine)
+
+    def enqueue(self, db: Session, row: UserFile) -> KnowledgeUploadJob:
+        """تسجيل المهمة (commit) ووضعها في الطابور."""
+        engine = db.get_bind()
+        self.ensure_tables(engine)
+        job = db.get(KnowledgeUploadJob, row.id)
+        if job is None:
+            job = KnowledgeUploadJob(file_id=row.id, created_at=datetime.utcnow())
+            db.add(job)
+        job.status, job.items, job.error, job.finished_at = "queued", 0, None, None
+        db.commit()
+        self.start(engine)
+        self._queue.put(row.id)
+        return job
+
+    def start(self, engine: Engine) -> None:
+        """تشغيل الـ thread (مرة واحدة لكل عملية) بعد سحب المهام المعلقة في القاعدة."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self.ensure_tables(engine)
+            if self.session_factory is None:
+                self.session_factory = sessionmaker(bind=engine, autoflush=False)
+            self._resume()
+            self._thread = threading.Thread(target=self._loop, name="knowledge-indexer", daemon=True)
+            self._thread.start()
+
+    def _resume(self) -> None:
+        """إعادة المهام المتوقفة إلى queued ووضع كل مهام queued في طابور هذه العملية."""
+        stale = datetime.utcnow() - timedelta(seconds=KNOWLEDGE_JOB_STALE_SECONDS)
+        with self.session_factory() as db:
+            db.execute(
+                update(KnowledgeUploadJob)
+                .where(
+                    KnowledgeUploadJob.status == "running",
+                    or_(KnowledgeUploadJob.heartbeat_at.is_(None), KnowledgeUploadJob.heartbeat_at < stale),
+                )
+                .values(status="queued")
+            )
+            db.commit()
+            for file_id in db.execute(
+                select(KnowledgeUploadJob.file_id).where(KnowledgeUploadJob.status == "queued").order_by(KnowledgeUploadJob.created_at)
+            ).scalars():
+                self._queue.put(file_id)
+
+    def _loop(self) -> None:
+        dirty = False
+        while True:
+            try:
+                file_id = self._queue.get(timeout=1.0 if dirty else KNOWLEDGE_JOB_POLL_SECONDS)
+            except queue.Empty:
+                try:
+                    if dirty:
+                        # الطابور فرغ: تحديث الفهارس مرة واحدة لكل الملفات الجديدة
+                        with self.session_factory() as db:
+                            self.refresh(db)
+                    else:
+                        self._resume()
+                except Exception:
+                    logger.exception("knowledge indexer maintenance failed")
+                dirty = False
+                continue
+            try:
+                dirty = self.process(file_id) or dirty
+            except Exception:
+                logger.exception("knowledge indexing of %s crashed", file_id)
+            finally:
+                self._queue.task_done()
+
+    def process(self, file_id: str) -> bool:
+        """استخراج ملف واحد وكتابة مقاطعه. يرجع True إذا أضيفت مقاطع جديدة."""
+        with self.session_factory() as db:
+            job = db.get(KnowledgeUploadJob, file_id)
+            row = db.get(UserFile, file_id)
+            if job is None or job.status != "queued":
+                return False
+            if row is None:
+                job.status, job.error, job.finished_at = "failed", "File was deleted", datetime.utcnow()
+                db.commit()
+                return False
+
+            key = normalize_path(row.stored_path)
+            entry = db.get(IngestManifestEntry, key)
+            if entry is not None and entry.sha256 == row.sha256:
+                # نفس المحتوى سُحب من قبل (رفع مكرر لنفس الملف)
+                job.status, job.items, job.finished_at = "done", entry.items, datetime.utcnow()
+                db.commit()
+                return False
+
+            # عملية أخرى ربما أخذت نفس المهمة (استئناف بعد إعادة التشغيل)
+            claimed = db.execute(
+                update(KnowledgeUploadJob)
+                .where(KnowledgeUploadJob.file_id == file_id, KnowledgeUploadJob.status == "queued")
+                .values(status="running", heartbeat_at=datetime.utcnow())
+            ).rowcount
+            db.commit()
+            if not claimed:
+                return False
+            try:
+                future = self.executor.submit(self.extract, row.stored_path, row.original_filename)
+                while True:
+                    try:
+                        records = future.result(timeout=KNOWLEDGE_JOB_HEARTBEAT_SECONDS)
+                        break
+                    except FutureTimeout:
+                        # نبض: العمليات الأخرى لا تعيد مهمة ما زالت قيد الاستخراج
+                        db.execute(
+                            update(KnowledgeUploadJob).where(KnowledgeUploadJob.file_id == file_id).values(heartbeat_at=datetime.utcnow())
+                        )
+                        db.commit()
+            except Exception as e:
+                job.status, job.error, job.finished_at = "failed", f"{type(e).__name__}: {e}", datetime.utcnow()
+                db.commit()
+                return False
+
+            # الحذف والإدراج وسجل الملف في معاملة واحدة: لا يظهر ملف نصف مسحوب
+            db.execute(delete(KnowledgeItem).where(KnowledgeItem.source_path == key))
+            for start in range(0, len(records), BATCH_SIZE):
+                db.execute(KnowledgeItem.__table__.insert(), records[start:start + BATCH_SIZE])
+            st = os.stat(row.stored_path)
+            db.merge(IngestManifestEntry(
+                path=key, size=st.st_size, mtime_ns=st.st_mtime_ns, sha256=row.sha256,
+                items=len(records), ingested_at=datetime.utcnow(),
+            ))
+            job.status, job.items, job.finished_at = "done", len(records), datetime.utcnow()
+            db.commit()
+            return bool(records)
+
+    def wait(self) -> None:
+        """انتظار انتهاء كل المهام الموجودة في الطابور (للسكربتات والاختبارات)."""
+        self._queue.join()
+
+
+def job_status(db: Session, file_id: str) -> dict | None:
+    job = db.get(KnowledgeUploadJob, file_id)
+    if job is None:
+        return None
+    return {"file_id": job.file_id, "status": job.status, "items": job.items, "error": job.error, "finished_at": job.finished_at}
+
+
+def queue_status(db: Session) -> dict:
+    counts = dict(db.execute(select(KnowledgeUploadJob.status, func.count()).group_by(KnowledgeUploadJob.status)).all())
+    return {status: counts.get(status, 0) for status in ("queued", "running", "done", "failed")}
+
+
+knowledge_indexer = KnowledgeIndexer()
@@ -0,0 +1,99 @@
+"""
+ترقيم الصفحات بالمفتاح (keyset) بدل OFFSET.
+
+OFFSET n يجعل القاعدة تقرأ n صفاً ثم تهملها، فالصفحة 1000 أبطأ بكثير من
+الأولى. هنا كل صفحة تبدأ بعد آخر صف في الصفحة السابقة مباشرة
+(WHERE (title, id) > (:title, :id) ORDER BY title, id LIMIT n) فتقرأ من الفهرس
+نفس عدد الصفوف أياً كان عمقها.
+
+- المؤشر (cursor) نص مبهم (base64) يحمل قيم مفاتيح آخر صف واسم الترتيب؛
+  العميل يرسله كما هو في after ولا يبني عليه.
+- لا COUNT في كل طلب: estimated_total اختياري ومن إحصاءات القاعدة
+  (pg_class.reltuples في Postgres، وأكبر مفتاح أساسي في غيرها).
+- المفاتيح التي تقبل NULL تُرتب NULL أولاً في كل القواعد. في Postgres يحتاج
+  فهرسها NULLS FIRST صريحاً، وإلا رتّبت القاعدة كل الصفوف بعد المؤشر في كل
+  صفحة؛ المفاتيح NOT NULL تُرتب ASC عادياً فيكفيها الفهرس الافتراضي.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from sqlalchemy import Select, and_, func, or_, select, text, tuple_
+
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class Keyset:
+    def __init__(self, name: str, *columns):
+        self.name = name
+        self.columns = columns
+
+    def apply(self, stmt: Select, after: str | None, limit: int) -> Select:
+        """ترتيب وشرط البداية؛ يطلب صفاً زائداً ليعرف page() إن كانت هناك صفحة تالية."""
+        stmt = stmt.order_by(*(c.asc().nulls_first() if _nullable(c) else c.asc() for c in self.columns))
+        if after:
+            stmt = stmt.where(self._after(self.decode(after)))
+        return stmt.limit(limit + 1)
+
+    def page(self, rows, limit: int) -> tuple[list, str | None]:
+        rows = list(rows)
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, self.encode(rows[-1])
+
+    def _after(self, values: list):
+        if None not in values:
+            # مقارنة الصفوف تستخدم الفهرس المركب مباشرة؛ صفوف NULL سبقت المؤشر
+            return tuple_(*self.columns) > tuple_(*values)
+        # مؤشر فيه NULL: المقارنة مفصلة إلى OR (نادر؛ NULL في بداية الترتيب فقط)
+        clauses = []
+        for i, (column, value) in enumerate(zip(self.columns, values, strict=True)):
+            equal = [c.is_(None) if v is None else c == v for c, v in zip(self.columns[:i], values[:i], strict=True)]
+            greater = column.is_not(None) if value is None else column > value
+            clauses.append(and_(*equal, greater))
+        return or_(*clauses)
+
+    def encode(self, row) -> str:
+        values = [_dump(getattr(row, c.key)) for c in self.columns]
+        raw = json.dumps({"o": self.name, "v": values}, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode(self, cursor: str) -> list:
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            if data["o"] != self.name or len(data["v"]) != len(self.columns):
+                raise ValueError("cursor belongs to another ordering")
+            return [_load(c, v) for c, v in zip(self.columns, data["v"], strict=True)]
+        except (ValueError, KeyError, TypeError, binascii.Error) as e:
+            raise InvalidCursor("Invalid pagination cursor") from e
+
+
+def _nullable(column) -> bool:
+    return getattr(column.expression, "nullable", True)
+
+
+def _dump(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def _load(column, value):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type in (date, datetime):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+
+def estimated_total_stmt(dialect: str, table, key):
+    """استعلام عدد تقريبي سريع؛ لا يمسح الجدول."""
+    if dialect == "postgresql":
+        return text("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = to_regclass(:name)").bindparams(name=table.name)
+    # أكبر مفتاح أساسي: من طرف الفهرس مباشرة، ويزيد قليلاً عن الفعلي بعد الحذف
+    return select(func.coalesce(func.max(key), 0)).select_from(table)
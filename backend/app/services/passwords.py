@@ -0,0 +1,105 @@
+"""
+تشفير كلمات المرور (bcrypt) خارج حلقة الأحداث.
+
+bcrypt بطيء عمداً (~250ms لكل عملية بـ 12 جولة)، فتنفيذه داخل معالج async
+يوقف كل الطلبات، وتنفيذه في threadpool الافتراضي (40 thread) يحجز خيوط بقية
+المسارات المتزامنة أثناء موجة تسجيل دخول (بداية الحصة مثلاً):
+- executor مخصص بعدد خيوط = عدد الأنوية (PASSWORD_HASH_WORKERS)؛ مكتبة bcrypt
+  تحرر الـ GIL أثناء الحساب، فالخيوط تعمل على التوازي فعلاً.
+- حد لعدد العمليات المعلقة في كل عملية ويب (PASSWORD_HASH_MAX_PENDING)؛ ما
+  يزيد عنه يُرفض فوراً بـ PasswordHasherBusy (503 + Retry-After) بدل أن
+  يتراكم الطابور ويتجاوز زمن الانتظار مهلة العميل.
+- طلب انقطع قبل أن يبدأ تشفيره يُلغى من الطابور ولا يستهلك وقت المعالج.
+
+الصيغة $2b$ نفسها التي تنتجها passlib، فكلمات المرور المحفوظة سابقاً تبقى صالحة.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+import bcrypt
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "256"))
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "12"))
+# bcrypt يستخدم أول 72 بايت فقط؛ passlib كانت تقصّها بصمت و bcrypt>=5 يرفض الأطول
+BCRYPT_MAX_BYTES = 72
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _secret(password: str) -> bytes:
+    return password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+
+
+def hash_password(password: str, rounds: int = PASSWORD_HASH_ROUNDS) -> str:
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(rounds)).decode("ascii")
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(_secret(password), hashed.encode("ascii"))
+    except (ValueError, UnicodeEncodeError):
+        # قيمة محفوظة ليست bcrypt صالحاً
+        return False
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+        rounds: int = PASSWORD_HASH_ROUNDS,
+        executor: Executor | None = None,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._executor = executor
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHasherBusy(f"password hashing queue is full ({self.max_pending} pending)")
+            self._pending += 1
+        try:
+            future: Future = self.executor.submit(fn, *args)
+        except Exception:
+            self._done()
+            raise
+        future.add_done_callback(lambda _: self._done())
+        # إلغاء الطلب (انقطاع العميل) يلغي الـ future إن لم يبدأ بعد
+        return await asyncio.wrap_future(future)
+
+    def _done(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(verify_password, password, hashed)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
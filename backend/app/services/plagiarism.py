@@ -0,0 +1,299 @@
+"""
+كشف الانتحال بين تسليمات الطلاب باستخدام MinHash + LSH.
+
+- كل تسليم يُقسَّم إلى shingles (كل 3 كلمات متتالية بعد التطبيع) ويُلخَّص في
+  توقيع MinHash من NUM_PERM رقماً. نسبة تطابق توقيعين تقدير لتشابه Jaccard.
+- التوقيعات تُقسم إلى BANDS شريحة؛ تسليمان يشتركان في شريحة كاملة واحدة على
+  الأقل يصبحان "مرشحين" فقط، فلا يُقارن التسليم الجديد إلا بعدد صغير من
+  التسليمات بدلاً من كلها (بدلاً من 125 ألف مقارنة لـ 500 طالب).
+
+التوقيعات محفوظة في جدول submission_fingerprint فلا يُعاد حسابها إلا إذا تغير
+نص التسليم، والفهرس العام يُحمَّل مرة واحدة لكل عملية ويُكمَّل تدريجياً بحسب
+updated_at (فيصل إليه أيضاً ما أعادت عمليات أخرى حسابه). التسليمات التي لم
+تُفحص قط تُحسب توقيعاتها قبل كل فحص، فالمقارنة تشمل كل التسليمات السابقة.
+"""
+import hashlib
+import threading
+import weakref
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..models import Submission, SubmissionFingerprint
+from .arabic import tokenize
+from .knowledge_search import add_missing_columns
+
+NUM_PERM = 128
+BANDS = 32  # 4 صفوف لكل شريحة => عتبة الترشيح ≈ (1/32)^(1/4) ≈ 0.42
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.5
+
+# أكبر عدد أولي أصغر من 2^32: a*x + b < 2^64 دائماً فلا يحدث overflow في uint64
+_PRIME = np.uint64(4294967291)
+# البذرة ثابتة: التوقيعات المحفوظة يجب أن تبقى قابلة للمقارنة بين التشغيلات
+_rng = np.random.default_rng(20260109)
+_A = _rng.integers(1, int(_PRIME), NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, int(_PRIME), NUM_PERM, dtype=np.uint64)
+_BLOCK = 4096
+# هامش إعادة القراءة عند المزامنة: commit يتأخر عن وقت updated_at، وساعات العمليات تختلف قليلاً
+SYNC_OVERLAP = timedelta(seconds=60)
+
+_ready = weakref.WeakSet()
+
+
+def ensure_plagiarism_tables(engine: Engine) -> None:
+    if engine in _ready:
+        return
+    with engine.begin() as conn:
+        Submission.__table__.create(conn, checkfirst=True)
+        add_missing_columns(conn, Submission.__table__)
+        SubmissionFingerprint.__table__.create(conn, checkfirst=True)
+    _ready.add(engine)
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """بصمات 32-bit لكل shingle (بلا تكرار). النصوص القصيرة تُعامل كـ shingle واحد."""
+    tokens = tokenize(text, stemming=False, stopwords=False)
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    if len(tokens) < SHINGLE_SIZE:
+        grams = [" ".join(tokens)]
+    else:
+        grams = [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+    return np.unique(hashes)
+
+
+def minhash(hashes: np.ndarray) -> np.ndarray:
+    """توقيع MinHash: أصغر قيمة لكل دالة (a*x + b) mod p على كل الـ shingles."""
+    signature = np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    for start in range(0, len(hashes), _BLOCK):
+        block = hashes[start:start + _BLOCK, None]
+        np.minimum(signature, ((block * _A + _B) % _PRIME).min(axis=0), out=signature)
+    return signature.astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """تقدير تشابه Jaccard من توقيعين."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+@dataclass
+class PlagiarismIndex:
+    signatures: dict[int, np.ndarray] = field(default_factory=dict)
+    groups: dict[int, int | None] = field(default_factory=dict)
+    buckets: list[dict[bytes, set[int]]] = field(default_factory=lambda: [{} for _ in range(BANDS)])
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    @staticmethod
+    def _keys(signature: np.ndarray):
+        bands = signature.reshape(BANDS, ROWS)
+        return [band.tobytes() for band in bands]
+
+    def add(self, item_id: int, signature: np.ndarray, group: int | None = None) -> None:
+        self.discard(item_id)
+        self.signatures[item_id] = signature
+        self.groups[item_id] = group
+        for band, key in enumerate(self._keys(signature)):
+            self.buckets[band].setdefault(key, set()).add(item_id)
+
+    def discard(self, item_id: int) -> None:
+        signature = self.signatures.pop(item_id, None)
+        if signature is None:
+            return
+        self.groups.pop(item_id, None)
+        for band, key in enumerate(self._keys(signature)):
+            members = self.buckets[band].get(key)
+            if members is not None:
+                members.discard(item_id)
+                if not members:
+                    del self.buckets[band][key]
+
+    def candidates(self, signature: np.ndarray) -> set[int]:
+        found: set[int] = set()
+        for band, key in enumerate(self._keys(signature)):
+            found |= self.buckets[band].get(key, set())
+        return found
+
+    def query(self, signature: np.ndarray, threshold: float = DEFAULT_THRESHOLD, group=None, exclude=None) -> list[tuple[int, float]]:
+        """التسليمات المشابهة (id, تشابه) مرتبة تنازلياً؛ group يحصر البحث في درس واحد."""
+        matches = []
+        for item_id in self.candidates(signature):
+            if item_id == exclude or (group is not None and self.groups.get(item_id) != group):
+                continue
+            score = similarity(signature, self.signatures[item_id])
+            if score >= threshold:
+                matches.append((item_id, score))
+        return sorted(matches, key=lambda m: (-m[1], m[0]))
+
+    def candidate_pairs(self) -> set[tuple[int, int]]:
+        pairs = set()
+        for buckets in self.buckets:
+            for members in buckets.values():
+                if len(members) > 1:
+                    ordered = sorted(members)
+                    pairs.update((a, b) for i, a in enumerate(ordered) for b in ordered[i + 1:])
+        return pairs
+
+
+def _content_sha256(text: str | None) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def fingerprint(db: Session, submission: Submission) -> SubmissionFingerprint:
+    """توقيع التسليم من الجدول، أو حسابه وحفظه إذا كان جديداً أو تغير نصه."""
+    digest = _content_sha256(submission.content_text)
+    row = db.get(SubmissionFingerprint, submission.id)
+    if row is not None and row.content_sha256 == digest:
+        return row
+    hashes = shingle_hashes(submission.content_text or "")
+    if row is None:
+        row = SubmissionFingerprint(submission_id=submission.id)
+        db.add(row)
+    row.lesson_id = submission.lesson_id
+    row.content_sha256 = digest
+    row.shingles = len(hashes)
+    row.signature = minhash(hashes).tobytes()
+    row.updated_at = datetime.utcnow()
+    return row
+
+
+def backfill_fingerprints(db: Session, lesson_id: int | None = None, batch: int = 500) -> int:
+    """حساب توقيعات التسليمات التي لم تُفحص قط (أو تسليمات درس واحد فقط)."""
+    missing = (
+        select(Submission)
+        .outerjoin(SubmissionFingerprint, SubmissionFingerprint.submission_id == Submission.id)
+        .where(SubmissionFingerprint.submission_id.is_(None))
+        .order_by(Submission.id)
+        .limit(batch)
+    )
+    if lesson_id is not None:
+        missing = missing.where(Submission.lesson_id == lesson_id)
+    total = 0
+    while True:
+        submissions = db.execute(missing).scalars().all()
+        if not submissions:
+            return total
+        for submission in submissions:
+            fingerprint(db, submission)
+        db.commit()
+        total += len(submissions)
+
+
+def _signature(row: SubmissionFingerprint) -> np.ndarray:
+    return np.frombuffer(row.signature, dtype=np.uint32)
+
+
+class _SharedIndex:
+    """الفهرس العام للعملية؛ يقرأ فقط التوقيعات التي تغيرت منذ آخر تحميل."""
+
+    def __init__(self):
+        self.index = PlagiarismIndex()
+        self.synced_until: datetime | None = None
+        self.lock = threading.Lock()
+
+    def sync(self, db: Session) -> PlagiarismIndex:
+        query = select(
+            SubmissionFingerprint.submission_id,
+            SubmissionFingerprint.lesson_id,
+            SubmissionFingerprint.signature,
+            SubmissionFingerprint.shingles,
+            SubmissionFingerprint.updated_at,
+        )
+        if self.synced_until is not None:
+            # إعادة إضافة توقيع موجود لا تغير شيئاً، فالتداخل مع المزامنة السابقة آمن
+            query = query.where(SubmissionFingerprint.updated_at >= self.synced_until - SYNC_OVERLAP)
+        for r in db.execute(query):
+            if r.shingles:
+                self.index.add(r.submission_id, np.frombuffer(r.signature, dtype=np.uint32), r.lesson_id)
+            else:
+                self.index.discard(r.submission_id)
+            if r.updated_at is not None and (self.synced_until is None or r.updated_at > self.synced_until):
+                self.synced_until = r.updated_at
+        if self.synced_until is None:
+            self.synced_until = datetime.utcnow()
+        return self.index
+
+
+_shared: "weakref.WeakKeyDictionary[Engine, _SharedIndex]" = weakref.WeakKeyDictionary()
+_shared_lock = threading.Lock()
+
+
+def check_submission(db: Session, submission: Submission, threshold: float = DEFAULT_THRESHOLD, same_lesson: bool = False) -> list[tuple[int, float]]:
+    """التسليمات السابقة المشابهة لهذا التسليم، ثم إضافته للفهرس."""
+    engine = db.get_bind()
+    ensure_plagiarism_tables(engine)
+    row = fingerprint(db, submission)
+    db.commit()
+    backfill_fingerprints(db, submission.lesson_id if same_lesson else None)
+    with _shared_lock:
+        shared = _shared.setdefault(engine, _SharedIndex())
+    with shared.lock:
+        index = shared.sync(db)
+        signature = _signature(row)
+        if not row.shingles:
+            index.discard(submission.id)
+            return []
+        # التوقيع الحالي يُضاف مباشرة ولو كان updated_at أقدم من آخر مزامنة
+        index.add(submission.id, signature, row.lesson_id)
+        group = submission.lesson_id if same_lesson else None
+        return index.query(signature, threshold, group=group, exclude=submission.id)
+
+
+def lesson_report(db: Session, lesson_id: int, threshold: float = DEFAULT_THRESHOLD) -> dict:
+    """تقرير التشابه الكامل لكل تسليمات درس (واجب) واحد."""
+    ensure_plagiarism_tables(db.get_bind())
+    submissions = db.execute(select(Submission).where(Submission.lesson_id == lesson_id).order_by(Submission.id)).scalars().all()
+    index = PlagiarismIndex()
+    for submission in submissions:
+        row = fingerprint(db, submission)
+        if row.shingles:
+            index.add(submission.id, _signature(row), lesson_id)
+    db.commit()
+
+    candidates = index.candidate_pairs()
+    pairs = []
+    for a, b in candidates:
+        score = similarity(index.signatures[a], index.signatures[b])
+        if score >= threshold:
+            pairs.append((a, b, score))
+    pairs.sort(key=lambda p: (-p[2], p[0], p[1]))
+
+    # مجموعات التسليمات المتشابهة (مكونات مترابطة) عبر union-find
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b, _ in pairs:
+        parent[find(a)] = find(b)
+    clusters: dict[int, list[int]] = {}
+    for item in parent:
+        clusters.setdefault(find(item), []).append(item)
+
+    users = {s.id: s.user_id for s in submissions}
+    total = len(index)
+    return {
+        "lesson_id": lesson_id,
+        "threshold": threshold,
+        "submissions": len(submissions),
+        "compared_pairs": len(candidates),
+        "all_pairs": total * (total - 1) // 2,
+        "pairs": [
+            {"submission_a": a, "submission_b": b, "user_a": users.get(a), "user_b": users.get(b), "similarity": round(score, 3)}
+            for a, b, score in pairs
+        ],
+        "clusters": sorted((sorted(c) for c in clusters.values()), key=lambda c: (-len(c), c[0])),
+    }
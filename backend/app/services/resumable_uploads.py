@@ -0,0 +1,262 @@
+"""
+رفع قابل للاستئناف (على نمط بروتوكول tus) للاتصالات الضعيفة.
+
+1. POST ينشئ جلسة رفع بالحجم الكلي ويرجع رقمها.
+2. PUT/PATCH يرسل جزءاً يبدأ من Upload-Offset؛ البايتات تُضاف مباشرة إلى ملف
+   جزئي واحد (لا ملفات أجزاء تُجمَّع لاحقاً)، وما وصل قبل انقطاع الاتصال يُحتسب.
+3. HEAD يرجع الموضع الحالي ليكمل العميل من حيث توقف.
+4. finalize ينقل الملف المكتمل إلى مخزن المحتوى ويسجله في user_file.
+
+كل PATCH يحجز الجلسة أولاً بتحديث ذري في القاعدة (WHERE offset = الموضع
+المتوقع ولا حجز ساري)، فطلبان على نفس الموضع من عمليتين مختلفتين لا يكتبان
+معاً في الملف الجزئي؛ الثاني يأخذ 409. الحجز ينتهي بعد UPLOAD_CLAIM_SECONDS
+إن توقف صاحبه، ويُجدَّد أثناء الكتابة.
+
+بصمة SHA-256 تُحدَّث مع كل جزء وتبقى في ذاكرة العملية، فلا يُعاد قراءة الملف
+عند الإنهاء. إذا وصل الجزء التالي إلى عملية أخرى (أو بعد إعادة تشغيل) تُحسب
+البصمة مرة واحدة من الجزء الموجود على القرص ثم تكمل من هناك.
+
+الجلسات التي لا يصلها جزء خلال UPLOAD_SESSION_TTL تُحذف مع ملفاتها تلقائياً
+(عند إنشاء جلسة جديدة، ومن scripts/gc_uploads.py).
+"""
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import anyio
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from ..models import UploadSession, UserFile
+from .blob_store import BlobStore
+from .uploads import (
+    UPLOAD_CHUNK_SIZE,
+    HashingWriter,
+    UploadError,
+    UploadTooLarge,
+    ensure_upload_tables,
+    store_file,
+    user_upload_limit,
+)
+
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+UPLOAD_CLAIM_SECONDS = int(os.getenv("UPLOAD_CLAIM_SECONDS", "120"))
+_HASH_BLOCK = 4 * 1024 * 1024
+
+
+class OffsetMismatch(UploadError):
+    status_code = 409
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload-Offset does not match the current offset ({offset})")
+        self.offset = offset
+
+
+class UploadInProgress(UploadError):
+    status_code = 409
+
+
+# رقم الجلسة -> (الموضع، بصمة حتى هذا الموضع)
+_hashers: dict[str, tuple[int, "hashlib._Hash"]] = {}
+_hashers_lock = threading.Lock()
+
+
+def _partial_path(store: BlobStore, session_id: str) -> str:
+    return os.path.join(store.tmp_dir, session_id + ".upload")
+
+
+def create_session(db: Session, user, filename: str, length: int, content_type: str | None, directory: str) -> UploadSession:
+    if length < 0:
+        raise UploadError("Upload-Length must not be negative")
+    store = BlobStore(directory)
+    expire_sessions(db, directory)
+    limit = user_upload_limit(db, user)
+    if length > limit:
+        raise UploadTooLarge(f"File exceeds the upload limit of {limit} bytes")
+    now = datetime.utcnow()
+    row = UploadSession(
+        id=uuid4().hex,
+        owner_id=str(user.id),
+        filename=os.path.basename(filename),
+        content_type=content_type,
+        length=length,
+        offset=0,
+        created_at=now,
+        expires_at=now + timedelta(seconds=UPLOAD_SESSION_TTL),
+    )
+    os.makedirs(store.tmp_dir, exist_ok=True)
+    open(_partial_path(store, row.id), "wb").close()
+    db.add(row)
+    db.commit()
+    with _hashers_lock:
+        _hashers[row.id] = (0, hashlib.sha256())
+    return row
+
+
+def get_session(db: Session, user, session_id: str) -> UploadSession | None:
+    ensure_upload_tables(db.get_bind())
+    row = db.get(UploadSession, session_id)
+    if row is None or row.owner_id != str(user.id) or row.expires_at < datetime.utcnow():
+        return None
+    return row
+
+
+def _digest_at(path: str, session_id: str, offset: int):
+    """بصمة أول offset بايت من الملف الجزئي؛ من الذاكرة إن أمكن."""
+    # بايتات كُتبت بعد آخر موضع محفوظ (انقطاع قبل حفظه) تُهمل
+    if os.path.getsize(path) != offset:
+        os.truncate(path, offset)
+    with _hashers_lock:
+        cached = _hashers.pop(session_id, None)
+    if cached is not None and cached[0] == offset:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(_HASH_BLOCK):
+            digest.update(block)
+    return digest
+
+
+def _resume_writer(path: str, session_id: str, offset: int) -> HashingWriter:
+    return HashingWriter(path, digest=_digest_at(path, session_id, offset), append=True)
+
+
+def _claim(db: Session, session_id: str, offset: int) -> str | None:
+    """حجز الجلسة للكتابة عند offset؛ يرجع رمز الحجز أو None إن سبقنا طلب آخر."""
+    token = uuid4().hex
+    now = datetime.utcnow()
+    claimed = db.execute(
+        update(UploadSession)
+        .where(
+            UploadSession.id == session_id,
+            UploadSession.offset == offset,
+            or_(UploadSession.claimed_until.is_(None), UploadSession.claimed_until < now),
+        )
+        .values(claimed_by=token, claimed_until=now + timedelta(seconds=UPLOAD_CLAIM_SECONDS))
+    ).rowcount
+    db.commit()
+    return token if claimed else None
+
+
+def _renew(db: Session, session_id: str, token: str) -> bool:
+    renewed = db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == session_id, UploadSession.claimed_by == token)
+        .values(claimed_until=datetime.utcnow() + timedelta(seconds=UPLOAD_CLAIM_SECONDS))
+    ).rowcount
+    db.commit()
+    return bool(renewed)
+
+
+def _release(db: Session, session_id: str, token: str, offset: int) -> bool:
+    released = db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == session_id, UploadSession.claimed_by == token)
+        .values(
+            offset=offset,
+            claimed_by=None,
+            claimed_until=None,
+            expires_at=datetime.utcnow() + timedelta(seconds=UPLOAD_SESSION_TTL),
+        )
+    ).rowcount
+    db.commit()
+    return bool(released)
+
+
+async def append(request: Request, db: Session, row: UploadSession, offset: int, directory: str) -> int:
+    """إضافة جسم الطلب عند offset؛ يرجع الموضع الجديد حتى لو انقطع الاتصال في المنتصف."""
+    token = await anyio.to_thread.run_sync(_claim, db, row.id, offset)
+    if token is None:
+        await anyio.to_thread.run_sync(db.refresh, row)
+        if offset != row.offset:
+            raise OffsetMismatch(row.offset)
+        raise UploadInProgress("Another request is writing to this upload")
+    path = _partial_path(BlobStore(directory), row.id)
+    writer = await anyio.to_thread.run_sync(_resume_writer, path, row.id, offset)
+    remaining = row.length - offset
+    pending = bytearray()
+    renew_at = time.monotonic() + UPLOAD_CLAIM_SECONDS / 2
+    lost = False
+    try:
+        async for chunk in request.stream():
+            if writer.size + len(pending) + len(chunk) > remaining:
+                raise UploadError("Chunk goes past Upload-Length")
+            pending.extend(chunk)
+            if len(pending) >= UPLOAD_CHUNK_SIZE:
+                if time.monotonic() >= renew_at:
+                    if not await anyio.to_thread.run_sync(_renew, db, row.id, token):
+                        lost = True
+                        raise UploadInProgress("Upload claim expired")
+                    renew_at = time.monotonic() + UPLOAD_CLAIM_SECONDS / 2
+                data = bytes(pending)
+                pending.clear()
+                await anyio.to_thread.run_sync(writer.write, data)
+    finally:
+        # ما وصل قبل الانقطاع أو الخطأ يُحفظ ليُستأنف منه، ما دام الحجز لنا
+        if pending and not lost:
+            await anyio.to_thread.run_sync(writer.write, bytes(pending))
+        await anyio.to_thread.run_sync(writer.close)
+        new_offset = offset + writer.size
+        if not lost and await anyio.to_thread.run_sync(_release, db, row.id, token, new_offset):
+            with _hashers_lock:
+                _hashers[row.id] = (new_offset, writer.digest)
+    return new_offset
+
+
+def finalize(db: Session, user, row: UploadSession, directory: str) -> tuple[UserFile, bool]:
+    if row.offset != row.length:
+        raise UploadError(f"Upload is incomplete ({row.offset} of {row.length} bytes)")
+    # الحصة تُفحص مرة أخرى: ملفات أُنهيت بعد إنشاء هذه الجلسة قد استهلكتها
+    limit = user_upload_limit(db, user, exclude_session=row.id)
+    if row.length > limit:
+        raise UploadTooLarge(f"File exceeds the upload limit of {limit} bytes")
+    store = BlobStore(directory)
+    path = _partial_path(store, row.id)
+    digest = _digest_at(path, row.id, row.offset)
+    # store_file ينقل (أو يحذف عند الفشل) رابطاً ثانياً للملف، فيبقى الجزئي
+    # والجلسة سليمين لإعادة المحاولة إن فشل التسجيل
+    staged = path + ".finalize"
+    _remove(staged)
+    os.link(path, staged)
+    db.delete(row)
+    file_row, deduplicated = store_file(db, user, store, staged, row.filename, row.content_type, row.length, digest.hexdigest())
+    _remove(path)
+    _forget(row.id)
+    return file_row, deduplicated
+
+
+def abort(db: Session, row: UploadSession, directory: str) -> None:
+    db.delete(row)
+    db.commit()
+    _remove(_partial_path(BlobStore(directory), row.id))
+    _forget(row.id)
+
+
+def expire_sessions(db: Session, directory: str) -> int:
+    """حذف الجلسات المنتهية وملفاتها الجزئية."""
+    ensure_upload_tables(db.get_bind())
+    store = BlobStore(directory)
+    expired = db.execute(select(UploadSession).where(UploadSession.expires_at < datetime.utcnow())).scalars().all()
+    for row in expired:
+        db.delete(row)
+    db.commit()
+    for row in expired:
+        _remove(_partial_path(store, row.id))
+        _forget(row.id)
+    return len(expired)
+
+
+def _forget(session_id: str) -> None:
+    with _hashers_lock:
+        _hashers.pop(session_id, None)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,217 @@
+"""
+خدمة تفريغ الصوت في الخلفية.
+
+- عمليات الويب لا تحمّل Whisper أبداً؛ الطلب يحفظ الملف ويضع مهمة في طابور
+  محدود (TRANSCRIBE_MAX_PENDING) ويرجع فوراً برقم المهمة.
+- مجموعة عمليات (ProcessPoolExecutor) تُنشأ عند أول مهمة، وكل عملية تحمّل
+  النموذج مرة واحدة عند أول ملف تفرّغه ثم تعيد استخدامه.
+- رقم المهمة هو بصمة SHA-256 لمحتوى الملف (ومعها اللغة إن حُددت، فنفس
+  التسجيل بلغة أخرى يُفرَّغ من جديد): نفس التسجيل مرتين لا يُفرَّغ مرتين،
+  والنتائج تُحفظ على القرص (TRANSCRIPT_CACHE_DIR) فتشاركها كل عمليات الويب.
+- العامل يفرّغ الملف نافذة بعد نافذة (transcribe_stream) ويكتب كل مقطع فور
+  انتهائه في ملف NDJSON بجانب النتيجة، فيتابع العميل النص الجزئي أثناء التفريغ.
+"""
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "1"))
+TRANSCRIBE_MAX_PENDING = int(os.getenv("TRANSCRIBE_MAX_PENDING", "16"))
+TRANSCRIBE_JOBS_KEPT = int(os.getenv("TRANSCRIBE_JOBS_KEPT", "256"))
+AUDIO_TMP_DIR = os.getenv("AUDIO_TMP_DIR", os.path.join(tempfile.gettempdir(), "btec-audio"))
+TRANSCRIPT_CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", os.path.join(AUDIO_TMP_DIR, "transcripts"))
+
+
+class QueueFull(Exception):
+    pass
+
+
+def job_id_for(sha256: str, language: str | None = None) -> str:
+    """رقم المهمة: بصمة المحتوى، أو بصمة (المحتوى، اللغة) إن طُلبت لغة محددة."""
+    if not language:
+        return sha256
+    return hashlib.sha256(f"{sha256}:{language}".encode()).hexdigest()
+
+
+def _run(path: str, language: str | None, segments_path: str) -> str:
+    # يُنفَّذ داخل عملية العامل؛ النموذج يبقى محمَّلاً فيها بين المهام
+    from .audio_evaluator import transcribe_stream
+
+    parts = []
+    os.makedirs(os.path.dirname(segments_path), exist_ok=True)
+    with open(segments_path, "w", encoding="utf-8") as f:
+        for segment in transcribe_stream(path, language=language):
+            f.write(json.dumps(segment, ensure_ascii=False) + "\n")
+            f.flush()
+            if segment["text"]:
+                parts.append(segment["text"])
+    return " ".join(parts)
+
+
+@dataclass
+class TranscriptionJob:
+    id: str
+    status: str = "queued"  # queued | running | done | failed
+    text: str | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    future: Future | None = field(default=None, repr=False)
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "status": self.status, "text": self.text, "error": self.error}
+
+
+class TranscriptionService:
+    def __init__(
+        self,
+        workers: int = TRANSCRIBE_WORKERS,
+        max_pending: int = TRANSCRIBE_MAX_PENDING,
+        jobs_kept: int = TRANSCRIBE_JOBS_KEPT,
+        cache_dir: str = TRANSCRIPT_CACHE_DIR,
+        executor: Executor | None = None,
+        runner=_run,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.jobs_kept = jobs_kept
+        self.cache_dir = cache_dir
+        self.runner = runner
+        self._executor = executor
+        self._jobs: OrderedDict[str, TranscriptionJob] = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _cache_path(self, job_id: str) -> str:
+        return os.path.join(self.cache_dir, job_id[:2], job_id + ".txt")
+
+    def _segments_path(self, job_id: str) -> str:
+        return os.path.join(self.cache_dir, job_id[:2], job_id + ".ndjson")
+
+    def _cached(self, job_id: str) -> TranscriptionJob | None:
+        path = self._cache_path(job_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return TranscriptionJob(job_id, status="done", text=f.read(), finished_at=os.path.getmtime(path))
+
+    def _remember(self, job: TranscriptionJob) -> None:
+        self._jobs[job.id] = job
+        self._jobs.move_to_end(job.id)
+        finished = [j for j in self._jobs.values() if j.status in ("done", "failed")]
+        for old in finished[: max(0, len(finished) - self.jobs_kept)]:
+            del self._jobs[old.id]
+
+    def submit(self, path: str, sha256: str, language: str | None = None) -> TranscriptionJob:
+        """وضع ملف في طابور التفريغ. الملف يُحذف بعد انتهاء المهمة (أو فوراً إن كانت النتيجة محفوظة)."""
+        job_id = job_id_for(sha256, language)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status == "failed":
+                job = self._cached(job_id)
+            if job is not None and job.status != "failed":
+                self._remember(job)
+                _remove(path)
+                return job
+            if self._pending >= self.max_pending:
+                _remove(path)
+                raise QueueFull(f"transcription queue is full ({self.max_pending} pending jobs)")
+            job = TranscriptionJob(job_id)
+            self._pending += 1
+            self._remember(job)
+        try:
+            job.future = self.executor.submit(self.runner, path, language, self._segments_path(job_id))
+        except Exception as e:
+            self._finish(job, path, error=e)
+            raise
+        job.future.add_done_callback(lambda f: self._finish(job, path, future=f))
+        return job
+
+    def _finish(self, job: TranscriptionJob, path: str, future: Future | None = None, error: Exception | None = None) -> None:
+        if future is not None:
+            error = future.exception()
+        if error is None:
+            job.text = future.result()
+            _write_atomic(self._cache_path(job.id), job.text)
+            job.status = "done"
+        else:
+            job.error = f"{type(error).__name__}: {error}"
+            job.status = "failed"
+        job.finished_at = time.time()
+        _remove(path)
+        with self._lock:
+            self._pending -= 1
+            self._remember(job)
+
+    def get(self, job_id: str) -> TranscriptionJob | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return self._cached(job_id)
+        if job.status == "queued" and job.future is not None and job.future.running():
+            job.status = "running"
+        return job
+
+    def segments(self, job_id: str, offset: int = 0) -> tuple[list[dict], int]:
+        """المقاطع المكتملة بعد الموضع offset (بالبايت) والموضع الجديد؛ تعمل أثناء التفريغ."""
+        try:
+            with open(self._segments_path(job_id), "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except OSError:
+            return [], offset
+        # السطر الأخير قد يكون قيد الكتابة
+        complete = data[: data.rfind(b"\n") + 1]
+        return [json.loads(line) for line in complete.splitlines()], offset + len(complete)
+
+    async def wait(self, job: TranscriptionJob, timeout: float | None = None) -> TranscriptionJob:
+        """انتظار انتهاء المهمة دون حجب حلقة الأحداث."""
+        if job.future is not None and not job.future.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), timeout)
+            except asyncio.TimeoutError:
+                pass
+            except Exception:
+                pass  # الخطأ محفوظ في job.error
+        return job
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _write_atomic(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+transcription_service = TranscriptionService()
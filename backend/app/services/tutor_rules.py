@@ -0,0 +1,123 @@
+"""
+محرك قواعد ردود المعلم الافتراضي.
+
+تُحمَّل القواعد من ملف JSON مرة واحدة، وتُجمَّع كل الكلمات المفتاحية
+(العربية والإنجليزية) في آلة Aho-Corasick واحدة. المطابقة تمر على الرسالة
+مرة واحدة فقط، لذلك لا تزيد تكلفتها مع زيادة عدد القواعد.
+
+عند تطابق أكثر من قاعدة يفوز ترتيب القاعدة في الملف (الأعلى أولاً)،
+تماماً كما كانت سلسلة if/elif القديمة تعمل.
+"""
+import json
+import os
+from collections import deque
+from dataclasses import dataclass
+
+from .arabic import normalize
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "tutor_rules.json")
+RULES_PATH = os.getenv("TUTOR_RULES_PATH", DEFAULT_RULES_PATH)
+
+
+class AhoCorasick:
+    """آلة مطابقة متعددة الأنماط. كل نمط مرتبط بقيمة (payload)."""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._built = False
+
+    def add(self, pattern: str, payload) -> None:
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(pattern), payload))
+        self._built = False
+
+    def build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+        self._built = True
+
+    def iter(self, text: str):
+        """إرجاع (بداية, نهاية, payload) لكل تطابق في النص."""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, payload in out[node]:
+                yield i - length + 1, i + 1, payload
+
+
+@dataclass(frozen=True)
+class TutorRule:
+    id: str
+    response: str
+    priority: int
+
+
+def _is_boundary(text: str, start: int, end: int) -> bool:
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    return not before.isalnum() and not after.isalnum()
+
+
+class TutorRuleEngine:
+    def __init__(self, rules: list[dict], default: str):
+        self.default = default
+        self.rules: list[TutorRule] = []
+        self._matcher = AhoCorasick()
+        for priority, raw in enumerate(rules):
+            rule = TutorRule(id=raw["id"], response=raw["response"], priority=priority)
+            self.rules.append(rule)
+            for keyword in raw.get("keywords", []):
+                keyword = normalize(keyword)
+                # الكلمات الإنجليزية تُطابق ككلمات كاملة ("pass" لا تطابق "passage")،
+                # أما العربية فتُطابق كجزء من الكلمة بسبب السوابق مثل "بامتياز"
+                self._matcher.add(keyword, (rule, keyword.isascii()))
+        self._matcher.build()
+
+    @classmethod
+    def from_file(cls, path: str = RULES_PATH) -> "TutorRuleEngine":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["rules"], data.get("default", ""))
+
+    def match(self, message: str):
+        text = normalize(message)
+        best = None
+        for start, end, (rule, whole_word) in self._matcher.iter(text):
+            if whole_word and not _is_boundary(text, start, end):
+                continue
+            if best is None or rule.priority < best.priority:
+                best = rule
+                if best.priority == 0:
+                    break
+        return best
+
+    def reply(self, message: str) -> str:
+        rule = self.match(message)
+        return rule.response if rule else self.default
+
+
+rule_engine = TutorRuleEngine.from_file()
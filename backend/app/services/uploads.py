@@ -0,0 +1,270 @@
+"""
+رفع الملفات على دفعات بذاكرة ثابتة.
+
+جسم الطلب (multipart) يُحلَّل أثناء وصوله مباشرة من request.stream() بدلاً من
+UploadFile، لأن Starlette يقرأ الطلب كاملاً إلى ملف مؤقت قبل أن يبدأ المعالج:
+- كل دفعة (UPLOAD_CHUNK_SIZE) تُكتب وتُحسب بصمتها SHA-256 في thread منفصل،
+  فلا تتوقف حلقة الأحداث أثناء الكتابة على القرص.
+- حد الحجم لكل مستخدم يُفحص أثناء النقل: الرفع يتوقف عند أول بايت زائد
+  ويُحذف الملف الجزئي دون انتظار بقية الطلب.
+"""
+import hashlib
+import os
+import weakref
+from dataclasses import dataclass, field
+from datetime import datetime
+from uuid import uuid4
+
+import anyio
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from ..models import FileBlob, UploadSession, UserFile
+from .blob_store import BlobStore
+from .knowledge_search import add_missing_columns
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/app/uploads")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_BYTES", str(1024 ** 3)))
+UPLOAD_USER_QUOTA_BYTES = int(os.getenv("UPLOAD_USER_QUOTA_BYTES", str(5 * 1024 ** 3)))
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class UploadError(Exception):
+    status_code = 400
+
+
+class UploadTooLarge(UploadError):
+    status_code = 413
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    filename: str
+    content_type: str | None
+    size: int = 0
+    sha256: str = ""
+    fields: dict[str, str] = field(default_factory=dict)
+
+
+class HashingWriter:
+    """يكتب ويحسب البصمة في نفس الخطوة؛ كلاهما يُنفَّذ خارج حلقة الأحداث."""
+
+    def __init__(self, path: str, digest=None, append: bool = False):
+        self.path = path
+        self.digest = digest or hashlib.sha256()
+        self.size = 0
+        self._file = open(path, "ab" if append else "wb")
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self.digest.update(data)
+        self.size += len(data)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+_ready = weakref.WeakSet()
+
+
+def ensure_upload_tables(engine: Engine) -> None:
+    if engine in _ready:
+        return
+    with engine.begin() as conn:
+        UserFile.__table__.create(conn, checkfirst=True)
+        add_missing_columns(conn, UserFile.__table__)
+        FileBlob.__table__.create(conn, checkfirst=True)
+        UploadSession.__table__.create(conn, checkfirst=True)
+        add_missing_columns(conn, UploadSession.__table__)
+    _ready.add(engine)
+
+
+def user_upload_limit(db: Session, user, exclude_session: str | None = None) -> int:
+    """أكبر حجم مسموح لملف المستخدم التالي: حد الملف الواحد أو ما تبقى من حصته.
+
+    جلسات الرفع المفتوحة تحجز حجمها الكامل من الحصة، فلا تتجاوزها جلسات متوازية.
+    """
+    ensure_upload_tables(db.get_bind())
+    if getattr(user, "is_superuser", False):
+        return UPLOAD_MAX_FILE_BYTES
+    used = db.execute(select(func.coalesce(func.sum(UserFile.size), 0)).where(UserFile.owner_id == str(user.id))).scalar_one()
+    reserved = db.execute(
+        select(func.coalesce(func.sum(UploadSession.length), 0)).where(
+            UploadSession.owner_id == str(user.id),
+            UploadSession.expires_at >= datetime.utcnow(),
+            UploadSession.id != (exclude_session or ""),
+        )
+    ).scalar_one()
+    return max(0, min(UPLOAD_MAX_FILE_BYTES, UPLOAD_USER_QUOTA_BYTES - used - reserved))
+
+
+async def receive_upload(request: Request, directory: str, limit: int, field_name: str = "file") -> StoredUpload:
+    """حفظ حقل الملف من جسم multipart في directory أثناء وصوله."""
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise UploadError("Expected multipart/form-data body")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit + MAX_FIELD_BYTES:
+        # الحجم المعلن يتجاوز الحد: رفض فوري دون قراءة الجسم
+        raise UploadTooLarge(f"File exceeds the upload limit of {limit} bytes")
+
+    await anyio.to_thread.run_sync(lambda: os.makedirs(directory, exist_ok=True))
+    state = {"header_field": b"", "header_value": b"", "headers": {}, "part": None}
+    pending = bytearray()
+    fields: dict[str, bytearray] = {}
+    result: StoredUpload | None = None
+    writer: HashingWriter | None = None
+
+    def on_part_begin():
+        state["headers"] = {}
+        state["part"] = None
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header_field"].lower()] = state["header_value"]
+        state["header_field"] = state["header_value"] = b""
+
+    def on_headers_finished():
+        nonlocal result
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        name = disposition.get(b"name", b"").decode("utf-8", "replace")
+        filename = disposition.get(b"filename")
+        if name == field_name and filename is not None and result is None:
+            part_type = state["headers"].get(b"content-type")
+            ext = os.path.splitext(os.path.basename(filename.decode("utf-8", "replace")))[1]
+            result = StoredUpload(
+                path=os.path.join(directory, f"{uuid4().hex}{ext}.part"),
+                filename=os.path.basename(filename.decode("utf-8", "replace")),
+                content_type=part_type.decode("latin-1") if part_type else None,
+            )
+            state["part"] = "file"
+        else:
+            state["part"] = name
+            fields.setdefault(name, bytearray())
+
+    def on_part_data(data, start, end):
+        if state["part"] == "file":
+            pending.extend(data[start:end])
+        elif state["part"] is not None:
+            value = fields[state["part"]]
+            value.extend(data[start:end])
+            if len(value) > MAX_FIELD_BYTES:
+                raise UploadError("Form field too large")
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+
+    received = 0
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if result is not None and writer is None:
+                writer = await anyio.to_thread.run_sync(HashingWriter, result.path)
+            if writer is not None and len(pending) >= UPLOAD_CHUNK_SIZE:
+                received += len(pending)
+                if received > limit:
+                    raise UploadTooLarge(f"File exceeds the upload limit of {limit} bytes")
+                data = bytes(pending)
+                pending.clear()
+                await anyio.to_thread.run_sync(writer.write, data)
+        parser.finalize()
+        if result is None:
+            raise UploadError(f"Missing file field '{field_name}'")
+        if writer is None:
+            writer = await anyio.to_thread.run_sync(HashingWriter, result.path)
+        received += len(pending)
+        if received > limit:
+            raise UploadTooLarge(f"File exceeds the upload limit of {limit} bytes")
+        await anyio.to_thread.run_sync(writer.write, bytes(pending))
+    except BaseException:
+        if writer is not None:
+            await anyio.to_thread.run_sync(writer.close)
+        if result is not None:
+            await anyio.to_thread.run_sync(_discard, result.path)
+        raise
+    await anyio.to_thread.run_sync(writer.close)
+
+    result.size = writer.size
+    result.sha256 = writer.digest.hexdigest()
+    result.fields = {k: v.decode("utf-8", "replace") for k, v in fields.items()}
+    return result
+
+
+def _discard(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+async def save_upload(request: Request, db: Session, user, directory: str = UPLOAD_DIR) -> tuple[UserFile, StoredUpload, bool]:
+    """استقبال الملف ثم تخزينه في مخزن المحتوى وتسجيله في جدول user_file.
+
+    العنصر الثالث True إذا كان المحتوى مخزناً من قبل (لم يُكتب على القرص مجدداً).
+    """
+    store = BlobStore(directory)
+    limit = await anyio.to_thread.run_sync(user_upload_limit, db, user)
+    upload = await receive_upload(request, store.tmp_dir, limit)
+
+    def record() -> tuple[UserFile, bool]:
+        return store_file(db, user, store, upload.path, upload.filename, upload.content_type, upload.size, upload.sha256)
+
+    row, deduplicated = await anyio.to_thread.run_sync(record)
+    return row, upload, deduplicated
+
+
+def store_file(db: Session, user, store: BlobStore, tmp_path: str, filename: str, content_type: str | None, size: int, sha256: str) -> tuple[UserFile, bool]:
+    """نقل ملف مكتمل إلى مخزن المحتوى وتسجيله؛ يرجع (الصف، هل كان المحتوى مخزناً من قبل)."""
+    try:
+        created = store.acquire(db, tmp_path, sha256, size)
+        row = UserFile(
+            id=uuid4().hex,
+            owner_id=str(user.id),
+            original_filename=filename,
+            stored_path=store.path(sha256),
+            content_type=content_type,
+            size=size,
+            sha256=sha256,
+            created_at=datetime.utcnow(),
+        )
+        db.add(row)
+        db.commit()
+    except Exception:
+        # ملف نُقل للمخزن دون صف يُحذف لاحقاً عبر collect_garbage
+        db.rollback()
+        _discard(tmp_path)
+        raise
+    return row, not created
+
+
+def delete_upload(db: Session, row: UserFile, directory: str = UPLOAD_DIR) -> None:
+    """حذف ملف المستخدم؛ المحتوى نفسه يبقى حتى يجمعه collect_garbage."""
+    store = BlobStore(directory)
+    if row.sha256 and row.stored_path == store.path(row.sha256):
+        store.release(db, row.sha256)
+    else:
+        # ملفات قديمة خُزنت قبل مخزن المحتوى
+        _discard(row.stored_path)
+    db.delete(row)
+    db.commit()
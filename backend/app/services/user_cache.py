@@ -0,0 +1,173 @@
+"""
+ذاكرة مؤقتة للمستخدمين الذين تم التحقق منهم (get_current_user).
+
+كل طلب محمي كان يفك الـ JWT ثم يستعلم عن المستخدم بالبريد. الآن يُحفظ
+المستخدم بعد أول استعلام مفتاحه subject الـ token (البريد)، فتصبح كلفة الطلب
+التالي التحقق من التوقيع فقط:
+- داخل كل عملية: LRU بحد أقصى USER_CACHE_SIZE ومدة USER_CACHE_TTL ثانية.
+- مشتركة بين العمليات (اختياري): USER_CACHE_URL=redis://... (تحتاج حزمة redis)،
+  فيصل الإبطال لكل العمليات فوراً. بدونها ترى العمليات الأخرى التغيير بعد
+  انتهاء المدة على الأكثر.
+
+الإبطال تلقائي بعد commit أي جلسة (sync أو async) غيّرت أو حذفت صف User، أياً
+كان المسار (crud، سكربت، endpoint)، كما يفعل write_events لفهرس المقررات. أمر
+update()/delete() جماعي على users لا تُعرف صفوفه فيُفرغ الذاكرة كلها. الكتابة من
+اتصال Core مباشر أو من SQL نصي لا تُلتقط، وتظهر بعد انتهاء المدة.
+المحفوظ نسخة من الحقول دون بصمة كلمة المرور، والنسخة المرجعة كائن User غير
+مرتبط بأي جلسة.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from ..models import User
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_URL = os.getenv("USER_CACHE_URL")
+_FIELDS = ("id", "email", "is_active", "is_superuser")
+_PENDING = "user_cache:emails"
+_ALL = object()
+
+
+def _snapshot(user) -> dict:
+    return {name: getattr(user, name) for name in _FIELDS}
+
+
+class LocalUserCache:
+    shared = False
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._items: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, email: str) -> dict | None:
+        with self._lock:
+            item = self._items.get(email)
+            if item is None:
+                return None
+            if item[0] <= self.clock():
+                del self._items[email]
+                return None
+            self._items.move_to_end(email)
+            return item[1]
+
+    def set(self, email: str, data: dict) -> None:
+        with self._lock:
+            self._items[email] = (self.clock() + self.ttl, data)
+            self._items.move_to_end(email)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def delete(self, email: str) -> None:
+        with self._lock:
+            self._items.pop(email, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class RedisUserCache:
+    shared = True
+    prefix = "user-cache:"
+
+    def __init__(self, url: str, ttl: float = USER_CACHE_TTL):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("USER_CACHE_URL is set but the redis package is not installed") from e
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.ttl = ttl
+
+    # تعطل Redis لا يمنع تسجيل الدخول: يُعامل كعدم وجود في الذاكرة
+    def get(self, email: str) -> dict | None:
+        try:
+            raw = self.client.get(self.prefix + email)
+        except Exception:
+            logger.warning("user cache unavailable", exc_info=True)
+            return None
+        return json.loads(raw) if raw else None
+
+    def set(self, email: str, data: dict) -> None:
+        try:
+            self.client.set(self.prefix + email, json.dumps(data), ex=max(1, int(self.ttl)))
+        except Exception:
+            logger.warning("user cache unavailable", exc_info=True)
+
+    def delete(self, email: str) -> None:
+        # الإبطال يجب أن يصل، فالخطأ هنا لا يُبتلع
+        self.client.delete(self.prefix + email)
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+user_cache = RedisUserCache(USER_CACHE_URL) if USER_CACHE_URL else LocalUserCache()
+
+
+def cached_user(email: str) -> User | None:
+    data = user_cache.get(email)
+    return User(**data) if data is not None else None
+
+
+def remember_user(user) -> None:
+    user_cache.set(user.email, _snapshot(user))
+
+
+def invalidate_user(email: str) -> None:
+    user_cache.delete(email)
+
+
+def _emails(user: User) -> set[str] | None:
+    # القيم القديمة والجديدة معاً (تغيير البريد)؛ None إذا لم يُحمَّل البريد
+    history = inspect(user).attrs.email.history
+    emails = {e for e in (*history.added, *history.unchanged, *history.deleted) if e}
+    return emails or None
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_users(session, _flush_context):
+    pending = session.info.setdefault(_PENDING, set())
+    for user in (*session.dirty, *session.deleted):
+        if isinstance(user, User):
+            emails = _emails(user)
+            if emails:
+                pending.update(emails)
+            else:
+                pending.add(_ALL)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_user_statements(state):
+    if (state.is_update or state.is_delete) and getattr(state.statement.table, "name", None) == User.__tablename__:
+        state.session.info.setdefault(_PENDING, set()).add(_ALL)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    pending = session.info.pop(_PENDING, None)
+    if not pending:
+        return
+    if _ALL in pending:
+        user_cache.clear()
+        return
+    for email in pending:
+        invalidate_user(email)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_users(session):
+    session.info.pop(_PENDING, None)
@@ -0,0 +1,295 @@
+"""
+فهرس المتجهات لقاعدة المعرفة.
+
+الملفات تُحفظ بجانب قاعدة البيانات (knowledge.db => knowledge.vectors.*):
+- vectors.npy: مصفوفة float32 بحجم (عدد المقاطع × البعد)، تُفتح memory-mapped
+  فلا تُحمَّل في الذاكرة إلا الصفحات المقروءة فعلاً.
+- ids.npy: رقم KnowledgeItem لكل صف.
+- digests.npy: بصمة نص كل صف، فالمقطع الذي حُذف وأُدرج برقم قديم (SQLite
+  يعيد استخدام أرقام الصفوف المحذوفة) يُحسب متجهه من جديد.
+- ivf.npz: فهرس IVF اختياري (مراكز k-means + قوائم الصفوف) يُبنى تلقائياً
+  عندما يتجاوز عدد المقاطع IVF_THRESHOLD.
+- meta.json: اسم النموذج والبعد والعدد؛ يُكتب أخيراً، فوجوده يعني أن الفهرس كامل.
+
+البحث ضرب نقطي على دفعات من الصفوف (BLOCK_ROWS) لعدة استعلامات معاً،
+ثم argpartition لأفضل k في كل دفعة.
+"""
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..models import KnowledgeItem
+from .embeddings import get_embedder
+from .knowledge_search import SearchHit
+
+BLOCK_ROWS = 65_536
+IVF_THRESHOLD = int(os.getenv("KNOWLEDGE_IVF_THRESHOLD", "100000"))
+IVF_NPROBE = int(os.getenv("KNOWLEDGE_IVF_NPROBE", "16"))
+SNIPPET_CHARS = 300
+
+
+def default_index_path(engine: Engine) -> str:
+    """knowledge.db => knowledge.vectors (بادئة أسماء ملفات الفهرس)."""
+    configured = os.getenv("KNOWLEDGE_VECTOR_PATH")
+    if configured:
+        return configured
+    database = engine.url.database if engine.dialect.name == "sqlite" else None
+    if database and database != ":memory:":
+        return os.path.splitext(os.path.abspath(database))[0] + ".vectors"
+    return os.path.abspath("knowledge.vectors")
+
+
+def _files(base: str) -> dict[str, str]:
+    return {name: f"{base}.{name}" for name in ("vectors.npy", "ids.npy", "digests.npy", "ivf.npz", "meta.json")}
+
+
+def content_digest(text: str | None) -> int:
+    return int.from_bytes(hashlib.blake2b((text or "").encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """أفضل k أعمدة لكل صف، مرتبة تنازلياً."""
+    k = min(k, scores.shape[1])
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+@dataclass
+class IVF:
+    centroids: np.ndarray  # (nlist, dim)
+    order: np.ndarray  # أرقام الصفوف مجمعة حسب القائمة
+    offsets: np.ndarray  # (nlist + 1,) بداية كل قائمة داخل order
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        nprobe = min(nprobe, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+
+
+def build_ivf(vectors: np.ndarray, nlist: int | None = None, iterations: int = 8, sample: int = 50_000, seed: int = 0) -> IVF:
+    """k-means كروي (spherical) على عينة، ثم توزيع كل الصفوف على أقرب مركز."""
+    n = len(vectors)
+    nlist = nlist or max(1, int(4 * np.sqrt(n)))
+    rng = np.random.default_rng(seed)
+    train = np.asarray(vectors[np.sort(rng.choice(n, size=min(n, max(sample, nlist * 8)), replace=False))])
+    centroids = train[rng.choice(len(train), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(train @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, train)
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+
+    assign = np.empty(n, dtype=np.int64)
+    for start in range(0, n, BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + BLOCK_ROWS])
+        assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    order = np.argsort(assign, kind="stable")
+    offsets = np.searchsorted(assign[order], np.arange(nlist + 1))
+    return IVF(centroids.astype(np.float32), order, offsets)
+
+
+class VectorIndex:
+    def __init__(self, ids: np.ndarray, vectors: np.ndarray, model: str, ivf: IVF | None = None, digests: np.ndarray | None = None):
+        self.ids = ids
+        self.vectors = vectors
+        self.model = model
+        self.ivf = ivf
+        self.digests = digests
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, base: str) -> "VectorIndex | None":
+        files = _files(base)
+        if not os.path.exists(files["meta.json"]):
+            return None
+        with open(files["meta.json"], encoding="utf-8") as f:
+            meta = json.load(f)
+        ids = np.load(files["ids.npy"])
+        if len(ids):
+            vectors = np.load(files["vectors.npy"], mmap_mode="r")
+        else:
+            # ملف فارغ لا يمكن فتحه memory-mapped
+            vectors = np.empty((0, meta["dim"]), dtype=np.float32)
+        # فهرس قديم بلا بصمات: يُعاد حساب متجهاته كلها في أول تحديث
+        digests = np.load(files["digests.npy"]) if os.path.exists(files["digests.npy"]) else None
+        ivf = None
+        if meta.get("ivf") and os.path.exists(files["ivf.npz"]):
+            with np.load(files["ivf.npz"]) as data:
+                ivf = IVF(data["centroids"], data["order"], data["offsets"])
+        return cls(ids, vectors, meta["model"], ivf, digests)
+
+    def search(self, queries: np.ndarray, k: int = 10, nprobe: int | None = None, exact: bool = False) -> list[list[tuple[int, float]]]:
+        """أفضل k مقاطع لكل استعلام: [(knowledge_id, score), ...] لكل صف في queries."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not len(self) or k <= 0:
+            return [[] for _ in queries]
+        if self.ivf is not None and not exact:
+            return [self._search_ivf(q, k, nprobe or IVF_NPROBE) for q in queries]
+        return self._search_exact(queries, k)
+
+    def _search_exact(self, queries: np.ndarray, k: int) -> list[list[tuple[int, float]]]:
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(self), BLOCK_ROWS):
+            block = self.vectors[start:start + BLOCK_ROWS]
+            scores = queries @ block.T
+            top = _top_k(scores, k)
+            # دمج أفضل نتائج هذه الدفعة مع الأفضل حتى الآن
+            best_rows = np.hstack([best_rows, top + start])
+            best_scores = np.hstack([best_scores, np.take_along_axis(scores, top, axis=1)])
+            keep = _top_k(best_scores, k)
+            best_rows = np.take_along_axis(best_rows, keep, axis=1)
+            best_scores = np.take_along_axis(best_scores, keep, axis=1)
+        return [
+            [(int(self.ids[r]), float(s)) for r, s in zip(rows, scores, strict=True)]
+            for rows, scores in zip(best_rows, best_scores, strict=True)
+        ]
+
+    def _search_ivf(self, query: np.ndarray, k: int, nprobe: int) -> list[tuple[int, float]]:
+        rows = np.sort(self.ivf.candidates(query, nprobe))
+        if not len(rows):
+            return []
+        scores = self.vectors[rows] @ query
+        top = _top_k(scores[None, :], k)[0]
+        return [(int(self.ids[rows[i]]), float(scores[i])) for i in top]
+
+
+def _write_atomic(path: str, write) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def sync_vector_index(session: Session, base: str, embedder=None, batch_size: int = 512, progress=None) -> VectorIndex:
+    """تحديث الفهرس ليطابق جدول knowledgeitem.
+
+    المقاطع الموجودة مسبقاً (بنفس النموذج والرقم وبصمة النص) تُنسخ كما هي،
+    فلا يُحسب متجه إلا للمقاطع الجديدة أو التي تغير نصها، وتُحذف صفوف المقاطع
+    التي لم تعد موجودة.
+    """
+    embedder = embedder or get_embedder()
+    files = _files(base)
+    os.makedirs(os.path.dirname(os.path.abspath(base)), exist_ok=True)
+
+    rows = session.execute(select(KnowledgeItem.id, KnowledgeItem.content).order_by(KnowledgeItem.id)).yield_per(batch_size)
+    current, digests = [], []
+    for item_id, content in rows:
+        current.append(item_id)
+        digests.append(content_digest(content))
+    current = np.array(current, dtype=np.int64)
+    digests = np.array(digests, dtype=np.int64)
+
+    existing = VectorIndex.load(base)
+    if existing is not None and existing.model == embedder.name and existing.digests is not None:
+        pos = np.minimum(np.searchsorted(current, existing.ids), max(len(current) - 1, 0))
+        keep = np.zeros(len(existing.ids), dtype=bool)
+        if len(current):
+            keep = (current[pos] == existing.ids) & (digests[pos] == existing.digests)
+        kept_ids = existing.ids[keep]
+        new_ids = np.setdiff1d(current, kept_ids, assume_unique=True)
+        if keep.all() and not len(new_ids):
+            return existing
+    else:
+        existing, keep, kept_ids, new_ids = None, None, np.empty(0, dtype=np.int64), current
+
+    ids = np.concatenate([kept_ids, new_ids])
+    ids_digests = np.concatenate([
+        existing.digests[keep] if existing is not None else np.empty(0, dtype=np.int64),
+        digests[np.searchsorted(current, new_ids)],
+    ])
+    tmp_vectors = files["vectors.npy"] + ".tmp"
+    if not len(ids):
+        out = np.empty((0, embedder.dim), dtype=np.float32)
+        with open(tmp_vectors, "wb") as f:
+            np.save(f, out)
+    else:
+        out = np.lib.format.open_memmap(tmp_vectors, mode="w+", dtype=np.float32, shape=(len(ids), embedder.dim))
+    if existing is not None:
+        kept_rows = np.flatnonzero(keep)
+        for start in range(0, len(kept_rows), BLOCK_ROWS):
+            rows = kept_rows[start:start + BLOCK_ROWS]
+            out[start:start + len(rows)] = existing.vectors[rows]
+
+    offset = len(kept_ids)
+    for start in range(0, len(new_ids), batch_size):
+        chunk = new_ids[start:start + batch_size]
+        contents = dict(session.execute(
+            select(KnowledgeItem.id, KnowledgeItem.content).where(KnowledgeItem.id.in_(chunk.tolist()))
+        ).all())
+        out[offset + start:offset + start + len(chunk)] = embedder.embed([contents.get(int(i), "") for i in chunk])
+        if progress:
+            progress(start + len(chunk), len(new_ids))
+    if isinstance(out, np.memmap):
+        out.flush()
+
+    ivf = build_ivf(out) if len(ids) >= IVF_THRESHOLD else None
+    del out
+    existing = None  # إغلاق الـ memmap القديم قبل استبدال الملف
+
+    # الفهرس غير مكتمل أثناء استبدال الملفات؛ meta.json يُكتب من جديد في النهاية
+    if os.path.exists(files["meta.json"]):
+        os.remove(files["meta.json"])
+    os.replace(tmp_vectors, files["vectors.npy"])
+    _write_atomic(files["ids.npy"], lambda f: np.save(f, ids))
+    _write_atomic(files["digests.npy"], lambda f: np.save(f, ids_digests))
+    if ivf is not None:
+        _write_atomic(files["ivf.npz"], lambda f: np.savez(f, centroids=ivf.centroids, order=ivf.order, offsets=ivf.offsets))
+    elif os.path.exists(files["ivf.npz"]):
+        os.remove(files["ivf.npz"])
+    meta = {"model": embedder.name, "dim": embedder.dim, "count": len(ids), "ivf": ivf is not None}
+    _write_atomic(files["meta.json"], lambda f: f.write(json.dumps(meta).encode("utf-8")))
+    return VectorIndex.load(base)
+
+
+_cache: dict[str, tuple[float, VectorIndex | None]] = {}
+_cache_lock = threading.Lock()
+
+
+def get_vector_index(engine: Engine) -> VectorIndex | None:
+    """الفهرس المحمَّل للعملية الحالية؛ يُعاد تحميله فقط إذا أعيد بناؤه على القرص."""
+    base = default_index_path(engine)
+    meta = _files(base)["meta.json"]
+    mtime = os.path.getmtime(meta) if os.path.exists(meta) else 0.0
+    with _cache_lock:
+        cached = _cache.get(base)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, VectorIndex.load(base))
+            _cache[base] = cached
+    return cached[1]
+
+
+def semantic_search(db: Session, query: str, limit: int = 5) -> list[SearchHit]:
+    """أقرب المقاطع لمعنى السؤال. يرجع قائمة فارغة إذا لم يُبنَ الفهرس بعد."""
+    index = get_vector_index(db.get_bind())
+    embedder = get_embedder()
+    if index is None or index.model != embedder.name or not query.strip():
+        return []
+    matches = index.search(embedder.embed([query]), k=limit)[0]
+    rows = {
+        r.id: r
+        for r in db.execute(
+            select(
+                KnowledgeItem.id, KnowledgeItem.source_file, KnowledgeItem.category, KnowledgeItem.content,
+                KnowledgeItem.page, KnowledgeItem.slide, KnowledgeItem.section,
+            ).where(KnowledgeItem.id.in_([i for i, _ in matches]))
+        )
+    }
+    # مقاطع حُذفت بعد آخر بناء للفهرس تُتخطى
+    return [
+        SearchHit(r.id, r.source_file, r.category, (r.content or "")[:SNIPPET_CHARS], score, r.page, r.slide, r.section)
+        for i, score in matches
+        if (r := rows.get(i)) is not None
+    ]
@@ -0,0 +1,38 @@
+"""
+استدعاء دالة بعد commit أي جلسة (sync أو async) كتبت على جداول معينة.
+
+تُستخدم لإبطال ما يُحفظ في الذاكرة من نتائج مبنية على هذه الجداول (فهرس
+المقررات، أرقام إصدارات ETag). تلتقط الكتابة عبر كائنات ORM (flush) وعبر
+أوامر insert()/update()/delete() المنفذة بـ session.execute، ولا تلتقط
+الكتابة من اتصال Core مباشر أو من عملية أخرى.
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+def on_commit_writes(tables, callback) -> None:
+    names = frozenset(t.name for t in tables)
+    key = ("write_events", id(callback))
+
+    def touched(objects) -> bool:
+        return any(getattr(getattr(obj, "__table__", None), "name", None) in names for obj in objects)
+
+    @event.listens_for(Session, "after_flush")
+    def mark_flush(session, _flush_context):
+        if touched(session.new) or touched(session.dirty) or touched(session.deleted):
+            session.info[key] = True
+
+    @event.listens_for(Session, "do_orm_execute")
+    def mark_statement(state):
+        if state.is_insert or state.is_update or state.is_delete:
+            if getattr(state.statement.table, "name", None) in names:
+                state.session.info[key] = True
+
+    @event.listens_for(Session, "after_commit")
+    def notify(session):
+        if session.info.pop(key, False):
+            callback()
+
+    @event.listens_for(Session, "after_rollback")
+    def forget(session):
+        session.info.pop(key, None)
@@ -1,94 +1,60 @@
+import argparse
 import os
-import fitz  # PyMuPDF
-from docx import Document
-from pptx import Presentation
-from sqlmodel import Session, create_engine, select, SQLModel
-from app.models import KnowledgeItem 
+from sqlmodel import Session, create_engine
+from app.database import Base
+from app.services.bm25 import build_bm25_index, default_bm25_path
+from app.services.ingestion import DEFAULT_BATCH_SIZE, ingest_folders
+from app.services.knowledge_search import ensure_search_index
+from app.services.vector_index import default_index_path, sync_vector_index
 
 # إعداد الاتصال
-sqlite_url = "sqlite:///database.db" 
+sqlite_url = os.getenv("KNOWLEDGE_DB_URL", "sqlite:///database.db")
 engine = create_engine(sqlite_url)
 
+DEFAULT_FOLDERS = [
+    r"D:\BTEC-backend\backend\app\knowledge_base\Business\iq",
+    r"D:\BTEC-backend\backend\app\knowledge_base\Business\L2 Grade 10",
+    r"D:\BTEC-backend\backend\app\knowledge_base\Business\L3 Grade 11",
+    r"D:\BTEC-backend\backend\app\knowledge_base\Business\L3 Grade 12"
+]
+
 def setup_database():
     print("🛠️ جاري تهيئة قاعدة البيانات وتحديث الهيكل...")
-    SQLModel.metadata.create_all(engine)
-
-def extract_text_from_pdf_with_pages(path):
-    """استخراج النص مع حفظ رقم الصفحة لكل جزء"""
-    pages_content = []
-    try:
-        with fitz.open(path) as doc:
-            for page_num, page in enumerate(doc, start=1):
-                text = page.get_text()
-                if text.strip():
-                    pages_content.append({"page": page_num, "text": text})
-    except Exception as e:
-        print(f"   ⚠️ خطأ PDF في {os.path.basename(path)}: {e}")
-    return pages_content
-
-def extract_text_from_word(path):
-    text = ""
-    try:
-        doc = Document(path)
-        for para in doc.paragraphs: text += para.text + "\n"
-    except Exception as e: print(f"   ⚠️ خطأ Word: {e}")
-    return text
+    Base.metadata.create_all(engine)
+    ensure_search_index(engine)
 
-def extract_text_from_pptx(path):
-    text = ""
-    try:
-        prs = Presentation(path)
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"): text += shape.text + "\n"
-    except Exception as e: print(f"   ⚠️ خطأ PPTX: {e}")
-    return text
+def print_progress(report):
+    print(f"   ⏳ {report.summary()}")
 
-def start_ingestion():
-    folders = [
-        r"D:\BTEC-backend\backend\app\knowledge_base\Business\iq",
-        r"D:\BTEC-backend\backend\app\knowledge_base\Business\L2 Grade 10",
-        r"D:\BTEC-backend\backend\app\knowledge_base\Business\L3 Grade 11",
-        r"D:\BTEC-backend\backend\app\knowledge_base\Business\L3 Grade 12"
-    ]
+def print_vector_progress(done, total):
+    if done == total or done % 10_000 < 512:
+        print(f"   🧭 المتجهات: {done}/{total}")
 
+def start_ingestion(folders=None, workers=None, batch_size=DEFAULT_BATCH_SIZE):
     setup_database()
 
     with Session(engine) as session:
         print("\n--- 🚀 بدء سحب البيانات مع دعم أرقام الصفحات ---")
-        
-        for folder in folders:
-            if not os.path.exists(folder): continue
-            folder_name = os.path.basename(folder)
-            
-            for filename in os.listdir(folder):
-                path = os.path.join(folder, filename)
-                ext = filename.lower()
-                
-                # تخطي الملف إذا تم سحبه مسبقاً (اختياري: يمكنك مسح قاعدة البيانات للبدء من جديد مع أرقام الصفحات)
-                existing = session.exec(select(KnowledgeItem).where(KnowledgeItem.source_file == filename)).first()
-                if existing: continue
 
-                if ext.endswith(".pdf"):
-                    print(f"   📄 معالجة PDF مع الصفحات: {filename}...")
-                    pages = extract_text_from_pdf_with_pages(path)
-                    for p in pages:
-                        item = KnowledgeItem(
-                            content=p["text"],
-                            source_file=filename,
-                            category=f"{folder_name} (Page {p['page']})" # تخزين رقم الصفحة في التصنيف أو النص
-                        )
-                        session.add(item)
-                
-                elif ext.endswith((".docx", ".pptx")):
-                    print(f"   📝 معالجة ملف مكتب: {filename}...")
-                    content = extract_text_from_word(path) if ext.endswith(".docx") else extract_text_from_pptx(path)
-                    if content.strip():
-                        item = KnowledgeItem(content=content, source_file=filename, category=folder_name)
-                        session.add(item)
-        
-        session.commit()
-        print("\n✨ تم سحب البيانات بنجاح مع أرقام الصفحات!")
+        folders = folders or DEFAULT_FOLDERS
+        # الملفات التي لم تتغير تُتخطى عبر سجل الملفات (ingest_manifest)
+        report = ingest_folders(session, folders, workers=workers, batch_size=batch_size, progress=print_progress)
+        print(f"   📂 {report.files_total} ملف جديد أو معدل للمعالجة" + (f"، وحذف {report.removed} ملف لم يعد موجوداً" if report.removed else ""))
+
+        for path, error in report.errors:
+            print(f"   ⚠️ خطأ في {os.path.basename(path)}: {error}")
+        print(f"\n✨ تم سحب البيانات بنجاح مع أرقام الصفحات! {report.summary()}")
+
+        # المتجهات تُحسب للمقاطع الجديدة فقط؛ الموجودة تُنسخ من الفهرس السابق
+        index = sync_vector_index(session, default_index_path(engine), progress=print_vector_progress)
+        print(f"   🧭 فهرس المتجهات: {len(index)} مقطع")
+        bm25 = build_bm25_index(session, default_bm25_path(engine))
+        print(f"   🔤 فهرس BM25: {len(bm25)} مقطع، {len(bm25.vocab)} كلمة")
 
 if __name__ == "__main__":
-    start_ingestion()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="سحب ملفات PDF/DOCX/PPTX إلى قاعدة المعرفة")
+    parser.add_argument("folders", nargs="*", help="المجلدات المراد سحبها (الافتراضي: مجلدات Business)")
+    parser.add_argument("--workers", type=int, default=None, help="عدد عمليات الاستخراج (الافتراضي: عدد الأنوية)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="عدد السجلات في كل commit")
+    args = parser.parse_args()
+    start_ingestion(args.folders, workers=args.workers, batch_size=args.batch_size)
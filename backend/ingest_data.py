@@ -1,9 +1,13 @@
 import os
-import fitz  # PyMuPDF
-from docx import Document
-from pptx import Presentation
-from sqlmodel import Session, create_engine, select, SQLModel
-from app.models import KnowledgeItem 
+from sqlalchemy import insert
+from sqlmodel import Session, create_engine
+from app.database import Base
+from app.models import KnowledgeItem
+from app.services.bm25 import build_bm25_index, default_bm25_path
+from app.services.extraction import is_supported, iter_records
+from app.services.ingest_manifest import IngestManifest, file_sha256
+from app.services.knowledge_search import ensure_search_index
+from app.services.vector_index import default_index_path, sync_vector_index
 
 # إعداد الاتصال
 sqlite_url = "sqlite:///database.db" 
@@ -11,34 +15,8 @@ engine = create_engine(sqlite_url)
 
 def setup_database():
     print("🛠️ جاري تهيئة قاعدة البيانات...")
-    SQLModel.metadata.create_all(engine)
-
-def extract_text_from_pdf(path):
-    text = ""
-    try:
-        with fitz.open(path) as doc:
-            for page in doc: text += page.get_text()
-    except Exception as e: print(f"   ⚠️ خطأ PDF: {e}")
-    return text
-
-def extract_text_from_word(path):
-    text = ""
-    try:
-        doc = Document(path)
-        for para in doc.paragraphs: text += para.text + "\n"
-    except Exception as e: print(f"   ⚠️ خطأ Word: {e}")
-    return text
-
-def extract_text_from_pptx(path):
-    text = ""
-    try:
-        prs = Presentation(path)
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    text += shape.text + "\n"
-    except Exception as e: print(f"   ⚠️ خطأ PPTX: {e}")
-    return text
+    Base.metadata.create_all(engine)
+    ensure_search_index(engine)
 
 def start_ingestion():
     folders = [
@@ -52,6 +30,7 @@ def start_ingestion():
 
     with Session(engine) as session:
         print("\n--- 🚀 سحب البيانات الشامل (PDF, Word, PPTX) ---")
+        manifest = IngestManifest(session)
         
         for folder in folders:
             if not os.path.exists(folder): continue
@@ -59,28 +38,31 @@ def start_ingestion():
             
             for filename in os.listdir(folder):
                 path = os.path.join(folder, filename)
-                ext = filename.lower()
                 
-                # تخطي إذا كان مضافاً مسبقاً
-                existing = session.exec(select(KnowledgeItem).where(KnowledgeItem.source_file == filename)).first()
-                if existing: continue
+                # تخطي إذا لم يتغير منذ آخر سحب (حسب السجل، دون استعلام لكل ملف)
+                if not is_supported(filename) or manifest.is_unchanged(path): continue
+                sha256 = file_sha256(path)
+                if manifest.same_content(path, sha256):
+                    manifest.touch(session, path, sha256)
+                    continue
 
-                content = ""
-                if ext.endswith(".pdf"):
-                    print(f"   📄 معالجة PDF: {filename}...")
-                    content = extract_text_from_pdf(path)
-                elif ext.endswith(".docx"):
-                    print(f"   📝 معالجة Word: {filename}...")
-                    content = extract_text_from_word(path)
-                elif ext.endswith(".pptx"):
-                    print(f"   📊 معالجة PowerPoint: {filename}...")
-                    content = extract_text_from_pptx(path)
+                print(f"   📄 معالجة: {filename}...")
+                try:
+                    # مقاطع محدودة الحجم لكل صفحة/شريحة بدلاً من نص الملف كاملاً في صف واحد
+                    records = list(iter_records(path, folder_name))
+                except Exception as e:
+                    print(f"   ⚠️ خطأ: {e}")
+                    continue
 
-                if content.strip():
-                    item = KnowledgeItem(content=content, source_file=filename, category=folder_name)
-                    session.add(item)
+                # حذف النسخة القديمة وإضافة الجديدة في نفس المعاملة
+                manifest.replace_file(session, path, sha256, len(records))
+                if records:
+                    session.execute(insert(KnowledgeItem), records)
+                session.commit()
         
         session.commit()
+        sync_vector_index(session, default_index_path(engine))
+        build_bm25_index(session, default_bm25_path(engine))
         print("\n✨ مبروك! المساعد الآن خبير في الكتب والأبحاث والعروض التقديمية.")
 
 if __name__ == "__main__":
@@ -3,7 +3,7 @@ import os
 from fastapi.middleware.cors import CORSMiddleware
 from sqlmodel import create_engine, Session
 from app.main import app
-from app.api import deps
+from app import deps
 
 # محاولة تحميل المفتاح من ملف .env
 try:
@@ -0,0 +1,69 @@
+"""
+Latency/throughput benchmark for POST /api/v1/assessments/.
+
+Fires N concurrent clients at the app in-process (ASGI transport, no network)
+and reports requests/s plus p50/p95/p99 latency.
+Run: python scripts/bench_assessments.py --clients 200 --requests 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+
+from app.main import app
+
+QUESTIONS = [
+    ("Describe the value chain of a small retail business.", "L2", "Business"),
+    ("Evaluate the marketing strategy of a company entering a new market.", "L3", "Business"),
+    ("حلل أثر العرض والطلب على السعر في شركة محلية", "L3", "Business"),
+    ("List three types of network topology.", "L1", "IT"),
+]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    idx = min(int(len(values) * pct / 100), len(values) - 1)
+    return values[idx]
+
+
+async def client_worker(client, n, latencies):
+    for i in range(n):
+        question, level, major = QUESTIONS[i % len(QUESTIONS)]
+        start = time.perf_counter()
+        r = await client.post("/api/v1/assessments/", json={"question": question, "level": level, "major": major})
+        latencies.append(time.perf_counter() - start)
+        r.raise_for_status()
+
+
+async def run(clients, requests_per_client):
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_worker(client, requests_per_client, latencies) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    total = len(latencies)
+    print(f"clients={clients} requests={total} elapsed={elapsed:.2f}s")
+    print(f"throughput: {total / elapsed:.0f} req/s")
+    print(
+        "latency ms: "
+        f"p50={percentile(latencies, 50) * 1000:.2f} "
+        f"p95={percentile(latencies, 95) * 1000:.2f} "
+        f"p99={percentile(latencies, 99) * 1000:.2f} "
+        f"mean={statistics.mean(latencies) * 1000:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    args = parser.parse_args()
+    asyncio.run(run(args.clients, args.requests))
@@ -0,0 +1,92 @@
+"""
+Benchmark full-text knowledge search against the old LIKE '%q%' scan.
+
+Fills a temporary SQLite database with N synthetic pages, builds the FTS5
+index and times ranked queries.
+Run: python scripts/bench_knowledge_search.py --pages 100000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import KnowledgeItem
+from app.services.knowledge_search import ensure_search_index, search_knowledge
+
+DOMAIN = (
+    "business marketing finance revenue profit customer strategy unit assignment criteria "
+    "pass merit distinction evaluate analyse describe market supply demand price "
+    "تسويق مالية ربح عميل استراتيجية وحدة معيار تقييم تحليل سوق عرض طلب سعر"
+).split()
+# مفردات بتوزيع Zipf تقريبي كما في النصوص الحقيقية: كلمات وظيفية قليلة شائعة جداً،
+# ثم كلمات المحتوى (ومنها كلمات المجال) في الوسط، ثم ذيل طويل نادر
+FILLER = [f"w{i}" for i in range(30_000)]
+VOCAB = FILLER[:500] + DOMAIN + FILLER[500:]
+CUM_WEIGHTS = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(VOCAB))))
+QUERIES = ["marketing strategy", "supply demand price", "استراتيجية التسويق", "distinction criteria", "revenue"]
+COMMON_QUERY = "w1 w2"  # كلمات تظهر في كل صفحة تقريباً
+
+
+def fill(engine, pages):
+    rnd = random.Random(42)
+    # الصفحات تُركَّب من مجموعة فقرات مولدة مسبقاً حتى يبقى التحميل سريعاً
+    paragraphs = [" ".join(rnd.choices(VOCAB, cum_weights=CUM_WEIGHTS, k=40)) for _ in range(20_000)]
+    batch = 10_000
+    with engine.begin() as conn:
+        for offset in range(0, pages, batch):
+            rows = [
+                {
+                    "content": " ".join(rnd.sample(paragraphs, 5)),
+                    "source_file": f"unit_{i % 40}.pdf",
+                    "folder": "Business",
+                    "category": "Business",
+                    "page": i % 300 + 1,
+                }
+                for i in range(offset, min(offset + batch, pages))
+            ]
+            conn.execute(KnowledgeItem.__table__.insert(), rows)
+
+
+def timed(fn, rounds, queries=QUERIES):
+    start = time.perf_counter()
+    for i in range(rounds):
+        fn(queries[i % len(queries)])
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        start = time.perf_counter()
+        fill(engine, args.pages)
+        ensure_search_index(engine)
+        print(f"pages={args.pages} load+index={time.perf_counter() - start:.1f}s")
+
+        with Session(engine) as db:
+            fts_ms = timed(lambda q: search_knowledge(db, q, limit=10), args.rounds)
+            common_ms = timed(lambda q: search_knowledge(db, q, limit=10), 10, [COMMON_QUERY])
+            like_ms = timed(
+                lambda q: db.execute(
+                    text("SELECT id FROM knowledgeitem WHERE content LIKE :q LIMIT 10"),
+                    {"q": f"%{q}%"},
+                ).all(),
+                min(args.rounds, 10),
+            )
+        print(f"fts5 ranked top-10: {fts_ms:.2f} ms/query")
+        print(f"fts5 stop-word-like query ({COMMON_QUERY!r}): {common_ms:.2f} ms/query")
+        print(f"LIKE scan:          {like_ms:.2f} ms/query")
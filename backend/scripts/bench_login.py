@@ -0,0 +1,119 @@
+"""
+Benchmark a login storm: N students logging in at once (start of a class).
+
+Compares the async /auth/login (bcrypt on the dedicated password_hasher
+executor) with the previous sync handler (bcrypt inside FastAPI's shared
+threadpool), and measures how long a trivial request waits meanwhile.
+
+Run: python scripts/bench_login.py --users 200 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import crud, models
+from app.database import Base
+from app.deps import get_db
+from app.main import app
+from app.services.passwords import PasswordHasher, hash_password
+
+
+@app.post("/bench/sync-login")
+def sync_login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    # معالج تسجيل الدخول السابق كما كان
+    if not crud.verify_user(db, form_data.username, form_data.password):
+        raise HTTPException(status_code=400, detail="Incorrect credentials")
+    return {"ok": True}
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+async def storm(client: httpx.AsyncClient, path: str, users: int) -> tuple[list[float], list[float]]:
+    async def login(i: int) -> float:
+        start = time.perf_counter()
+        r = await client.post(path, data={"username": f"student{i}@example.com", "password": "secret"})
+        assert r.status_code == 200, r.text
+        return time.perf_counter() - start
+
+    async def probe(stop: asyncio.Event) -> list[float]:
+        waits = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            await client.get("/")
+            waits.append(time.perf_counter() - start)
+            await asyncio.sleep(0.05)
+        return waits
+
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(stop))
+    latencies = await asyncio.gather(*(login(i) for i in range(users)))
+    stop.set()
+    return list(latencies), await prober
+
+
+def report(name: str, latencies: list[float], probes: list[float], wall: float) -> None:
+    print(
+        f"{name:<28} wall {wall:6.2f}s  p50 {statistics.median(latencies) * 1000:7.0f}ms  "
+        f"p99 {percentile(latencies, 99) * 1000:7.0f}ms  max {max(latencies) * 1000:7.0f}ms  "
+        f"'/' p99 {percentile(probes or [0.0], 99) * 1000:6.0f}ms"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, path in (("sync (shared threadpool)", "/bench/sync-login"), ("async (password_hasher)", "/api/v1/auth/login")):
+            start = time.perf_counter()
+            latencies, probes = await storm(client, path, args.users)
+            report(name, latencies, probes, time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        Base.metadata.tables["users"].create(engine)
+        SessionLocal = sessionmaker(bind=engine)
+        # بصمة واحدة لكل الطلاب: التحضير لا يحتاج 200 عملية bcrypt
+        hashed = hash_password("secret", rounds=args.rounds)
+        with SessionLocal() as db:
+            db.add_all(models.User(email=f"student{i}@example.com", hashed_password=hashed) for i in range(args.users))
+            db.commit()
+
+        def db_session():
+            session = SessionLocal()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app.dependency_overrides[get_db] = db_session
+        import app.api.auth as auth_api
+        auth_api.password_hasher = PasswordHasher(workers=args.workers, max_pending=max(args.users, 1), rounds=args.rounds)
+        print(f"{args.users} concurrent logins, bcrypt rounds={args.rounds}, hasher workers={args.workers}")
+        asyncio.run(run(args))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark OFFSET vs keyset pagination of the course list at increasing depth.
+
+Run: python scripts/bench_pagination.py --courses 200000 --limit 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import crud, models
+from app.database import Base, create_db_engine
+
+
+def timed(fn, repeat: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--courses", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine, tables=[Base.metadata.tables["courses"]])
+        with engine.begin() as conn:
+            conn.execute(models.Course.__table__.insert(), [
+                {"title": f"Unit {(i * 7919) % args.courses:07d}", "description": "x" * 100} for i in range(args.courses)
+            ])
+
+        with Session(engine) as db:
+            pages = [p for p in (1, 10, 100, 1000, 4000) if (p - 1) * args.limit < args.courses]
+            # مؤشر بداية كل صفحة كما يصل من العميل
+            cursors, after = {}, None
+            for page in range(1, max(pages) + 1):
+                cursors[page] = after
+                _, after = crud.get_courses(db, after=after, limit=args.limit)
+
+            print(f"{args.courses} courses, {args.limit} per page (ms per page)")
+            for page in pages:
+                offset = timed(lambda page=page: db.execute(
+                    select(models.Course).order_by(models.Course.title, models.Course.id).offset((page - 1) * args.limit).limit(args.limit)
+                ).scalars().all())
+                keyset = timed(lambda page=page: crud.get_courses(db, after=cursors[page], limit=args.limit))
+                print(f"page {page:5d}: offset {offset:8.2f}   keyset {keyset:6.2f}")
+            print(f"estimated total {crud.estimate_courses(db)} in {timed(lambda: crud.estimate_courses(db)):.3f} ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
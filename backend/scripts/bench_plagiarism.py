@@ -0,0 +1,68 @@
+"""
+Benchmark MinHash/LSH plagiarism detection against pairwise evaluate_text.
+
+Generates a cohort of essays where a few students copied (with small edits)
+from others, then times the LSH report and the all-pairs comparison.
+Run: python scripts/bench_plagiarism.py --students 500
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.plagiarism import PlagiarismIndex, minhash, shingle_hashes, similarity
+from app.services.text_evaluator import evaluate_text
+
+
+def cohort(students, words, copies, seed=0):
+    rnd = random.Random(seed)
+    vocab = [f"w{i}" for i in range(5000)]
+    essays = [rnd.choices(vocab, k=words) for _ in range(students)]
+    copied = set()
+    picked = rnd.sample(range(students), 2 * copies)
+    for source, target in zip(picked[:copies], picked[copies:]):
+        edited = list(essays[source])
+        for _ in range(words // 20):
+            edited[rnd.randrange(words)] = rnd.choice(vocab)
+        essays[target] = edited
+        copied.add(tuple(sorted((source, target))))
+    return [" ".join(e) for e in essays], copied
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--copies", type=int, default=20)
+    parser.add_argument("--pairwise-sample", type=int, default=2000)
+    args = parser.parse_args()
+
+    texts, copied = cohort(args.students, args.words, args.copies)
+
+    start = time.perf_counter()
+    index = PlagiarismIndex()
+    for i, text in enumerate(texts):
+        index.add(i, minhash(shingle_hashes(text)))
+    signed = time.perf_counter() - start
+    candidates = index.candidate_pairs()
+    found = {p for p in candidates if similarity(index.signatures[p[0]], index.signatures[p[1]]) >= 0.5}
+    lsh = time.perf_counter() - start
+    print(f"{args.students} students: signatures {signed * 1000:.0f} ms, report {lsh * 1000:.0f} ms")
+    print(f"compared {len(candidates)} of {args.students * (args.students - 1) // 2} pairs, "
+          f"found {len(found & copied)}/{len(copied)} copies, {len(found - copied)} false positives")
+
+    pairs = list(itertools.islice(itertools.combinations(range(args.students), 2), args.pairwise_sample))
+    start = time.perf_counter()
+    for a, b in pairs:
+        evaluate_text(texts[a], texts[b])
+    per_pair = (time.perf_counter() - start) / len(pairs)
+    total = per_pair * args.students * (args.students - 1) / 2
+    print(f"pairwise evaluate_text: {per_pair * 1e6:.0f} us/pair, ~{total:.1f} s for all pairs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark VAD windowing of a long recording: throughput and peak memory
+compared to decoding the whole file at once.
+
+Run: python scripts/bench_speech_windows.py --minutes 20
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.audio_evaluator import SAMPLE_RATE, read_pcm, speech_windows
+
+
+def write_recording(path: str, minutes: float, seed: int = 0) -> None:
+    """Alternating 'speech' bursts (noisy tones) and pauses, written one burst at a time."""
+    rng = np.random.default_rng(seed)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        written = 0
+        while written < minutes * 60 * SAMPLE_RATE:
+            speech = int(rng.uniform(3, 40) * SAMPLE_RATE)
+            pause = int(rng.uniform(0.2, 1.5) * SAMPLE_RATE)
+            t = np.arange(speech)
+            burst = 0.2 * np.sin(t * rng.uniform(0.05, 0.3)) * (1 + 0.5 * np.sin(t / 800))
+            audio = np.concatenate([burst, rng.normal(0, 0.002, pause)])
+            f.writeframes((audio * 32767).astype("<i2").tobytes())
+            written += len(audio)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=20)
+    parser.add_argument("--path", default="bench_oral.wav")
+    args = parser.parse_args()
+
+    write_recording(args.path, args.minutes)
+    try:
+        tracemalloc.start()
+        start = time.perf_counter()
+        windows = [(s, len(w) / SAMPLE_RATE) for s, w in speech_windows(read_pcm(args.path))]
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        lengths = [length for _, length in windows]
+        whole = os.path.getsize(args.path) * 2  # float32 samples are twice the int16 file size
+        print(f"{args.minutes:.0f} min audio -> {len(windows)} windows in {elapsed:.2f}s")
+        print(f"window length: mean {np.mean(lengths):.1f}s, max {max(lengths):.1f}s")
+        print(f"peak memory: {peak / 1e6:.1f} MB (whole file decoded: {whole / 1e6:.1f} MB)")
+    finally:
+        os.remove(args.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmark bulk text evaluation against one evaluate_text call per answer.
+
+Run: python scripts/bench_text_evaluator.py --answers 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.text_evaluator import evaluate_bulk, evaluate_text
+
+WORDS = (
+    "التسويق هو عملية تحديد احتياجات العملاء وتلبيتها بطريقة مربحة للشركة المنتج السعر المكان الترويج "
+    "marketing mix price place promotion customers profit revenue"
+).split()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=120)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    model = " ".join(rnd.choices(WORDS, k=args.words))
+    answers = [" ".join(rnd.choices(WORDS, k=rnd.randint(args.words // 2, args.words * 2))) for _ in range(args.answers)]
+
+    start = time.perf_counter()
+    for answer in answers:
+        evaluate_text(answer, model)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in evaluate_bulk(model, answers):
+        pass
+    bulk = time.perf_counter() - start
+    print(f"evaluate_text: {args.answers / single:.0f} answers/s")
+    print(f"evaluate_bulk: {args.answers / bulk:.0f} answers/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark the tutor rule engine as the rulebook grows.
+
+Builds synthetic rulebooks (real rules + N generated criteria phrases) and
+measures the average time of one reply. Cost should stay flat with N.
+Run: python scripts/bench_tutor_rules.py
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.tutor_rules import RULES_PATH, TutorRuleEngine
+
+MESSAGES = [
+    "How do I get a distinction in unit 4?",
+    "كيف أحصل على امتياز في الوحدة الرابعة؟",
+    "What do I need for merit on assignment 2 criteria?",
+    "مرحبا، عندي سؤال عن المشروع",
+]
+
+
+def synthetic_rules(base, n):
+    rules = list(base)
+    for i in range(n):
+        rules.append({
+            "id": f"criterion-{i}",
+            "keywords": [f"unit {i} criterion p{i}", f"معيار الوحدة {i} رقم {i}"],
+            "response": f"Criterion {i}",
+        })
+    return rules
+
+
+def bench(engine, rounds=20000):
+    start = time.perf_counter()
+    for i in range(rounds):
+        engine.reply(MESSAGES[i % len(MESSAGES)])
+    return (time.perf_counter() - start) / rounds
+
+
+if __name__ == "__main__":
+    with open(RULES_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    for n in (0, 100, 1000, 5000):
+        build_start = time.perf_counter()
+        engine = TutorRuleEngine(synthetic_rules(data["rules"], n), data["default"])
+        build = time.perf_counter() - build_start
+        per_call = bench(engine)
+        print(f"rules={len(engine.rules):>5} build={build * 1000:7.1f}ms reply={per_call * 1e6:6.2f}us")
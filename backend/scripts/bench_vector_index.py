@@ -0,0 +1,88 @@
+"""
+Benchmark the knowledge vector index: brute-force dot products vs IVF.
+
+Generates N clustered unit vectors (topics + noise, like real chunk
+embeddings), writes them to a memory-mapped .npy file, then reports query
+latency and recall@k of IVF against exact brute-force search. Also reports
+HashingEmbedder throughput.
+Run: python scripts/bench_vector_index.py --chunks 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from app.services.embeddings import HashingEmbedder
+from app.services.vector_index import VectorIndex, build_ivf
+
+
+def make_vectors(path, n, dim, topics, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n, dim))
+    for start in range(0, n, 50_000):
+        m = min(50_000, n - start)
+        block = centers[rng.integers(0, topics, m)] + 1.5 * rng.standard_normal((m, dim)).astype(np.float32)
+        out[start:start + m] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    out.flush()
+    return np.load(path, mmap_mode="r")
+
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for i in range(rounds):
+        result = fn(i)
+    return (time.perf_counter() - start) * 1000 / rounds, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vectors = make_vectors(os.path.join(tmp, "vectors.npy"), args.chunks, args.dim, args.topics)
+        ids = np.arange(1, args.chunks + 1, dtype=np.int64)
+        rng = np.random.default_rng(1)
+        queries = np.asarray(vectors[rng.integers(0, args.chunks, args.queries)])
+        queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        exact = VectorIndex(ids, vectors, "bench")
+        exact_ms, _ = timed(lambda i: exact.search(queries[i], k=args.k), args.queries)
+        truth = exact.search(queries, k=args.k)
+        batch_ms = timed(lambda i: exact.search(queries, k=args.k), 3)[0] / args.queries
+        print(f"{args.chunks} chunks x {args.dim} dims")
+        print(f"brute force: {exact_ms:.2f} ms/query, batched {batch_ms:.2f} ms/query")
+
+        start = time.perf_counter()
+        ivf = build_ivf(vectors)
+        print(f"IVF build: {time.perf_counter() - start:.1f}s ({len(ivf.centroids)} lists)")
+        approx = VectorIndex(ids, vectors, "bench", ivf)
+        for nprobe in (4, 8, 16, 32, 64):
+            ms, _ = timed(lambda i: approx.search(queries[i], k=args.k, nprobe=nprobe), args.queries)
+            found = approx.search(queries, k=args.k, nprobe=nprobe)
+            recall = np.mean([
+                len({i for i, _ in f} & {i for i, _ in t}) / len(t) for f, t in zip(found, truth)
+            ])
+            print(f"IVF nprobe={nprobe:>2}: {ms:.2f} ms/query, recall@{args.k} {recall:.3f}")
+
+    embedder = HashingEmbedder()
+    words = "business marketing finance revenue profit customer strategy تسويق مالية ربح عميل".split()
+    texts = [" ".join(rng.choice(words, 200)) + f" term{i}" for i in range(2_000)]
+    start = time.perf_counter()
+    embedder.embed(texts)
+    print(f"HashingEmbedder: {len(texts) / (time.perf_counter() - start):.0f} chunks/s")
+
+
+if __name__ == "__main__":
+    main()
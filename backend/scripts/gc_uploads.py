@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Remove uploaded blobs that no user file references anymore, expired
+resumable upload sessions, and orphaned or abandoned temporary files. Safe to run from cron while the API is up.
+
+Run: python scripts/gc_uploads.py [--grace 3600]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.database import SessionLocal
+from app.services.blob_store import GC_GRACE_SECONDS, BlobStore, dedup_stats
+from app.services.resumable_uploads import expire_sessions
+from app.services.uploads import UPLOAD_DIR, ensure_upload_tables
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--grace", type=int, default=GC_GRACE_SECONDS, help="seconds an unreferenced blob is kept")
+    parser.add_argument("--upload-dir", default=UPLOAD_DIR)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        ensure_upload_tables(db.get_bind())
+        sessions = expire_sessions(db, args.upload_dir)
+        removed = BlobStore(args.upload_dir).collect_garbage(db, grace_seconds=args.grace)
+        stats = dedup_stats(db)
+    print(f"removed {removed['blobs']} blobs ({removed['bytes'] / 1e6:.1f} MB), {removed['orphans']} orphans, {removed['temp']} temp files, {sessions} expired upload sessions")
+    print(f"{stats['files']} files -> {stats['blobs']} blobs, dedup ratio {stats['dedup_ratio']}, saved {stats['saved_bytes'] / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 ﻿from fastapi.testclient import TestClient
 from sqlmodel import create_engine, Session
 from app.main import app
-from app.api import deps
+from app import deps
 
 # 1. إعداد الاتصال بالعقل المحلي الذي أنشأناه
 engine = create_engine("sqlite:///./knowledge.db", connect_args={"check_same_thread": False})
@@ -1,5 +1,5 @@
-﻿from sqlmodel import Session, create_engine, select, col, or_
-from app.models import KnowledgeItem
+﻿from sqlmodel import Session, create_engine
+from app.services.knowledge_search import search_knowledge
 
 engine = create_engine("sqlite:///./knowledge.db")
 
@@ -10,14 +10,7 @@ def search_brain_v2():
     if not query: return
 
     with Session(engine) as session:
-        statement = select(KnowledgeItem).where(
-            or_(
-                col(KnowledgeItem.content).contains(query),
-                col(KnowledgeItem.source_file).contains(query)
-            )
-        ).limit(3)
-        
-        results = session.exec(statement).all()
+        results = search_knowledge(session, query, limit=3)
         
         print(f"\n🔎 Found {len(results)} matches for '{query}':\n")
         
@@ -25,13 +18,14 @@ def search_brain_v2():
             print("❌ Still no matches. Try 'Business' or 'Unit'.")
         
         for i, item in enumerate(results, 1):
-            # الإصلاح: معالجة النص في متغير منفصل أولاً
-            raw_snippet = item.content[:200]
-            clean_snippet = raw_snippet.replace('\n', ' ')
+            clean_snippet = item.snippet.replace('\n', ' ')
             
             print(f"--- 📄 Result {i} ---")
-            print(f"📂 Source: {item.source_file}")
-            print(f"🏷️  Folder: {item.metadata_info.get('folder', 'Unknown')}")
+            print(f"📂 Source: {item.location}")
+            print(f"🏷️  Folder: {item.category or 'Unknown'}")
+            if item.section:
+                print(f"📑 Section: {item.section}")
+            print(f"⭐ Score: {item.score:.2f}")
             print(f"📝 Text Snippet: {clean_snippet}...")
             print("-" * 50)
 
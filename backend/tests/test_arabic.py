@@ -0,0 +1,23 @@
+from app.services.arabic import normalize, stem, tokenize
+from app.services.text_evaluator import evaluate_text
+from app.services.tutor_rules import rule_engine
+
+
+def test_normalize_folds_common_variants() -> None:
+    assert normalize("أإآٱ") == "اااا"
+    assert normalize("مدرسة") == normalize("مدرسه")
+    assert normalize("مُحَمَّد") == "محمد"
+    assert normalize("تـــطويل") == "تطويل"
+    assert normalize("٢٠٢٤ Unit") == "2024 unit"
+
+
+def test_tokenize_strips_stopwords_and_light_stems() -> None:
+    assert tokenize("ما هي الاستراتيجيات في المدرسةِ؟") == ["استراتيج", "مدرس"]
+    assert stem("والمعلمون") == "معلم"
+    assert stem("marketing") == "marketing"
+    assert tokenize("في من", stopwords=False, stemming=False) == ["في", "من"]
+
+
+def test_spelling_variants_match_everywhere() -> None:
+    assert evaluate_text("الإجابة الصحيحة", "الاجابه الصحيحه")["levenshtein_ratio"] == 1.0
+    assert rule_engine.match("كيف أحصل على الإمتياز") == rule_engine.match("كيف احصل على الامتياز")
@@ -1,5 +1,4 @@
 from app.services.assessments import assess_question
-from app.core.config import settings
 
 
 def test_assess_question_basic():
@@ -10,3 +9,17 @@ def test_assess_question_basic():
     assert res["major"] == "Business"
     assert isinstance(res["difficulty_score"], int)
     assert "Business" in res["advice"] or "business" in res["advice"].lower()
+
+
+def test_assess_question_is_deterministic():
+    q = "Evaluate the pricing strategy of a local company."
+    first = assess_question(q, "L3", "Business")
+    second = assess_question(q, "L3", "Business")
+    assert first == second
+
+
+def test_assess_question_higher_verbs_score_higher():
+    describe = assess_question("Describe the pricing strategy of a local company.", "L2", "Business")
+    evaluate = assess_question("Evaluate the pricing strategy of a local company.", "L2", "Business")
+    assert evaluate["difficulty_score"] > describe["difficulty_score"]
+    assert 1 <= describe["difficulty_score"] <= 10
@@ -0,0 +1,54 @@
+from app.services.chunking import chunk_text, is_heading
+
+
+def test_chunks_are_bounded_and_overlap() -> None:
+    text = " ".join(f"Sentence number {i} explains the marketing mix." for i in range(200))
+    chunks = chunk_text(text, max_chars=300, overlap=80)
+
+    assert len(chunks) > 5
+    assert all(len(c.text) <= 300 for c in chunks)
+    assert [c.index for c in chunks] == list(range(len(chunks)))
+    for prev, nxt in zip(chunks, chunks[1:]):
+        last_sentence = prev.text.rsplit(". ", 1)[-1]
+        assert nxt.text.startswith(last_sentence)
+
+
+def test_arabic_sentences_are_not_split_mid_word() -> None:
+    text = "ما هو التسويق؟ التسويق هو عملية تحديد احتياجات العملاء. " * 30
+    chunks = chunk_text(text, max_chars=200, overlap=0)
+
+    assert len(chunks) > 1
+    for c in chunks:
+        assert c.text.endswith(("؟", "."))
+
+
+def test_headings_start_new_chunks() -> None:
+    text = "UNIT 1 MARKETING\nMarketing basics.\n\nUNIT 2 FINANCE\nFinance basics."
+    chunks = chunk_text(text, max_chars=1000, overlap=200)
+
+    assert [(c.heading, c.text) for c in chunks] == [
+        ("UNIT 1 MARKETING", "UNIT 1 MARKETING\nMarketing basics."),
+        ("UNIT 2 FINANCE", "UNIT 2 FINANCE\nFinance basics."),
+    ]
+    assert is_heading("# Learning aim A")
+    assert not is_heading("This is a normal sentence.")
+
+
+def test_carried_overlap_never_pushes_chunk_over_limit() -> None:
+    sentences = []
+    for i in range(60):
+        length = (40, 150, 90, 190, 15)[i % 5]
+        sentences.append(f"S{i} " + "x" * (length - len(f"S{i} ") - 1) + ".")
+    chunks = chunk_text(" ".join(sentences), max_chars=200, overlap=120)
+
+    assert max(len(c.text) for c in chunks) <= 200
+    assert all(any(sentence in c.text for c in chunks) for sentence in sentences)
+
+
+def test_unpunctuated_arabic_lines_stay_in_one_paragraph() -> None:
+    text = "التسويق هو عملية تحديد احتياجات العملاء\nويشمل المزيج التسويقي المنتج والسعر\nوالمكان والترويج وتحليل المنافسين"
+    chunks = chunk_text(text, max_chars=1000, overlap=200)
+
+    assert [(c.heading, c.text) for c in chunks] == [(None, text.replace("\n", " "))]
+    assert not is_heading("التسويق هو عملية تحديد احتياجات العملاء")
+    assert is_heading("الوحدة 3 التسويق")
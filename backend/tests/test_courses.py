@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+
+import anyio
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.crud import COURSE_ORDER
+from app.database import Base, create_async_db_engine
+from app.deps import get_async_db
+from app.main import app
+from app.models import Course, Lesson, UserFile
+from app.services.catalog import catalog_cache
+from app.services.pagination import Keyset
+
+
+def make_client(monkeypatch=None):
+    engine = create_async_db_engine("sqlite://")
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[Base.metadata.tables["courses"], Base.metadata.tables["lessons"]])
+
+    anyio.run(create_tables)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def db():
+        async with SessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = db
+    if monkeypatch is not None:
+        monkeypatch.setattr(catalog_cache, "session_factory", SessionLocal)
+        catalog_cache.invalidate()
+    return TestClient(app), engine, SessionLocal
+
+
+def teardown_function() -> None:
+    app.dependency_overrides.clear()
+
+
+def test_create_and_list_courses_over_async_session() -> None:
+    client, _, _ = make_client()
+    for title in ("Unit 2", "Unit 1", "Unit 3"):
+        r = client.post("/api/v1/courses/", json={"title": title, "description": None})
+        assert r.status_code == 200, r.text
+
+    r = client.get("/api/v1/courses/", params={"limit": 2, "estimate_total": True})
+    assert r.status_code == 200
+    page = r.json()
+    assert [c["title"] for c in page["data"]] == ["Unit 1", "Unit 2"] and page["estimated_total"] == 3
+
+    page = client.get("/api/v1/courses/", params={"limit": 2, "after": page["next_cursor"]}).json()
+    assert [c["title"] for c in page["data"]] == ["Unit 3"] and page["next_cursor"] is None
+    assert page["estimated_total"] is None
+
+
+def test_cursor_walk_covers_duplicates_and_rejects_bad_cursors() -> None:
+    client, _, _ = make_client()
+    titles = ["B", "A", "B", "C", "A", "B"]
+    for title in titles:
+        client.post("/api/v1/courses/", json={"title": title})
+
+    seen, after = [], None
+    while True:
+        params = {"limit": 2, **({"after": after} if after else {})}
+        page = client.get("/api/v1/courses/", params=params).json()
+        seen += [(c["title"], c["id"]) for c in page["data"]]
+        after = page["next_cursor"]
+        if after is None:
+            break
+    assert seen == sorted(seen) and len(set(seen)) == len(titles)
+
+    assert client.get("/api/v1/courses/", params={"after": "not-a-cursor"}).status_code == 400
+    assert client.get("/api/v1/courses/", params={"limit": 1000}).status_code == 422
+
+
+def test_keyset_over_created_at_and_nullable_keys() -> None:
+    engine = create_engine("sqlite://")
+    UserFile.__table__.create(engine)
+    start = datetime(2026, 1, 1)
+    order = Keyset("created", UserFile.content_type, UserFile.created_at, UserFile.id)
+    with Session(engine) as db:
+        for i in range(7):
+            db.add(UserFile(
+                id=f"f{i}", owner_id="1", original_filename="x", stored_path="x",
+                content_type=None if i % 3 == 0 else "application/pdf", created_at=start + timedelta(minutes=i % 4),
+            ))
+        db.commit()
+
+        ids, after = [], None
+        while True:
+            rows, after = order.page(db.execute(order.apply(select(UserFile), after, 3)).scalars(), 3)
+            ids += [r.id for r in rows]
+            if after is None:
+                break
+    # NULL أولاً، ثم حسب الوقت والمعرف
+    assert ids == ["f0", "f6", "f3", "f4", "f1", "f5", "f2"]
+
+
+def test_course_order_matches_the_default_postgres_index() -> None:
+    sql = str(COURSE_ORDER.apply(select(Course), COURSE_ORDER.encode(Course(title="B", id=7)), 50).compile(dialect=postgresql.dialect()))
+    assert "ORDER BY courses.title ASC, courses.id ASC" in sql and "NULLS" not in sql
+    # مفتاح يقبل NULL يبقى NULL أولاً
+    nullable = Keyset("type", UserFile.content_type, UserFile.id)
+    assert "content_type ASC NULLS FIRST" in str(nullable.apply(select(UserFile), None, 10).compile(dialect=postgresql.dialect()))
+
+
+def test_catalog_loads_lessons_in_fixed_queries_and_is_cached(monkeypatch) -> None:
+    client, engine, SessionLocal = make_client(monkeypatch)
+    queries = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+
+    async def seed():
+        async with SessionLocal() as db:
+            for i in range(20):
+                course = Course(title=f"Unit {i:02d}")
+                course.lessons = [Lesson(title=f"Lesson {i}.{j}") for j in range(3)]
+                db.add(course)
+            await db.commit()
+
+    anyio.run(seed)
+    queries.clear()
+    catalog = client.get("/api/v1/courses/catalog").json()["courses"]
+    assert len(catalog) == 20 and [lesson["title"] for lesson in catalog[0]["lessons"]] == ["Lesson 0.0", "Lesson 0.1", "Lesson 0.2"]
+    # المقررات والدروس: استعلامان أياً كان عدد المقررات
+    assert len(queries) == 2
+
+    queries.clear()
+    assert client.get("/api/v1/courses/catalog").json()["courses"] == catalog
+    assert queries == []
+
+    # إضافة مقرر عبر API تُبطل النسخة المحفوظة
+    client.post("/api/v1/courses/", json={"title": "Unit 99"})
+    assert len(client.get("/api/v1/courses/catalog").json()["courses"]) == 21
+
+    # وكذلك تعديل الدروس بأمر update مباشر
+    async def rename_lessons():
+        async with SessionLocal() as db:
+            await db.execute(update(Lesson).where(Lesson.title == "Lesson 0.0").values(title="Intro"))
+            await db.commit()
+
+    anyio.run(rename_lessons)
+    assert client.get("/api/v1/courses/catalog").json()["courses"][0]["lessons"][0]["title"] == "Intro"
@@ -0,0 +1,55 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.database import create_db_engine, pool_metrics
+from app.main import app
+
+
+def test_sqlite_file_engine_uses_wal_and_busy_timeout(tmp_path) -> None:
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert pool_metrics(engine)["in_use"] == 1
+    metrics = pool_metrics(engine)
+    assert isinstance(engine.pool, QueuePool)
+    assert (metrics["pool"], metrics["in_use"], metrics["checkouts"]) == ("QueuePool", 0, 1)
+    engine.dispose()
+
+
+def test_pool_timeout_and_wait_are_recorded(tmp_path) -> None:
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}", pool_size=1, max_overflow=0, pool_timeout=0.2)
+    held = engine.connect()
+    with pytest.raises(PoolTimeout):
+        engine.connect()
+    metrics = pool_metrics(engine)
+    assert metrics["timeouts"] == 1 and metrics["wait_max_ms"] >= 200
+    assert (metrics["in_use"], metrics["size"], metrics["overflow"]) == (1, 1, 0)
+
+    # اتصال يُعاد أثناء الانتظار يصل للطلب المنتظر
+    threading.Timer(0.05, held.close).start()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert pool_metrics(engine)["timeouts"] == 1
+    engine.dispose()
+
+
+def test_postgres_modes_choose_pool_without_connecting() -> None:
+    pytest.importorskip("psycopg")
+    pooled = create_db_engine("postgresql+psycopg://u:p@localhost/db", pgbouncer=False)
+    assert isinstance(pooled.pool, QueuePool) and pooled.pool._pre_ping and pooled.pool._recycle == 1800
+    bouncer = create_db_engine("postgresql+psycopg://u:p@localhost/db", pgbouncer=True)
+    assert isinstance(bouncer.pool, NullPool)
+    assert pool_metrics(bouncer)["pool"] == "NullPool"
+
+
+def test_health_endpoints() -> None:
+    client = TestClient(app)
+    assert client.get("/api/v1/health/").json() == {"status": {"status": "ok"}}
+    assert "in_use" in client.get("/api/v1/health/db").json()
@@ -0,0 +1,63 @@
+from sqlalchemy import event
+
+from app.services.http_cache import VersionCounters, _matches
+from tests.test_courses import make_client, teardown_function  # noqa: F401
+
+
+def count_queries(engine) -> list:
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_repeat_request_with_etag_skips_the_database(monkeypatch) -> None:
+    client, engine, _ = make_client(monkeypatch)
+    client.post("/api/v1/courses/", json={"title": "Unit 1", "description": None})
+
+    first = client.get("/api/v1/courses/", params={"limit": 10})
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+
+    statements = count_queries(engine)
+    again = client.get("/api/v1/courses/", params={"limit": 10}, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+    assert statements == []
+
+    # استعلام مختلف له ETag مختلف
+    other = client.get("/api/v1/courses/", params={"limit": 5}, headers={"If-None-Match": etag})
+    assert other.status_code == 200 and other.headers["etag"] != etag
+
+    client.post("/api/v1/courses/", json={"title": "Unit 2", "description": None})
+    changed = client.get("/api/v1/courses/", params={"limit": 10}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert [c["title"] for c in changed.json()["data"]] == ["Unit 1", "Unit 2"]
+
+
+def test_catalog_is_publicly_cacheable_and_errors_are_not_tagged(monkeypatch) -> None:
+    client, _, _ = make_client(monkeypatch)
+    r = client.get("/api/v1/courses/catalog")
+    assert r.status_code == 200 and r.headers["cache-control"] == "public, max-age=60"
+    assert client.get("/api/v1/courses/catalog", headers={"If-None-Match": f'W/{r.headers["etag"]}, "x"'}).status_code == 304
+
+    bad = client.get("/api/v1/courses/", params={"after": "not-a-cursor"})
+    assert bad.status_code == 400 and "etag" not in bad.headers
+    # المسارات غير المشتركة لا تتأثر
+    assert "etag" not in client.post("/api/v1/courses/", json={"title": "U", "description": None}).headers
+
+
+def test_version_tags_change_with_writes_and_time_window() -> None:
+    now = [0.0]
+    counters = VersionCounters(window=60, clock=lambda: now[0])
+    tag = counters.etag(("courses",), "/api/v1/courses/?")
+    assert counters.etag(("courses",), "/api/v1/courses/?") == tag
+    assert counters.etag(("courses",), "/api/v1/courses/?", "Bearer a") != tag
+
+    counters.bump("knowledge")
+    assert counters.etag(("courses",), "/api/v1/courses/?") == tag
+    counters.bump("courses")
+    assert counters.etag(("courses",), "/api/v1/courses/?") != tag
+
+    tag = counters.etag(("courses",), "/api/v1/courses/?")
+    now[0] = 61
+    assert counters.etag(("courses",), "/api/v1/courses/?") != tag
+    assert _matches("*", tag) and not _matches('"other"', tag)
@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import KnowledgeItem
+from app.services.bm25 import BM25Index, build_bm25_index, default_bm25_path
+from app.services.hybrid_search import hybrid_search
+from app.services.vector_index import default_index_path, sync_vector_index
+
+
+def test_bm25_prefers_rare_terms() -> None:
+    index = BM25Index.build([
+        (1, "business business business plan"),
+        (2, "business cash flow forecast"),
+        (3, "marketing mix"),
+    ])
+    assert [doc_id for doc_id, _ in index.search("cash business")][:1] == [2]
+    assert index.search("unknown words") == []
+
+
+def test_hybrid_search_fuses_and_dedups(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'knowledge.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([
+            KnowledgeItem(content="Break-even analysis compares costs and revenue", source_file="u3.pdf", page=5, chunk_index=0),
+            KnowledgeItem(content="Break-even analysis compares costs and revenue", source_file="copy/u3.pdf", page=5, chunk_index=0),
+            KnowledgeItem(content="Break-even point in units: fixed costs over contribution", source_file="u3.pdf", page=5, chunk_index=1),
+            KnowledgeItem(content="Marketing mix: product, price, place, promotion", source_file="u2.pdf", page=2, chunk_index=0),
+        ])
+        session.commit()
+        sync_vector_index(session, default_index_path(engine))
+        build_bm25_index(session, default_bm25_path(engine))
+
+        hits = hybrid_search(session, "break-even costs", limit=3)
+        assert [(h.source_file, h.page) for h in hits][0] == ("u3.pdf", 5)
+        # نفس النص في ملف آخر، ومقطع آخر من نفس الصفحة، لا يتكرران
+        assert len({h.snippet for h in hits}) == len(hits)
+        assert sum(h.source_file == "u3.pdf" for h in hits) == 1
+        assert "[costs]" in hits[0].snippet
+
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda _: [h.id for h in hybrid_search(session, "marketing price", limit=1)], range(16)))
+        assert all(r == [4] for r in results)
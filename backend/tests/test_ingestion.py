@@ -0,0 +1,90 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import IngestManifestEntry, KnowledgeItem
+from app.services.ingest_manifest import normalize_path
+from app.services.ingestion import collect_files, ingest_folders, run_ingestion
+
+
+def make_docx(path, text):
+    docx = pytest.importorskip("docx")
+    doc = docx.Document()
+    doc.add_paragraph(text)
+    doc.save(path)
+
+
+def test_collect_files_filters_extensions(tmp_path) -> None:
+    folder = tmp_path / "L2 Grade 10"
+    folder.mkdir()
+    (folder / "a.pdf").write_bytes(b"")
+    (folder / "b.txt").write_text("x")
+    (folder / "c.docx").write_bytes(b"")
+    tasks = collect_files([str(folder), str(tmp_path / "missing")], skip=lambda p: p.endswith("c.docx"))
+    assert tasks == [(str(folder / "a.pdf"), "L2 Grade 10")]
+
+
+def test_run_ingestion_writes_in_batches(tmp_path) -> None:
+    folder = tmp_path / "Business"
+    folder.mkdir()
+    for i in range(5):
+        make_docx(folder / f"unit{i}.docx", f"Unit {i} marketing")
+    (folder / "broken.docx").write_bytes(b"not a docx")
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'kb.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        report = run_ingestion(session, collect_files([str(folder)]), workers=2, batch_size=2)
+        rows = session.execute(select(KnowledgeItem.source_file)).scalars().all()
+
+    assert report.files_done == 5
+    assert report.files_failed == 1
+    assert report.pages == 5
+    assert report.commits >= 3
+    assert sorted(rows) == [f"unit{i}.docx" for i in range(5)]
+
+
+def test_manifest_reingests_only_changed_files(tmp_path) -> None:
+    a, b = tmp_path / "L2", tmp_path / "L3"
+    a.mkdir()
+    b.mkdir()
+    make_docx(a / "brief.docx", "old brief")
+    make_docx(b / "brief.docx", "level three brief")
+    folders = [str(a), str(b)]
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'kb.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        report = ingest_folders(session, folders, workers=2)
+        assert (report.files_total, report.files_done, report.removed) == (2, 2, 0)
+        # نفس الاسم في مجلدين مختلفين: ملفان منفصلان
+        assert session.query(KnowledgeItem).count() == 2
+        entries = {e.path: e for e in session.query(IngestManifestEntry)}
+        assert set(entries) == {normalize_path(str(a / "brief.docx")), normalize_path(str(b / "brief.docx"))}
+        assert all(e.items == 1 and len(e.sha256) == 64 for e in entries.values())
+
+        # لا تغيير: لا يُستخرج أي ملف
+        assert ingest_folders(session, folders, workers=2).files_total == 0
+
+        # لمس الملف دون تغيير محتواه: يُقرأ مرة، يتحدث السجل ولا تُعاد الصفحات
+        os.utime(b / "brief.docx", ns=(1, 10**18))
+        assert ingest_folders(session, folders, workers=2).files_total == 1
+        assert session.get(IngestManifestEntry, normalize_path(str(b / "brief.docx"))).mtime_ns == 10**18
+        assert session.query(KnowledgeItem).count() == 2
+        assert ingest_folders(session, folders, workers=2).files_total == 0
+
+        make_docx(a / "brief.docx", "new brief")
+        os.utime(a / "brief.docx", ns=(1, 2 * 10**18))
+        assert ingest_folders(session, folders, workers=2).files_total == 1
+        contents = sorted(session.execute(select(KnowledgeItem.content)).scalars())
+        assert [c.strip() for c in contents] == ["level three brief", "new brief"]
+
+        # ملف أزيل من المجلد: صفحاته وسجله يُحذفان
+        os.remove(b / "brief.docx")
+        report = ingest_folders(session, folders, workers=2)
+        assert (report.files_total, report.removed) == (0, 1)
+        assert [c.strip() for c in session.execute(select(KnowledgeItem.content)).scalars()] == ["new brief"]
+        assert [e.path for e in session.query(IngestManifestEntry)] == [normalize_path(str(a / "brief.docx"))]
@@ -0,0 +1,109 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import KnowledgeItem
+from app.services.knowledge_search import ensure_search_index, search_knowledge
+
+
+def setup_in_memory_db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def test_search_ranks_and_snippets() -> None:
+    engine = setup_in_memory_db()
+    with Session(engine) as session:
+        session.add_all([
+            KnowledgeItem(content="Marketing strategy for a small business", source_file="a.pdf"),
+            KnowledgeItem(content="Finance basics: revenue and profit", source_file="b.pdf"),
+            KnowledgeItem(content="استراتيجية التسويق للشركات الصغيرة", source_file="c.pdf"),
+        ])
+        session.commit()
+
+        hits = search_knowledge(session, "marketing strategy")
+        assert [h.source_file for h in hits] == ["a.pdf"]
+        assert "[marketing]" in hits[0].snippet.lower()
+
+        arabic = search_knowledge(session, "التسويق")
+        assert [h.source_file for h in arabic] == ["c.pdf"]
+
+
+def test_index_follows_updates_and_deletes() -> None:
+    engine = setup_in_memory_db()
+    ensure_search_index(engine)
+    with Session(engine) as session:
+        item = KnowledgeItem(content="supply and demand", source_file="x.pdf")
+        session.add(item)
+        session.commit()
+        assert search_knowledge(session, "demand")
+
+        item.content = "pricing models"
+        session.commit()
+        assert not search_knowledge(session, "demand")
+        assert search_knowledge(session, "pricing")
+
+        session.delete(item)
+        session.commit()
+        assert not search_knowledge(session, "pricing")
+
+
+def test_hits_carry_page_provenance() -> None:
+    engine = setup_in_memory_db()
+    with Session(engine) as session:
+        session.add(KnowledgeItem(content="break-even analysis", source_file="unit3.pdf", folder="L3", page=12, chunk_index=0))
+        session.commit()
+
+        hit = search_knowledge(session, "break-even")[0]
+        assert hit.page == 12
+        assert hit.location == "unit3.pdf (p. 12)"
+
+
+def test_older_relevant_page_outranks_newer_matches(monkeypatch) -> None:
+    engine = setup_in_memory_db()
+    with Session(engine) as session:
+        session.add(KnowledgeItem(content="marketing marketing marketing mix", source_file="old.pdf"))
+        session.add_all([
+            KnowledgeItem(content=f"Chapter {i} mentions marketing once among many other words about business", source_file=f"new{i}.pdf")
+            for i in range(50)
+        ])
+        session.commit()
+
+        assert search_knowledge(session, "marketing", limit=3)[0].source_file == "old.pdf"
+        # نافذة محدودة (KNOWLEDGE_RANK_WINDOW) تتجاهل الصفحات الأقدم منها
+        monkeypatch.setattr("app.services.knowledge_search.RANK_WINDOW", 10)
+        assert "old.pdf" not in [h.source_file for h in search_knowledge(session, "marketing", limit=3)]
+
+
+def test_arabic_spelling_variants_match_through_fts() -> None:
+    engine = setup_in_memory_db()
+    with Session(engine) as session:
+        session.add_all([
+            KnowledgeItem(content="إدارة المدرسة الابتدائية", source_file="a.pdf"),
+            KnowledgeItem(content="مستوى رضا العملاء", source_file="b.pdf"),
+        ])
+        session.commit()
+
+        assert [h.source_file for h in search_knowledge(session, "اداره المدرسه")] == ["a.pdf"]
+        assert [h.source_file for h in search_knowledge(session, "مستوي")] == ["b.pdf"]
+        assert [h.source_file for h in search_knowledge(session, "إدارَة")] == ["a.pdf"]
+
+
+def test_raw_fts_index_is_rebuilt_normalized(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'knowledge.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # فهرس من نسخة سابقة: triggers تنسخ النص الخام
+        conn.exec_driver_sql(
+            "CREATE VIRTUAL TABLE knowledgeitem_fts USING fts5(content, source_file, content='knowledgeitem', content_rowid='id')"
+        )
+        conn.exec_driver_sql(
+            """CREATE TRIGGER knowledgeitem_fts_ai AFTER INSERT ON knowledgeitem BEGIN
+                INSERT INTO knowledgeitem_fts(rowid, content, source_file) VALUES (new.id, new.content, new.source_file);
+            END"""
+        )
+        conn.exec_driver_sql("INSERT INTO knowledgeitem (content, source_file, created_at) VALUES ('إدارة المدرسة', 'a.pdf', '2026-01-01')")
+
+    with Session(engine) as session:
+        assert [h.source_file for h in search_knowledge(session, "اداره")] == ["a.pdf"]
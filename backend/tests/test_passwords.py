@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import anyio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.database import Base, create_async_db_engine
+from app.deps import get_async_db
+from app.main import app
+from app.services.passwords import PasswordHasher, PasswordHasherBusy, hash_password, verify_password
+
+
+def make_client(monkeypatch, hasher):
+    engine = create_async_db_engine("sqlite://")
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.tables["users"].create)
+
+    anyio.run(create_tables)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr("app.api.auth.password_hasher", hasher)
+
+    async def db():
+        async with SessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = db
+    return TestClient(app)
+
+
+def teardown_function() -> None:
+    app.dependency_overrides.clear()
+
+
+def test_hash_roundtrip_and_long_passwords() -> None:
+    hashed = hash_password("كلمة-سر", rounds=4)
+    assert hashed.startswith("$2b$04$")
+    assert verify_password("كلمة-سر", hashed)
+    assert not verify_password("wrong", hashed)
+    assert not verify_password("x", "not-a-bcrypt-hash")
+    # أطول من 72 بايت: يُقص كما كانت تفعل passlib بدل رفع خطأ
+    long = "a" * 100
+    assert verify_password(long, hash_password(long, rounds=4))
+
+
+def test_register_and_login_use_the_hasher(monkeypatch) -> None:
+    client = make_client(monkeypatch, PasswordHasher(workers=2, rounds=4))
+
+    r = client.post("/api/v1/auth/register", json={"email": "s@example.com", "password": "secret"})
+    assert r.status_code == 200, r.text
+    assert client.post("/api/v1/auth/register", json={"email": "s@example.com", "password": "x"}).status_code == 400
+
+    r = client.post("/api/v1/auth/login", data={"username": "s@example.com", "password": "secret"})
+    assert r.status_code == 200 and r.json()["token_type"] == "bearer"
+    assert client.post("/api/v1/auth/login", data={"username": "s@example.com", "password": "nope"}).status_code == 400
+    assert client.post("/api/v1/auth/login", data={"username": "x@example.com", "password": "secret"}).status_code == 400
+
+
+def test_pending_limit_rejects_instead_of_queueing(monkeypatch) -> None:
+    release = threading.Event()
+    hasher = PasswordHasher(workers=1, max_pending=1, rounds=4, executor=ThreadPoolExecutor(1))
+    hasher.executor.submit(release.wait)  # العامل الوحيد مشغول
+
+    async def main():
+        first = asyncio.ensure_future(hasher.hash("a"))
+        await asyncio.sleep(0)
+        assert hasher.pending == 1
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.hash("b")
+        # إلغاء الطلب المنتظر (انقطاع العميل) يحرر مكانه دون أن يُنفَّذ
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert hasher.pending == 0
+        release.set()
+        assert verify_password("c", await hasher.hash("c"))
+
+    anyio.run(main)
+
+    busy = PasswordHasher(workers=1, max_pending=0)
+    client = make_client(monkeypatch, busy)
+    r = client.post("/api/v1/auth/register", json={"email": "s@example.com", "password": "secret"})
+    assert r.status_code == 503 and r.headers["retry-after"] == "2"
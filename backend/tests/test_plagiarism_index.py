@@ -0,0 +1,123 @@
+import random
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.deps import get_current_user, get_db
+from app.main import app
+from app.models import Submission, SubmissionFingerprint, User
+from app.services.plagiarism import (
+    PlagiarismIndex,
+    check_submission,
+    ensure_plagiarism_tables,
+    fingerprint,
+    lesson_report,
+    minhash,
+    shingle_hashes,
+    similarity,
+)
+
+ESSAY = (
+    "التسويق هو عملية تحديد احتياجات العملاء وتلبيتها بطريقة مربحة للشركة "
+    "ويشمل المزيج التسويقي المنتج والسعر والمكان والترويج وتحليل المنافسين في السوق"
+)
+
+
+def essay(rnd, words=60):
+    vocab = [f"w{i}" for i in range(3000)]
+    return " ".join(rnd.choices(vocab, k=words))
+
+
+def test_minhash_estimates_jaccard() -> None:
+    copy = ESSAY.replace("الشركة", "الشركه").replace("التسويق", "التَّسويق")
+    assert similarity(minhash(shingle_hashes(ESSAY)), minhash(shingle_hashes(copy))) == 1.0
+
+    edited = ESSAY + " وأخيراً يجب قياس رضا العملاء بشكل دوري"
+    score = similarity(minhash(shingle_hashes(ESSAY)), minhash(shingle_hashes(edited)))
+    assert 0.5 < score < 1.0
+
+
+def test_lsh_only_compares_candidates() -> None:
+    rnd = random.Random(0)
+    index = PlagiarismIndex()
+    for i in range(300):
+        index.add(i, minhash(shingle_hashes(essay(rnd))))
+    index.add(999, minhash(shingle_hashes(ESSAY)))
+
+    assert len(index.candidate_pairs()) < 300 * 299 // 2 // 100
+    assert index.query(minhash(shingle_hashes(ESSAY + " شكراً")))[0][0] == 999
+
+
+def test_check_submission_and_lesson_report(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    ensure_plagiarism_tables(engine)
+    rnd = random.Random(1)
+    with Session(engine) as session:
+        texts = [ESSAY, essay(rnd), ESSAY + " والخلاصة", essay(rnd), ""]
+        subs = [Submission(user_id=i + 1, lesson_id=7, content_text=t) for i, t in enumerate(texts)]
+        session.add_all(subs)
+        session.commit()
+
+        # التسليمات التي لم تُفحص بعد تدخل المقارنة أيضاً
+        assert [m[0] for m in check_submission(session, subs[0])] == [subs[2].id]
+        matches = check_submission(session, subs[2])
+        assert [m[0] for m in matches] == [subs[0].id]
+
+        report = lesson_report(session, 7)
+        assert [(p["submission_a"], p["submission_b"]) for p in report["pairs"]] == [(subs[0].id, subs[2].id)]
+        assert report["clusters"] == [[subs[0].id, subs[2].id]]
+        assert report["submissions"] == 5
+        assert session.query(SubmissionFingerprint).count() == 5
+
+
+def test_endpoints_require_owner_or_teacher(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False})
+    ensure_plagiarism_tables(engine)
+    with Session(engine) as session:
+        session.add_all([Submission(id=1, user_id=1, lesson_id=7, content_text=ESSAY), Submission(id=2, user_id=2, lesson_id=7, content_text=ESSAY)])
+        session.commit()
+
+    def db():
+        with Session(engine) as session:
+            yield session
+
+    def login(user_id, superuser=False):
+        app.dependency_overrides[get_current_user] = lambda: User(id=user_id, email=f"{user_id}@example.com", is_superuser=superuser)
+
+    app.dependency_overrides[get_db] = db
+    client = TestClient(app)
+    try:
+        assert client.get("/api/v1/plagiarism/lessons/7/report").status_code == 401
+        login(1)
+        assert client.post("/api/v1/plagiarism/submissions/1/check").status_code == 200
+        assert client.post("/api/v1/plagiarism/submissions/2/check").status_code == 404
+        assert client.get("/api/v1/plagiarism/lessons/7/report").status_code == 403
+        login(99, superuser=True)
+        assert client.post("/api/v1/plagiarism/submissions/2/check").json()["matches"][0]["submission_id"] == 1
+        assert client.get("/api/v1/plagiarism/lessons/7/report").json()["submissions"] == 2
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_unchecked_and_refingerprinted_submissions_are_compared(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    ensure_plagiarism_tables(engine)
+    rnd = random.Random(2)
+    with Session(engine) as session:
+        # تسليمان سابقان لم يُفحص أي منهما
+        prior = [Submission(user_id=1, lesson_id=7, content_text=ESSAY), Submission(user_id=2, lesson_id=7, content_text=ESSAY)]
+        other = Submission(user_id=3, lesson_id=7, content_text=essay(rnd))
+        session.add_all([*prior, other])
+        session.commit()
+
+        copy = Submission(user_id=4, lesson_id=7, content_text=ESSAY)
+        session.add(copy)
+        session.commit()
+        assert sorted(m[0] for m in check_submission(session, copy, same_lesson=True)) == sorted(s.id for s in prior)
+
+        # عملية أخرى تعيد حساب توقيع تسليم أقدم بعد تعديل نصه
+        other.content_text = ESSAY + " والخلاصة"
+        fingerprint(session, other)
+        session.commit()
+        assert other.id in [m[0] for m in check_submission(session, copy)]
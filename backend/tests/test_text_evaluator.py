@@ -0,0 +1,32 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.text_evaluator import evaluate_bulk, evaluate_text
+
+MODEL = "التسويق هو تحديد احتياجات العملاء وتلبيتها"
+ANSWERS = [MODEL, "التسويق هو تحديد احتياجات العميل", "", "profit = revenue - costs", "الإجابة الصحيحة"]
+
+
+def test_bulk_matches_single_evaluation() -> None:
+    results = list(evaluate_bulk(MODEL, ANSWERS, chunk_size=2))
+    assert [r["index"] for r in results] == list(range(len(ANSWERS)))
+    for answer, result in zip(ANSWERS, results):
+        single = evaluate_text(answer, MODEL)
+        assert result["similarity"] == pytest.approx(single["similarity"])
+        assert result["levenshtein_ratio"] == pytest.approx(single["levenshtein_ratio"])
+    assert results[0]["similarity"] == pytest.approx(1.0)
+
+
+def test_bulk_endpoint_streams_ndjson() -> None:
+    client = TestClient(app)
+    r = client.post("/api/v1/btec/evaluate/text/bulk", json={"model_answer": MODEL, "student_answers": ANSWERS})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert len(lines) == len(ANSWERS)
+
+    single = client.post("/api/v1/btec/evaluate/text", data={"student_answer": MODEL, "model_answer": MODEL})
+    assert single.json()["data"]["similarity"] == pytest.approx(1.0)
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import audio
+from app.main import app
+from app.services import audio_evaluator
+from app.services.audio_evaluator import (
+    SAMPLE_RATE,
+    read_pcm,
+    speech_windows,
+    transcribe_stream,
+)
+from app.services.transcription import QueueFull, TranscriptionService, _run
+
+
+def make_service(tmp_path, runner, **kwargs):
+    return TranscriptionService(executor=ThreadPoolExecutor(2), runner=runner, cache_dir=str(tmp_path / "cache"), **kwargs)
+
+
+def write_audio(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path), hashlib.sha256(data).hexdigest()
+
+
+def speech(seconds):
+    t = np.arange(int(seconds * SAMPLE_RATE))
+    return (0.3 * np.sin(t * 0.2)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def fake_whisper():
+    calls = []
+
+    def transcribe(audio, prompt=None, **_options):
+        calls.append((len(audio), prompt))
+        return f" window {len(calls) - 1}"
+
+    transcribe.calls = calls
+    return transcribe
+
+
+def test_speech_windows_split_on_silence() -> None:
+    audio = np.concatenate([silence(2), speech(6), silence(1), speech(4), silence(10), speech(70)])
+    chunks = [audio[i:i + SAMPLE_RATE] for i in range(0, len(audio), SAMPLE_RATE)]
+    windows = list(speech_windows(chunks, max_seconds=30, min_seconds=5))
+
+    starts = [round(start) for start, _ in windows]
+    assert starts[:3] == [2, 9, 23]
+    # لا نافذة أطول من الحد، ولا نافذة صامتة بالكامل
+    assert all(len(w) <= 30 * SAMPLE_RATE for _, w in windows)
+    assert all(np.abs(w).max() > 0.1 for _, w in windows)
+    assert sum(len(w) for _, w in windows) < len(audio) - 10 * SAMPLE_RATE
+
+
+def test_transcribe_stream_reads_wav_incrementally(tmp_path, monkeypatch) -> None:
+    path = tmp_path / "oral.wav"
+    audio = np.concatenate([speech(6), silence(1), speech(6)])
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((audio * 32767).astype("<i2").tobytes())
+    assert max(len(c) for c in read_pcm(str(path))) == SAMPLE_RATE
+
+    whisper = fake_whisper()
+    monkeypatch.setattr(audio_evaluator, "transcribe_audio", whisper)
+    segments = list(transcribe_stream(str(path)))
+    assert [s["text"] for s in segments] == ["window 0", "window 1"]
+    assert segments[0]["start"] == 0 and 6 < segments[1]["start"] < 7
+    # النافذة الثانية تأخذ نص الأولى كسياق
+    assert whisper.calls[1][1] == "window 0"
+
+
+def test_jobs_are_cached_by_content_hash(tmp_path) -> None:
+    calls = []
+
+    def runner(path, _language, _segments_path):
+        calls.append(path)
+        return "hello world"
+
+    service = make_service(tmp_path, runner)
+    path, sha = write_audio(tmp_path, "a.wav", b"RIFF-one")
+    job = service.submit(path, sha)
+    job.future.result()
+    assert service.get(sha).as_dict() == {"id": sha, "status": "done", "text": "hello world", "error": None}
+
+    again, _ = write_audio(tmp_path, "b.wav", b"RIFF-one")
+    assert service.submit(again, sha).status == "done"
+    # خدمة جديدة (عملية ويب أخرى) تقرأ النتيجة من القرص
+    assert make_service(tmp_path, runner).get(sha).text == "hello world"
+    assert len(calls) == 1
+
+
+def test_queue_is_bounded(tmp_path) -> None:
+    release = threading.Event()
+    service = make_service(tmp_path, lambda path, language, segments_path: release.wait(5) and "x", max_pending=1)
+    first = service.submit(*write_audio(tmp_path, "1.wav", b"1"))
+    with pytest.raises(QueueFull):
+        service.submit(*write_audio(tmp_path, "2.wav", b"2"))
+    release.set()
+    first.future.result()
+    # الـ callback الذي يحرر المكان يعمل بعد أن تُعاد النتيجة
+    deadline = time.monotonic() + 5
+    while service.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert service.pending == 0
+
+
+def test_failed_job_reports_error(tmp_path) -> None:
+    def runner(_path, _language, _segments_path):
+        raise RuntimeError("Whisper is not installed")
+
+    service = make_service(tmp_path, runner)
+    path, sha = write_audio(tmp_path, "c.wav", b"c")
+    service.submit(path, sha).future.exception()
+    job = service.get(sha)
+    assert job.status == "failed" and "Whisper" in job.error
+
+
+def test_upload_and_poll(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(audio_evaluator, "read_pcm", lambda path: iter([speech(6), silence(1), speech(6)]))
+    monkeypatch.setattr(audio_evaluator, "transcribe_audio", fake_whisper())
+    service = make_service(tmp_path, _run)
+    monkeypatch.setattr(audio, "transcription_service", service)
+    monkeypatch.setattr(audio, "AUDIO_TMP_DIR", str(tmp_path / "uploads"))
+    client = TestClient(app)
+
+    r = client.post("/api/v1/audio/transcriptions", files={"file": ("talk.wav", b"RIFF-talk", "audio/wav")})
+    assert r.status_code in (200, 202)
+    job_id = r.json()["id"]
+    assert job_id == hashlib.sha256(b"RIFF-talk").hexdigest()
+
+    polled = client.get(f"/api/v1/audio/transcriptions/{job_id}", params={"wait": 5}).json()
+    assert polled["text"] == "window 0 window 1"
+    lines = [json.loads(line) for line in client.get(f"/api/v1/audio/transcriptions/{job_id}/stream").text.splitlines()]
+    assert [line["type"] for line in lines] == ["status", "segment", "segment", "status"]
+    assert lines[1]["text"] == "window 0" and lines[-1]["status"] == "done"
+    assert client.get("/api/v1/audio/transcriptions/unknown").status_code == 404
+
+
+def test_language_hint_is_part_of_the_cache_key(tmp_path) -> None:
+    def runner(_path, language, _segments_path):
+        return f"text in {language}"
+
+    service = make_service(tmp_path, runner)
+    path, sha = write_audio(tmp_path, "a.wav", b"RIFF-lang")
+    service.submit(path, sha).future.result()
+    arabic = service.submit(*write_audio(tmp_path, "b.wav", b"RIFF-lang"), language="ar")
+    arabic.future.result()
+
+    assert arabic.id != sha and service.get(arabic.id).text == "text in ar"
+    assert service.get(sha).text == "text in None"
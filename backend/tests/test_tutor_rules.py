@@ -0,0 +1,30 @@
+from app.services.tutor_rules import AhoCorasick, TutorRuleEngine, rule_engine
+
+
+def test_aho_corasick_finds_overlapping_patterns() -> None:
+    matcher = AhoCorasick()
+    for word in ("he", "she", "his", "hers"):
+        matcher.add(word, word)
+    found = sorted((start, payload) for start, _, payload in matcher.iter("ushers"))
+    assert found == [(1, "she"), (2, "he"), (2, "hers")]
+
+
+def test_reply_matches_arabic_and_english() -> None:
+    assert "Distinction" in rule_engine.reply("كيف أحصل على امتياز؟")
+    assert "Merit" in rule_engine.reply("What do I need for MERIT?")
+    assert rule_engine.reply("hello") == rule_engine.default
+
+
+def test_english_keywords_need_whole_words() -> None:
+    assert rule_engine.reply("read the passage") == rule_engine.default
+
+
+def test_earlier_rule_wins() -> None:
+    engine = TutorRuleEngine(
+        [
+            {"id": "a", "keywords": ["merit"], "response": "A"},
+            {"id": "b", "keywords": ["pass"], "response": "B"},
+        ],
+        default="none",
+    )
+    assert engine.reply("pass or merit") == "A"
@@ -0,0 +1,412 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import anyio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import ClientDisconnect, Request
+
+from app.database import create_db_engine
+from app.deps import get_current_user, get_db
+from app.main import app
+from app.models import FileBlob, KnowledgeItem, KnowledgeUploadJob, UploadSession, User, UserFile
+from app.api import files as files_api
+from app.services import resumable_uploads, uploads
+from app.services.blob_store import BlobStore, dedup_stats
+from app.services.downloads import BlobResponse
+from app.services.knowledge_search import search_knowledge
+from app.services.knowledge_uploads import KnowledgeIndexer
+
+
+def multipart_body(boundary, data, chunk=16 * 1024):
+    yield f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="b.bin"\r\n\r\n'.encode()
+    for i in range(0, len(data), chunk):
+        yield data[i:i + chunk]
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
+def make_client(tmp_path, monkeypatch, user_id=1, superuser=False):
+    # ملف لا StaticPool: الفهرسة تعمل في thread ولكل thread اتصاله ومعاملته
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    SessionLocal = sessionmaker(bind=engine)
+    monkeypatch.setattr("app.api.files.UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr("app.api.files.knowledge_indexer", KnowledgeIndexer(SessionLocal, executor=ThreadPoolExecutor(1)))
+
+    def db():
+        session = SessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = db
+    app.dependency_overrides[get_current_user] = lambda: User(id=user_id, email="s@example.com", is_superuser=superuser)
+    return TestClient(app), SessionLocal
+
+
+def teardown_function() -> None:
+    app.dependency_overrides.clear()
+
+
+def test_upload_streams_to_disk_and_records_metadata(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 64 * 1024)
+    client, SessionLocal = make_client(tmp_path, monkeypatch)
+    data = os.urandom(1024 * 1024 + 17)
+
+    r = client.post("/api/v1/files/upload", files={"file": ("مشروع.mp4", data, "video/mp4")}, data={"note": "x"})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["size"] == len(data) and body["sha256"] == hashlib.sha256(data).hexdigest()
+    assert body["original_filename"] == "مشروع.mp4" and not body["deduplicated"]
+    assert body["filename"] == os.path.basename(body["path"])
+    with open(body["path"], "rb") as f:
+        assert f.read() == data
+
+    with SessionLocal() as session:
+        row = session.get(UserFile, body["id"])
+        assert (row.owner_id, row.size, row.content_type) == ("1", len(data), "video/mp4")
+    assert os.listdir(tmp_path / "uploads" / "tmp") == []
+
+
+def test_quota_is_enforced_mid_stream(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 16 * 1024)
+    monkeypatch.setattr(uploads, "UPLOAD_USER_QUOTA_BYTES", 150 * 1024)
+    client, SessionLocal = make_client(tmp_path, monkeypatch)
+
+    assert client.post("/api/v1/files/upload", files={"file": ("a.bin", b"a" * 100 * 1024)}).status_code == 200
+
+    boundary = "xyz"
+    r = client.post(
+        "/api/v1/files/upload",
+        content=multipart_body(boundary, b"b" * 100 * 1024),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+    assert r.status_code == 413
+    assert os.listdir(tmp_path / "uploads" / "tmp") == []
+    with SessionLocal() as session:
+        assert session.query(UserFile).count() == 1
+
+
+def test_receive_stops_reading_at_the_limit(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 16 * 1024)
+    chunks = multipart_body("xyz", b"b" * 1024 * 1024)
+    received = []
+
+    async def receive():
+        # بلا Content-Length: الحد يُفحص أثناء وصول الدفعات
+        received.append(1)
+        return {"type": "http.request", "body": next(chunks, b""), "more_body": True}
+
+    scope = {"type": "http", "method": "POST", "headers": [(b"content-type", b"multipart/form-data; boundary=xyz")]}
+    with pytest.raises(uploads.UploadTooLarge):
+        anyio.run(uploads.receive_upload, Request(scope, receive), str(tmp_path), 64 * 1024)
+    assert len(received) < 10
+    assert os.listdir(tmp_path) == []
+
+
+def test_declared_size_over_limit_is_rejected_before_reading(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_FILE_BYTES", 1024)
+    client, _ = make_client(tmp_path, monkeypatch, superuser=True)
+    r = client.post("/api/v1/files/upload", files={"file": ("big.bin", b"x" * 200 * 1024)})
+    assert r.status_code == 413
+    assert client.post("/api/v1/files/upload", data={"note": "no file"}).status_code == 400
+
+
+def test_duplicate_uploads_share_one_blob(tmp_path, monkeypatch) -> None:
+    client, SessionLocal = make_client(tmp_path, monkeypatch, superuser=True)
+    brief = b"%PDF assignment brief" * 1000
+
+    first = client.post("/api/v1/files/upload", files={"file": ("brief.pdf", brief)}).json()
+    app.dependency_overrides[get_current_user] = lambda: User(id=2, email="b@example.com", is_superuser=True)
+    second = client.post("/api/v1/files/upload", files={"file": ("نسخة.pdf", brief)}).json()
+    client.post("/api/v1/files/upload", files={"file": ("other.pdf", b"other")})
+
+    assert second["deduplicated"] and second["path"] == first["path"] and second["id"] != first["id"]
+    stats = client.get("/api/v1/files/stats").json()
+    assert (stats["files"], stats["blobs"], stats["dedup_ratio"]) == (3, 2, round((2 * len(brief) + 5) / (len(brief) + 5), 3))
+
+    store = BlobStore(str(tmp_path / "uploads"))
+    assert client.delete(f"/api/v1/files/{second['id']}").status_code == 204
+    with SessionLocal() as session:
+        assert session.get(FileBlob, first["sha256"]).refcount == 1
+        assert store.collect_garbage(session, grace_seconds=0)["blobs"] == 0
+    assert os.path.exists(first["path"])
+
+    assert client.delete(f"/api/v1/files/{first['id']}").status_code == 204
+    assert client.delete(f"/api/v1/files/{first['id']}").status_code == 404
+    orphan = tmp_path / "uploads" / "blobs" / "ff" / "ff" / ("ff" * 32)
+    orphan.parent.mkdir(parents=True)
+    orphan.write_bytes(b"crashed before commit")
+    with SessionLocal() as session:
+        assert store.collect_garbage(session, grace_seconds=3600)["blobs"] == 0
+        removed = store.collect_garbage(session, grace_seconds=-1)
+        assert (removed["blobs"], removed["orphans"]) == (1, 1)
+        assert dedup_stats(session)["blobs"] == 1
+    assert not os.path.exists(first["path"]) and not orphan.exists()
+
+
+def test_resumable_upload_survives_a_dropped_connection(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 1024)
+    client, SessionLocal = make_client(tmp_path, monkeypatch)
+    data = os.urandom(10_000)
+
+    r = client.post("/api/v1/files/uploads", json={"filename": "video.mp4", "length": len(data), "content_type": "video/mp4"})
+    assert r.status_code == 201
+    url = r.headers["Location"]
+    assert url == f"/api/v1/files/uploads/{r.json()['id']}"
+
+    messages = iter([
+        {"type": "http.request", "body": data[:3000], "more_body": True},
+        {"type": "http.request", "body": data[3000:4500], "more_body": True},
+        {"type": "http.disconnect"},
+    ])
+
+    async def receive():
+        return next(messages)
+
+    async def send(message):
+        pass
+
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "PUT", "scheme": "http", "path": url, "raw_path": url.encode(),
+        "root_path": "", "query_string": b"", "headers": [(b"upload-offset", b"0"), (b"host", b"testserver")],
+        "client": ("test", 1), "server": ("testserver", 80),
+    }
+    with pytest.raises(ClientDisconnect):
+        anyio.run(app, scope, receive, send)
+    offset = int(client.head(url).headers["Upload-Offset"])
+    assert offset == 4500
+
+    assert client.put(url, content=data[:10], headers={"Upload-Offset": "0"}).status_code == 409
+    assert client.post(f"{url}/finalize").status_code == 400
+    # عملية أخرى لا تملك البصمة في الذاكرة: تُحسب مرة واحدة من الملف الجزئي
+    resumable_uploads._hashers.clear()
+    r = client.patch(url, content=data[offset:], headers={"Upload-Offset": str(offset)})
+    assert r.status_code == 204 and r.headers["Upload-Offset"] == str(len(data))
+    assert client.put(url, content=b"x", headers={"Upload-Offset": str(len(data))}).status_code == 400
+
+    body = client.post(f"{url}/finalize").json()
+    assert body["sha256"] == hashlib.sha256(data).hexdigest() and body["size"] == len(data)
+    with open(body["path"], "rb") as f:
+        assert f.read() == data
+    assert client.head(url).status_code == 404
+    assert os.listdir(tmp_path / "uploads" / "tmp") == []
+
+
+def test_abandoned_sessions_expire(tmp_path, monkeypatch) -> None:
+    client, SessionLocal = make_client(tmp_path, monkeypatch)
+    monkeypatch.setattr(resumable_uploads, "UPLOAD_SESSION_TTL", -1)
+    url = client.post("/api/v1/files/uploads", json={"filename": "a.bin", "length": 10}).headers["Location"]
+    assert client.head(url).status_code == 404
+
+    monkeypatch.setattr(resumable_uploads, "UPLOAD_SESSION_TTL", 3600)
+    client.post("/api/v1/files/uploads", json={"filename": "b.bin", "length": 10})
+    with SessionLocal() as session:
+        assert session.query(UploadSession).count() == 1
+    assert len(os.listdir(tmp_path / "uploads" / "tmp")) == 1
+    assert client.post("/api/v1/files/uploads", json={"filename": "c.bin", "length": 10 ** 15}).status_code == 413
+
+
+def test_open_sessions_count_against_the_quota(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(uploads, "UPLOAD_USER_QUOTA_BYTES", 100)
+    client, _ = make_client(tmp_path, monkeypatch)
+    first = client.post("/api/v1/files/uploads", json={"filename": "a.bin", "length": 100}).headers["Location"]
+    assert client.post("/api/v1/files/uploads", json={"filename": "b.bin", "length": 100}).status_code == 413
+    assert client.post("/api/v1/files/upload", files={"file": ("c.bin", b"x", "application/octet-stream")}).status_code == 413
+
+    client.put(first, content=b"a" * 100, headers={"Upload-Offset": "0"})
+    # الحصة نقصت بعد إنشاء الجلسة: الإنهاء يفحصها من جديد
+    monkeypatch.setattr(uploads, "UPLOAD_USER_QUOTA_BYTES", 50)
+    assert client.post(f"{first}/finalize").status_code == 413
+    monkeypatch.setattr(uploads, "UPLOAD_USER_QUOTA_BYTES", 100)
+    assert client.post(f"{first}/finalize").status_code == 200
+
+
+def test_chunk_is_rejected_while_another_worker_holds_the_session(tmp_path, monkeypatch) -> None:
+    client, SessionLocal = make_client(tmp_path, monkeypatch)
+    r = client.post("/api/v1/files/uploads", json={"filename": "a.bin", "length": 10})
+    url, session_id = r.headers["Location"], r.json()["id"]
+    with SessionLocal() as session:
+        # عملية أخرى حجزت الموضع 0 وما زالت تكتب
+        assert resumable_uploads._claim(session, session_id, 0) is not None
+        assert resumable_uploads._claim(session, session_id, 0) is None
+
+    r = client.patch(url, content=b"0123456789", headers={"Upload-Offset": "0"})
+    assert r.status_code == 409 and r.headers["Upload-Offset"] == "0"
+    assert os.path.getsize(tmp_path / "uploads" / "tmp" / f"{session_id}.upload") == 0
+
+    with SessionLocal() as session:
+        session.query(UploadSession).update({UploadSession.claimed_until: UploadSession.created_at})
+        session.commit()
+    # حجز منتهٍ (عملية توقفت) لا يمنع الاستئناف
+    assert client.patch(url, content=b"0123456789", headers={"Upload-Offset": "0"}).status_code == 204
+
+
+def test_failed_finalize_can_be_retried(tmp_path, monkeypatch) -> None:
+    client, _ = make_client(tmp_path, monkeypatch)
+    url = client.post("/api/v1/files/uploads", json={"filename": "a.bin", "length": 4}).headers["Location"]
+    client.put(url, content=b"abcd", headers={"Upload-Offset": "0"})
+
+    real_store_file = resumable_uploads.store_file
+
+    def failing_store_file(db, *args):
+        # مثل store_file عند فشل الـ commit: rollback وحذف الملف المؤقت (args[2])
+        db.rollback()
+        uploads._discard(args[2])
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(resumable_uploads, "store_file", failing_store_file)
+    with pytest.raises(RuntimeError):
+        client.post(f"{url}/finalize")
+    monkeypatch.setattr(resumable_uploads, "store_file", real_store_file)
+
+    assert client.head(url).headers["Upload-Offset"] == "4"
+    body = client.post(f"{url}/finalize").json()
+    with open(body["path"], "rb") as f:
+        assert f.read() == b"abcd"
+
+
+def test_download_supports_ranges_and_conditional_requests(tmp_path, monkeypatch) -> None:
+    client, _ = make_client(tmp_path, monkeypatch)
+    data = os.urandom(3 * 1024 * 1024 + 5)
+    body = client.post("/api/v1/files/upload", files={"file": ("درس 1.mp4", data, "video/mp4")}).json()
+    url = f"/api/v1/files/{body['id']}"
+
+    r = client.get(url)
+    assert r.status_code == 200 and r.content == data
+    assert r.headers["etag"] == f'"{body["sha256"]}"' and r.headers["content-type"] == "video/mp4"
+    assert r.headers["accept-ranges"] == "bytes" and "UTF-8''" in r.headers["content-disposition"]
+
+    r = client.get(url, headers={"Range": "bytes=1048576-1048585"})
+    assert r.status_code == 206 and r.content == data[1048576:1048586]
+    assert r.headers["content-range"] == f"bytes 1048576-1048585/{len(data)}"
+    assert client.get(url, headers={"Range": "bytes=-5"}).content == data[-5:]
+    assert client.get(url, headers={"Range": f"bytes={len(data)}-"}).status_code == 416
+    assert client.get(url, headers={"Range": "bytes=0-1,5-6"}).status_code == 200
+
+    etag = r.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(url, headers={"If-Modified-Since": r.headers["last-modified"]}).status_code == 304
+    assert client.get(url, headers={"If-Match": '"other"'}).status_code == 412
+    assert client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'}).status_code == 200
+    assert client.get(url, headers={"Range": "bytes=0-9", "If-Range": etag}).status_code == 206
+
+    head = client.head(url)
+    assert head.status_code == 200 and head.headers["content-length"] == str(len(data)) and head.content == b""
+    assert client.get("/api/v1/files/missing").status_code == 404
+
+    # طالب آخر لا يصل إلى الملف، والمعلم يصل
+    app.dependency_overrides[get_current_user] = lambda: User(id=2, email="o@example.com", is_superuser=False)
+    assert client.get(url).status_code == 404 and client.head(url).status_code == 404
+    app.dependency_overrides[get_current_user] = lambda: User(id=3, email="t@example.com", is_superuser=True)
+    assert client.get(url, headers={"Range": "bytes=0-9"}).content == data[:10]
+
+
+def test_blob_response_uses_zero_copy_extensions(tmp_path) -> None:
+    path = tmp_path / "blob"
+    path.write_bytes(b"0123456789")
+
+    def run(headers, extensions):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "headers": headers, "extensions": extensions}
+        response = BlobResponse(str(path), size=10, mtime=0, etag="abc")
+        anyio.run(response, scope, None, send)
+        return sent
+
+    sent = run([(b"range", b"bytes=2-5")], {"http.response.zerocopysend": {}})
+    assert sent[0]["status"] == 206 and (sent[1]["offset"], sent[1]["count"]) == (2, 4)
+    sent = run([], {"http.response.pathsend": {}})
+    assert sent[1] == {"type": "http.response.pathsend", "path": str(path)}
+
+
+def make_docx(path, text):
+    docx = pytest.importorskip("docx")
+    doc = docx.Document()
+    doc.add_heading("Unit 3 Marketing", level=1)
+    doc.add_paragraph(text)
+    doc.save(path)
+
+
+def test_teacher_uploads_are_indexed_in_background(tmp_path, monkeypatch) -> None:
+    client, SessionLocal = make_client(tmp_path, monkeypatch, superuser=True)
+    indexer = files_api.knowledge_indexer
+    make_docx(tmp_path / "unit3.docx", "The marketing mix covers product, price, place and promotion.")
+    data = (tmp_path / "unit3.docx").read_bytes()
+
+    body = client.post("/api/v1/files/upload", files={"file": ("Unit 3.docx", data)}).json()
+    assert body["indexing"] in ("queued", "running", "done")
+    indexer.wait()
+    status = client.get(f"/api/v1/files/{body['id']}/indexing").json()
+    assert status["status"] == "done" and status["items"] >= 1
+    # طالب لا يرى حالة فهرسة ملف ليس له
+    app.dependency_overrides[get_current_user] = lambda: User(id=2, email="o@example.com", is_superuser=False)
+    assert client.get(f"/api/v1/files/{body['id']}/indexing").status_code == 404
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, email="s@example.com", is_superuser=True)
+
+    with SessionLocal() as session:
+        rows = session.query(KnowledgeItem).all()
+        assert {r.source_file for r in rows} == {"Unit 3.docx"} and rows[0].folder == "uploads"
+        hits = search_knowledge(session, "promotion")
+        assert hits and hits[0].source_file == "Unit 3.docx"
+
+    # نفس المحتوى مرة أخرى لا يُستخرج مجدداً، والملف التالف يفشل وحده
+    again = client.post("/api/v1/files/upload", files={"file": ("copy.docx", data)}).json()
+    broken = client.post("/api/v1/files/upload", files={"file": ("broken.pptx", b"not a deck")}).json()
+    other = client.post("/api/v1/files/upload", files={"file": ("notes.txt", b"plain")}).json()
+    indexer.wait()
+    assert client.get(f"/api/v1/files/{again['id']}/indexing").json()["status"] == "done"
+    assert client.get(f"/api/v1/files/{broken['id']}/indexing").json()["status"] == "failed"
+    assert other["indexing"] is None
+    assert client.get("/api/v1/files/indexing").json() == {"queued": 0, "running": 0, "done": 2, "failed": 1}
+    with SessionLocal() as session:
+        assert session.query(KnowledgeItem).count() == len(rows)
+
+
+def test_student_uploads_are_not_indexed(tmp_path, monkeypatch) -> None:
+    client, _ = make_client(tmp_path, monkeypatch)
+    body = client.post("/api/v1/files/upload", files={"file": ("essay.docx", b"x")}).json()
+    assert body["indexing"] is None
+    assert client.get(f"/api/v1/files/{body['id']}/indexing").status_code == 404
+
+
+def test_indexer_resumes_queued_and_stale_jobs_on_start(tmp_path) -> None:
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    SessionLocal = sessionmaker(bind=engine)
+    uploads.ensure_upload_tables(engine)
+    KnowledgeIndexer(SessionLocal).ensure_tables(engine)
+    now = datetime.utcnow()
+    with SessionLocal() as session:
+        for file_id, status, heartbeat in (
+            ("queued", "queued", None),
+            ("stale", "running", now - timedelta(hours=1)),
+            ("live", "running", now),
+        ):
+            path = tmp_path / f"{file_id}.docx"
+            path.write_bytes(file_id.encode())
+            session.add(UserFile(
+                id=file_id, owner_id="1", original_filename=f"{file_id}.docx", stored_path=str(path),
+                size=1, sha256=file_id, created_at=now,
+            ))
+            session.add(KnowledgeUploadJob(file_id=file_id, status=status, created_at=now, heartbeat_at=heartbeat))
+        session.commit()
+
+    extracted = []
+
+    def extract(_path, filename):
+        extracted.append(filename)
+        return [{"content": filename, "source_file": filename}]
+
+    indexer = KnowledgeIndexer(SessionLocal, executor=ThreadPoolExecutor(1), extract=extract, refresh=lambda db: None)
+    indexer.start(engine)
+    indexer.wait()
+    # الـ live ما زالت عملية أخرى تستخرجها (نبضها حديث) فلا تُعاد
+    assert sorted(extracted) == ["queued.docx", "stale.docx"]
+    with SessionLocal() as session:
+        assert {j.file_id: j.status for j in session.query(KnowledgeUploadJob)} == {"queued": "done", "stale": "done", "live": "running"}
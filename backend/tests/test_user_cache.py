@@ -0,0 +1,133 @@
+from datetime import timedelta
+
+import anyio
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, schemas
+from app.api.auth import create_access_token
+from app.database import Base, create_async_db_engine, create_db_engine
+from app.deps import get_async_db, get_current_user
+from app.main import app
+from app.models import User
+from app.services import user_cache
+from app.services.user_cache import LocalUserCache
+
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(user_cache, "user_cache", LocalUserCache())
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    engine = create_db_engine(url)
+    Base.metadata.tables["users"].create(engine)
+    # get_current_user يقرأ عبر AsyncSession؛ الاستعلامات تُعد على محركه
+    async_engine = create_async_db_engine(url)
+    queries = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    with sessionmaker(bind=engine)() as session:
+        session.queries = queries
+        session.async_engine = async_engine
+        yield session
+    engine.dispose()
+
+
+def current_user(db, email):
+    token = create_access_token({"sub": email}, expires_delta=timedelta(minutes=5))
+
+    async def resolve():
+        # كل anyio.run حلقة أحداث جديدة، فلا تُعاد اتصالات حلقة سابقة
+        try:
+            async with AsyncSession(db.async_engine) as session:
+                return await get_current_user(token, session)
+        finally:
+            await db.async_engine.dispose()
+
+    return anyio.run(resolve)
+
+
+def test_repeat_requests_skip_the_database(db) -> None:
+    crud.create_user(db, schemas.UserCreate(email="s@example.com", password="x"), hashed="h")
+    db.queries.clear()
+
+    first = current_user(db, "s@example.com")
+    assert len(db.queries) == 1
+    second = current_user(db, "s@example.com")
+    assert len(db.queries) == 1
+    assert (second.id, second.email, second.is_superuser) == (first.id, "s@example.com", False)
+    assert "hashed_password" not in user_cache.user_cache.get("s@example.com")
+
+
+def test_deactivation_password_change_and_delete_invalidate(db) -> None:
+    user = crud.create_user(db, schemas.UserCreate(email="s@example.com", password="x"), hashed="h")
+    current_user(db, "s@example.com")
+
+    crud.update_password(db, user, "new", hashed="h2")
+    assert user_cache.user_cache.get("s@example.com") is None
+
+    current_user(db, "s@example.com")
+    crud.set_user_active(db, user, False)
+    with pytest.raises(HTTPException) as e:
+        current_user(db, "s@example.com")
+    assert e.value.status_code == 400
+    # المستخدم المعطل محفوظ أيضاً فيُرفض دون استعلام
+    db.queries.clear()
+    with pytest.raises(HTTPException):
+        current_user(db, "s@example.com")
+    assert db.queries == []
+
+    crud.delete_user(db, user)
+    with pytest.raises(HTTPException) as e:
+        current_user(db, "s@example.com")
+    assert e.value.status_code == 401
+
+
+def test_local_cache_expires_and_evicts_least_recent() -> None:
+    now = [0.0]
+    cache = LocalUserCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", {"id": 1})
+    cache.set("b", {"id": 2})
+    cache.get("a")
+    cache.set("c", {"id": 3})
+    assert cache.get("b") is None and cache.get("a") == {"id": 1}
+
+    now[0] = 10.0
+    assert cache.get("a") is None and cache.get("c") is None
+
+
+def test_direct_commits_invalidate_before_ttl(db) -> None:
+    user = crud.create_user(db, schemas.UserCreate(email="s@example.com", password="x"), hashed="h")
+    token = create_access_token({"sub": "s@example.com"}, expires_delta=timedelta(minutes=5))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def async_db():
+        try:
+            async with AsyncSession(db.async_engine) as session:
+                yield session
+        finally:
+            await db.async_engine.dispose()
+
+    app.dependency_overrides[get_async_db] = async_db
+    client = TestClient(app)
+    try:
+        # تقرير الانتحال للمعلمين فقط: 403 يعني أن المستخدم تحقق بنجاح (ومحفوظ الآن)
+        assert client.get("/api/v1/plagiarism/lessons/1/report", headers=headers).status_code == 403
+        assert user_cache.user_cache.get("s@example.com") is not None
+
+        # تعطيل مباشر دون crud، كما يفعل سكربت إداري
+        user.is_active = False
+        db.commit()
+        assert client.get("/api/v1/plagiarism/lessons/1/report", headers=headers).status_code == 400
+
+        db.execute(update(User).where(User.email == "s@example.com").values(is_active=True))
+        db.commit()
+        assert client.get("/api/v1/plagiarism/lessons/1/report", headers=headers).status_code == 403
+
+        db.delete(user)
+        db.commit()
+        assert client.get("/api/v1/plagiarism/lessons/1/report", headers=headers).status_code == 401
+    finally:
+        app.dependency_overrides.clear()
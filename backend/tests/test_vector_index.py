@@ -0,0 +1,94 @@
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import KnowledgeItem
+from app.services.embeddings import HashingEmbedder
+from app.services.vector_index import VectorIndex, build_ivf, semantic_search, sync_vector_index
+
+
+def setup_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'knowledge.db'}")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def test_sync_embeds_only_new_chunks(tmp_path) -> None:
+    engine = setup_db(tmp_path)
+    base = str(tmp_path / "knowledge.vectors")
+    calls = []
+
+    class CountingEmbedder(HashingEmbedder):
+        def embed(self, texts):
+            calls.append(len(texts))
+            return super().embed(texts)
+
+    embedder = CountingEmbedder(dim=64)
+    with Session(engine) as session:
+        session.add_all([KnowledgeItem(content=f"chunk {i}", source_file="a.pdf") for i in range(3)])
+        session.commit()
+        assert len(sync_vector_index(session, base, embedder)) == 3
+
+        session.delete(session.get(KnowledgeItem, 1))
+        session.add(KnowledgeItem(content="new chunk", source_file="b.pdf"))
+        session.commit()
+        index = sync_vector_index(session, base, embedder)
+
+    assert calls == [3, 1]
+    assert index.ids.tolist() == [2, 3, 4]
+    assert isinstance(VectorIndex.load(base).vectors, np.memmap)
+
+
+def test_semantic_search_finds_related_chunk(tmp_path) -> None:
+    engine = setup_db(tmp_path)
+    with Session(engine) as session:
+        session.add_all([
+            KnowledgeItem(content="Marketing strategies help businesses reach customers", source_file="m.pdf", page=4),
+            KnowledgeItem(content="Cash flow forecasts show money coming in and out", source_file="f.pdf", page=9),
+            KnowledgeItem(content="استراتيجيات التسويق تساعد الشركات", source_file="ar.pdf"),
+        ])
+        session.commit()
+        sync_vector_index(session, str(tmp_path / "knowledge.vectors"))
+
+        hits = semantic_search(session, "marketing strategy for customers", limit=1)
+        assert [(h.source_file, h.page) for h in hits] == [("m.pdf", 4)]
+        assert semantic_search(session, "التسويق", limit=1)[0].source_file == "ar.pdf"
+
+
+def test_ivf_matches_brute_force_on_clusters() -> None:
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((20, 32)).astype(np.float32)
+    vectors = centers[rng.integers(0, 20, 2000)] + 0.3 * rng.standard_normal((2000, 32)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = np.arange(2000, dtype=np.int64)
+
+    exact = VectorIndex(ids, vectors, "test")
+    approx = VectorIndex(ids, vectors, "test", build_ivf(vectors, nlist=20))
+    queries = vectors[:10]
+    for e, a in zip(exact.search(queries, k=5), approx.search(queries, k=5, nprobe=3)):
+        assert a[0][0] == e[0][0]
+        assert len({i for i, _ in a} & {i for i, _ in e}) >= 4
+
+
+def test_sync_reembeds_rows_reinserted_with_reused_ids(tmp_path) -> None:
+    engine = setup_db(tmp_path)
+    base = str(tmp_path / "knowledge.vectors")
+    embedder = HashingEmbedder(dim=256)
+    with Session(engine) as session:
+        session.add_all([KnowledgeItem(content=text, source_file="a.pdf") for text in ("cash flow forecast", "marketing mix")])
+        session.commit()
+        sync_vector_index(session, base, embedder)
+
+        # إعادة سحب أحدث ملف: حذف ثم إدراج، و SQLite يعطي الصف الجديد رقم المحذوف
+        session.query(KnowledgeItem).filter(KnowledgeItem.id == 2).delete()
+        session.commit()
+        session.add(KnowledgeItem(content="employee motivation theories", source_file="a.pdf"))
+        session.commit()
+        assert session.query(KnowledgeItem.id).order_by(KnowledgeItem.id).all() == [(1,), (2,)]
+        index = sync_vector_index(session, base, embedder)
+
+    (top_id, score), = index.search(embedder.embed(["employee motivation theories"]), k=1)[0]
+    assert top_id == 2 and score > 0.9
+    assert index.search(embedder.embed(["marketing mix"]), k=1)[0][0][1] < 0.5
+    assert len(VectorIndex.load(base).digests) == 2